@@ -1,3 +1,5 @@
+import os
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
@@ -11,17 +13,90 @@ migrate = Migrate()
 # User loader function for Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
-    from app.models import User  # Local import to avoid circular import
-    return User.query.get(int(user_id))
+    from app.user_cache import load_cached_user  # Local import to avoid circular import
+    return load_cached_user(int(user_id))
 
-def create_app():
+def create_app(config_object='app.config.Config'):
     app = Flask(__name__)
-    app.config.from_object('app.config.Config')  # Load config from 'config.py'
+    app.config.from_object(config_object)  # Load config from 'config.py'
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    # Stream uploaded files straight to disk while hashing and size-checking them
+    from app.uploads import UploadRequest  # Local import to avoid circular import
+    app.request_class = UploadRequest
     
     # Initialize extensions
     db.init_app(app)
+    from app.database import configure_engines  # Local import to avoid circular import
+    configure_engines(app, db)
     login_manager.init_app(app)
     migrate.init_app(app, db)  # Initialize Flask-Migrate
+
+    from app.user_cache import UserCache  # Local import to avoid circular import
+    app.extensions['user_cache'] = UserCache(
+        maxsize=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL']
+    )
+
+    from app.ratelimit import rate_limiter  # Local import to avoid circular import
+    rate_limiter.init_app(app)
+
+    from app.security import password_hasher  # Local import to avoid circular import
+    password_hasher.init_app(app)
+
+    from app.write_behind import write_behind  # Local import to avoid circular import
+    write_behind.init_app(app)
+
+    from app.summarizers import summarizers  # Local import to avoid circular import
+    summarizers.init_app(app)
+
+    from app.tasks import pipeline  # Local import to avoid circular import
+    pipeline.init_app(app)
+
+    from app.streaming import summary_streams  # Local import to avoid circular import
+    summary_streams.init_app(app)
+
+    from app.storage import storage  # Local import to avoid circular import
+    storage.init_app(app)
+
+    from app.search import search_index  # Local import to avoid circular import
+    search_index.init_app(app)
+
+    from app.metrics import metrics  # Local import to avoid circular import
+    metrics.init_app(app)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Creates any missing database tables."""
+        db.create_all()
+        click.echo("Database tables created.")
+
+    @app.cli.command('gc-uploads')
+    @click.option('--grace', default=3600, help='Keep orphans younger than this many seconds.')
+    def gc_uploads(grace):
+        """Delete stored files that no upload references any more."""
+        removed = storage.collect_garbage(grace_seconds=grace)
+        click.echo(f'Removed {removed} orphaned files.')
+
+    @app.cli.command('search-reindex')
+    def search_reindex():
+        """Rebuild the full-text search index from the processed uploads."""
+        indexed = search_index.rebuild()
+        click.echo(f'Indexed {indexed} files.')
+
+    @app.cli.command('import-users')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+                  help='Input format, guessed from the file extension by default.')
+    def import_users_command(path, fmt):
+        """Create users in bulk from a CSV or JSON Lines file."""
+        from app.user_import import import_users  # Local import to avoid circular import
+        fmt = fmt or ('jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+        with open(path, newline='', encoding='utf-8') as stream:
+            result = import_users(stream, fmt)
+        for number, message in result.errors:
+            click.echo(f'Line {number}: {message}', err=True)
+        click.echo(f'Imported {result.inserted} users, skipped {result.skipped} existing, '
+                   f'rejected {len(result.errors)}.')
     
     # Configure the login view
     login_manager.login_view = 'main.login'  # Redirect to the login page if not authenticated
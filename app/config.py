@@ -1,13 +1,163 @@
 import os
 
+# Connection pool settings per environment, for server databases
+POOL_PROFILES = {
+    'development': {'pool_size': 5, 'max_overflow': 5},
+    'production': {'pool_size': 10, 'max_overflow': 20},
+}
+
+
+def engine_options(uri, profile='development'):
+    """
+    SQLAlchemy engine options suited to a database URI and environment.
+
+    Args:
+        uri (str): Database URI.
+        profile (str): 'development' or 'production'.
+
+    Returns:
+        dict: Value for SQLALCHEMY_ENGINE_OPTIONS.
+    """
+    if uri.startswith('sqlite'):
+        if ':memory:' in uri or uri in ('sqlite://', 'sqlite:///'):
+            return {}
+        # Writers wait on each other in SQLite itself (the busy_timeout pragma is
+        # the one lock timeout), so the pool only keeps connections open for reuse
+        return {'pool_size': 10, 'max_overflow': 10}
+    return dict(
+        POOL_PROFILES[profile],
+        pool_pre_ping=True,  # Replace connections the server closed while idle
+        pool_recycle=1800,
+        pool_timeout=10,
+    )
+
+
 class Config:
     SECRET_KEY = os.environ.get('FLASK_SECRET_KEY') or 'a_secure_random_key'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///flaskapp.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    
-    UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
-    
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB limit
-    ALLOWED_EXTENSIONS = {'pdf', 'docx', 'pptx', 'jpg'}
+    APP_ENV = os.environ.get('APP_ENV') or 'development'
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, APP_ENV)
+    # Applied to every new SQLite connection; WAL lets readers run alongside the
+    # single writer, and busy_timeout makes writers queue instead of failing
+    # with "database is locked"
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -32000,  # 32 MB page cache per connection
+    }
+
+    UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')  # Created by create_app
+
+    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB per uploaded file
+    MAX_CONTENT_LENGTH = MAX_FILE_SIZE + 64 * 1024  # One file plus room for the form fields
+    MAX_BATCH_SIZE = 200 * 1024 * 1024  # Whole request, or a single zip archive, on /upload/batch
+    MAX_BATCH_FILES = 500
+    # Must each have an extractor registered in app.extractors
+    ALLOWED_EXTENSIONS = {'pdf', 'docx', 'pptx', 'jpg', 'jpeg', 'png', 'txt', 'md', 'html', 'htm'}
+
+    # Background processing of uploads
+    # 'process' runs extraction in a process pool, 'thread' in a thread pool,
+    # 'inline' runs the whole job on the request thread (tests, debugging)
+    PROCESSING_MODE = os.environ.get('PROCESSING_MODE') or 'process'
+    EXTRACTION_WORKERS = int(os.environ.get('EXTRACTION_WORKERS') or os.cpu_count() or 2)
+    # Jobs for cheap formats (text, HTML, Office) run on their own threads, so
+    # they never queue behind PDFs and scans waiting for the extraction pool
+    FAST_LANE_WORKERS = int(os.environ.get('FAST_LANE_WORKERS') or 4)
+    SUMMARY_CONCURRENCY = int(os.environ.get('SUMMARY_CONCURRENCY') or 4)
+
+    # Instrumentation; /metrics serves Prometheus text format. With
+    # PROFILE_REQUESTS on, requests sent with 'X-Profile: 1' are sampled and
+    # their stacks saved to PROFILE_DIR (instance/profiles by default) if they
+    # took at least PROFILE_MIN_SECONDS. /metrics only answers clients in
+    # METRICS_ALLOWED_NETWORKS (comma separated addresses or CIDR networks)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    METRICS_ALLOWED_NETWORKS = tuple(
+        network.strip() for network in (os.environ.get('METRICS_ALLOWED_NETWORKS') or '127.0.0.1,::1').split(',')
+        if network.strip())
+    PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS') == '1'
+    PROFILE_MIN_SECONDS = float(os.environ.get('PROFILE_MIN_SECONDS') or 1.0)
+    PROFILE_INTERVAL = 0.005
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+
+    # Summarization provider: 'groq', 'extractive' (local, no network),
+    # 'auto' (Groq falling back to extractive, extractive alone without a key)
+    # or 'fake' (echoes the first words, for tests)
+    SUMMARY_PROVIDER = os.environ.get('SUMMARY_PROVIDER') or 'auto'
+    GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
+    SUMMARY_MODEL = os.environ.get('SUMMARY_MODEL') or 'llama3-8b-8192'
+    SUMMARY_TIMEOUT = float(os.environ.get('SUMMARY_TIMEOUT') or 30)
+    SUMMARY_RETRIES = int(os.environ.get('SUMMARY_RETRIES') or 3)
+    SUMMARY_BREAKER_FAILURES = 5
+    SUMMARY_BREAKER_RESET = 30
+    SUMMARY_FAKE_DELAY = 0.0  # Seconds per word of the 'fake' provider
+
+    # Summaries are streamed to /upload/<id>/summary/stream as Server-Sent
+    # Events while they are generated. Readers of a job in another process get
+    # the finished summary, polled from the database every SUMMARY_STREAM_POLL.
+    # A stream holds a worker thread, so it ends after SUMMARY_STREAM_TIMEOUT
+    # (the browser reconnects) and a user has at most SUMMARY_STREAMS_PER_USER
+    SUMMARY_STREAMING = os.environ.get('SUMMARY_STREAMING', '1') != '0'
+    SUMMARY_STREAM_TIMEOUT = float(os.environ.get('SUMMARY_STREAM_TIMEOUT') or 30)
+    SUMMARY_STREAM_POLL = 2.0
+    SUMMARY_STREAMS_PER_USER = int(os.environ.get('SUMMARY_STREAMS_PER_USER') or 4)
+
+    # Password hashing policy; stored hashes made with other settings are
+    # re-hashed the next time their user logs in
+    PASSWORD_HASH_ALGORITHM = os.environ.get('PASSWORD_HASH_ALGORITHM') or 'pbkdf2'  # or 'scrypt'
+    PASSWORD_HASH_DIGEST = 'sha256'
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS') or 600_000)
+    PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N') or 2 ** 15)
+    PASSWORD_SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R') or 8)
+    PASSWORD_SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P') or 1)
+    # Threads hashing passwords; 0 hashes on the request thread
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 2)
+
+    # Login attempts allowed per client IP and per username, as token buckets:
+    # up to BURST attempts at once, refilling at PER_MINUTE attempts a minute.
+    # 'memory' limits each process separately, 'sqlite' shares the limits
+    # between the worker processes of one host through RATELIMIT_SQLITE_PATH.
+    RATELIMIT_BACKEND = os.environ.get('RATELIMIT_BACKEND') or 'memory'
+    RATELIMIT_SQLITE_PATH = os.environ.get('RATELIMIT_SQLITE_PATH') or os.path.join(os.getcwd(), 'instance', 'ratelimit.db')
+    LOGIN_LIMIT_IP_BURST = 20
+    LOGIN_LIMIT_IP_PER_MINUTE = 10
+    LOGIN_LIMIT_USER_BURST = 5
+    LOGIN_LIMIT_USER_PER_MINUTE = 3
+
+    # Users loaded for authenticated requests are cached per process
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 1024)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
+
+    # last_login / last_accessed updates are buffered and written in bulk
+    # every WRITE_BEHIND_INTERVAL seconds or once WRITE_BEHIND_MAX_ITEMS are waiting
+    WRITE_BEHIND_INTERVAL = float(os.environ.get('WRITE_BEHIND_INTERVAL') or 5)
+    WRITE_BEHIND_MAX_ITEMS = int(os.environ.get('WRITE_BEHIND_MAX_ITEMS') or 1000)
+
+    # Full-text search: 'fts5' (SQLite), 'like' (any database, small collections)
+    # or 'auto' to pick FTS5 on SQLite
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND') or 'auto'
+
+    # Extracted text is stored compressed: 'zlib', 'lzma' (smaller, slower) or
+    # 'none'. Changing it only affects rows written afterwards; every codec stays readable
+    TEXT_COMPRESSION = os.environ.get('TEXT_COMPRESSION') or 'zlib'
+    TEXT_COMPRESSION_LEVEL = int(os.environ.get('TEXT_COMPRESSION_LEVEL') or 6)
+    TEXT_COMPRESSION_MIN_SIZE = 512
+
+
+class ProductionConfig(Config):
+    APP_ENV = 'production'
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(Config.SQLALCHEMY_DATABASE_URI, 'production')
+
+
+class TestConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    PROCESSING_MODE = 'inline'
+    PASSWORD_HASH_WORKERS = 0
+    PASSWORD_HASH_ITERATIONS = 1000  # Cheap hashes keep the suite fast
+    WRITE_BEHIND_INTERVAL = 0  # Write timestamps immediately
+    SUMMARY_STREAMING = False  # Jobs summarize in one call unless a test streams
@@ -0,0 +1,150 @@
+import logging
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+logger = logging.getLogger(__name__)
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """
+    Runs PRAGMA statements on every new connection of a SQLite engine.
+
+    Args:
+        engine (Engine): Engine to configure; other dialects are left alone.
+        pragmas (dict): Pragma name -> value, e.g. {'journal_mode': 'WAL'}.
+    """
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def create_sqlite_functions(dbapi_connection):
+    """
+    Defines the SQL functions the schema relies on on a SQLite connection.
+
+    decompress_text(value) returns the text of a CompressedText value; the
+    search index reads extracted text through it.
+    """
+    dbapi_connection.create_function('decompress_text', 1, CompressedText.decode, deterministic=True)
+
+
+def register_sqlite_functions(engine):
+    """Runs create_sqlite_functions() on every new connection of a SQLite engine."""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def create_functions(dbapi_connection, connection_record):
+        create_sqlite_functions(dbapi_connection)
+
+
+def configure_engines(app, db):
+    """Applies the app's SQLITE_PRAGMAS and SQL functions to its database engines."""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, pragmas)
+            register_sqlite_functions(engine)
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text stored compressed in a binary column.
+
+    Values are written as a header, NUL followed by a codec byte ('z' zlib,
+    'x' lzma, 'r' raw UTF-8), then the payload. Texts shorter than `min_size`
+    bytes are stored raw, since compressing them saves nothing. Reads accept
+    every codec whatever is configured now, and also plain text written
+    before the column was compressed, so rows can be rewritten in batches
+    while the application runs.
+
+    Settings left out are read when a value is written, from the current
+    application's TEXT_COMPRESSION, TEXT_COMPRESSION_LEVEL and
+    TEXT_COMPRESSION_MIN_SIZE, so each app's config applies to its own rows.
+
+    Args:
+        codec (str, optional): 'zlib', 'lzma' or 'none'.
+        level (int, optional): Compression level; the lzma preset for lzma.
+        min_size (int, optional): Smallest text in bytes worth compressing.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    CODECS = {'none': b'r', 'zlib': b'z', 'lzma': b'x'}
+    DEFAULTS = {'TEXT_COMPRESSION': 'zlib', 'TEXT_COMPRESSION_LEVEL': 6, 'TEXT_COMPRESSION_MIN_SIZE': 512}
+
+    def __init__(self, codec=None, level=None, min_size=None):
+        if codec is not None and codec not in self.CODECS:
+            raise ValueError(f"Unknown text compression codec: {codec}")
+        super().__init__()
+        self.codec = codec
+        self.level = level
+        self.min_size = min_size
+
+    def settings(self):
+        """Returns (codec, level, min_size): those given, else the current app's."""
+        config = current_app.config if has_app_context() else {}
+
+        def setting(value, name):
+            if value is not None:
+                return value
+            value = config.get(name)
+            return self.DEFAULTS[name] if value is None else value
+
+        return (setting(self.codec, 'TEXT_COMPRESSION'), setting(self.level, 'TEXT_COMPRESSION_LEVEL'),
+                setting(self.min_size, 'TEXT_COMPRESSION_MIN_SIZE'))
+
+    def encode(self, text):
+        """Returns the stored form of a text."""
+        codec, level, min_size = self.settings()
+        if codec not in self.CODECS:
+            raise ValueError(f"Unknown text compression codec: {codec}")
+        data = text.encode('utf-8')
+        codec = codec if len(data) >= min_size else 'none'
+        if codec == 'zlib':
+            import zlib
+            data = zlib.compress(data, level)
+        elif codec == 'lzma':
+            import lzma
+            data = lzma.compress(data, preset=level)
+        return b'\x00' + self.CODECS[codec] + data
+
+    @staticmethod
+    def decode(value):
+        """Returns the text of a stored value, compressed or not."""
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        if value[:1] != b'\x00':
+            return value.decode('utf-8')  # Plain text converted to binary by a migration
+        codec, data = value[1:2], value[2:]
+        if codec == b'z':
+            import zlib
+            data = zlib.decompress(data)
+        elif codec == b'x':
+            import lzma
+            data = lzma.decompress(data)
+        elif codec != b'r':
+            raise ValueError(f"Unknown compressed text header: {value[:2]!r}")
+        return data.decode('utf-8')
+
+    @staticmethod
+    def is_encoded(value):
+        return isinstance(value, (bytes, memoryview)) and bytes(value[:1]) == b'\x00'
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else self.encode(value)
+
+    def result_processor(self, dialect, coltype):
+        # Skips LargeBinary's own processing: rows not rewritten yet hold str on SQLite
+        return self.decode
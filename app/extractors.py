@@ -0,0 +1,349 @@
+import re
+import codecs
+import zipfile
+import importlib
+import threading
+from html.parser import HTMLParser
+from xml.etree.ElementTree import iterparse
+from app.uploads import SNIFF_BYTES, sniff_mime_type
+
+CHUNK_SIZE = 64 * 1024
+
+# Cost hints. Fast extractors run on the job thread of the fast lane; heavy
+# ones (PDF parsing, OCR) go to the extraction pool.
+FAST = 'fast'
+HEAVY = 'heavy'
+
+
+class ExtractionError(Exception):
+    """Raised when no text could be extracted from a file."""
+
+
+class Extractor:
+    """
+    Turns one kind of document into text.
+
+    Args:
+        name (str): Short name, e.g. 'pdf'.
+        mime_types (tuple): Sniffed MIME types this extractor handles.
+        extensions (tuple): File extensions uploads of this type may have.
+        target (Callable | str): Function taking a path or binary file and
+            returning text, or 'module:function' to import on first use.
+        cost (str): FAST or HEAVY.
+    """
+
+    def __init__(self, name, mime_types, extensions, target, cost=FAST):
+        self.name = name
+        self.mime_types = tuple(mime_types)
+        self.extensions = tuple(extensions)
+        self.cost = cost
+        self._target = target
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if isinstance(self._target, str):
+                module, function = self._target.split(':')
+                self._target = getattr(importlib.import_module(module), function)
+            return self._target
+
+    def __call__(self, source):
+        return self.load()(source)
+
+    def __repr__(self):
+        return f"<Extractor {self.name} ({self.cost})>"
+
+
+class ExtractorRegistry:
+    """Extractors keyed by the MIME type sniffed from a file's first bytes."""
+
+    def __init__(self):
+        self._by_mime = {}
+        self._extractors = []
+
+    def register(self, extractor):
+        for mime_type in extractor.mime_types:
+            self._by_mime[mime_type] = extractor
+        self._extractors.append(extractor)
+        return extractor
+
+    def __iter__(self):
+        return iter(self._extractors)
+
+    def find(self, mime_type):
+        """
+        Args:
+            mime_type (str): Sniffed MIME type.
+
+        Returns:
+            Extractor | None: The extractor for the type, if any.
+        """
+        return self._by_mime.get(mime_type)
+
+    def detect(self, source, filename=''):
+        """
+        Sniffs a binary file and finds its extractor. The file position is restored.
+
+        Returns:
+            tuple: (MIME type, Extractor or None)
+        """
+        position = source.tell()
+        head = source.read(SNIFF_BYTES)
+        source.seek(position)
+        mime_type = sniff_mime_type(head, filename)
+        return mime_type, self.find(mime_type)
+
+    def lane(self, mime_type):
+        """Cost hint for a MIME type; unknown types are treated as heavy."""
+        extractor = self.find(mime_type)
+        return extractor.cost if extractor is not None else HEAVY
+
+    def extensions(self):
+        return {ext for extractor in self._extractors for ext in extractor.extensions}
+
+    def mime_types(self):
+        return set(self._by_mime)
+
+
+def _iter_chunks(source, chunk_size=CHUNK_SIZE):
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            yield from _iter_chunks(f, chunk_size)
+        return
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_decoded(source, encoding='utf-8'):
+    """Decodes a binary stream chunk by chunk, replacing invalid bytes."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    first = True
+    for chunk in _iter_chunks(source):
+        text = decoder.decode(chunk)
+        if first:
+            text = text.lstrip('\ufeff')
+            first = False
+        yield text
+    yield decoder.decode(b'', final=True)
+
+
+def extract_text_from_txt(source):
+    """
+    Extracts text from a plain text or Markdown file.
+
+    Args:
+        source (str | file): Path to the file or a binary file object.
+
+    Returns:
+        str: The decoded text.
+    """
+    return "".join(_iter_decoded(source))
+
+
+class _HTMLText(HTMLParser):
+    """Collects the visible text of an HTML document."""
+
+    SKIP = {'script', 'style', 'noscript', 'template', 'head'}
+    BLOCKS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+              'section', 'article', 'header', 'footer', 'blockquote', 'pre', 'table', 'title'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+_BLANK_LINES = re.compile(r'[ \t]*\n[\s]*\n\s*')
+
+
+def extract_text_from_html(source):
+    """
+    Extracts the visible text of an HTML file, fed to the parser chunk by chunk.
+
+    Args:
+        source (str | file): Path to the file or a binary file object.
+
+    Returns:
+        str: Text with one line per block element.
+    """
+    parser = _HTMLText()
+    for text in _iter_decoded(source):
+        parser.feed(text)
+    parser.close()
+    text = "".join(parser.parts)
+    return _BLANK_LINES.sub("\n", text).strip()
+
+
+_DRAWINGML = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_SLIDE_NAME = re.compile(r'ppt/slides/slide(\d+)\.xml$')
+
+
+def extract_text_from_pptx(source):
+    """
+    Extracts the text of every slide of a PPTX file, in slide order.
+
+    Slides are read straight from the zip archive and parsed incrementally,
+    without loading the presentation into an object model.
+
+    Args:
+        source (str | file): Path to the file or a binary file object.
+
+    Returns:
+        str: One line per paragraph, slides separated by a blank line.
+    """
+    slides = []
+    with zipfile.ZipFile(source) as archive:
+        names = [(int(m.group(1)), name) for name in archive.namelist()
+                 if (m := _SLIDE_NAME.match(name))]
+        for _, name in sorted(names):
+            paragraphs, runs = [], []
+            with archive.open(name) as member:
+                for _, element in iterparse(member):
+                    if element.tag == f'{_DRAWINGML}t':
+                        runs.append(element.text or '')
+                    elif element.tag == f'{_DRAWINGML}p':
+                        if runs:
+                            paragraphs.append("".join(runs))
+                        runs = []
+                        element.clear()
+            if paragraphs:
+                slides.append("\n".join(paragraphs))
+    return "\n\n".join(slides)
+
+
+_WORDML = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MARKUP_COMPATIBILITY = '{http://schemas.openxmlformats.org/markup-compatibility/2006}'
+_DOCX_PARTS = re.compile(r'word/(header|footer)(\d*)\.xml$')
+_DOCX_NOTES = ('word/footnotes.xml', 'word/endnotes.xml')
+
+
+def _iter_wordml_paragraphs(member):
+    """
+    Yields the text of each paragraph of a WordprocessingML part, in document order.
+
+    Table rows become one line with cells separated by tabs. Every top-level
+    block is cleared once read, so memory stays bounded by the largest block
+    rather than the part.
+    """
+    paragraphs = []  # Runs of each open paragraph; text boxes nest paragraphs
+    rows = []  # [cells, paragraphs of the current cell] of each open table row
+    skipping = 0  # Depth inside mc:Fallback, which repeats the content of mc:Choice
+    depth = 0
+    container, container_depth = None, 0  # w:body, or the root of other parts
+
+    for event, element in iterparse(member, events=('start', 'end')):
+        tag = element.tag
+        if event == 'start':
+            depth += 1
+            if depth == 1 or tag == f'{_WORDML}body':
+                container, container_depth = element, depth
+            if tag == f'{_MARKUP_COMPATIBILITY}Fallback':
+                skipping += 1
+            elif skipping:
+                pass
+            elif tag == f'{_WORDML}p':
+                paragraphs.append([])
+            elif tag == f'{_WORDML}tr':
+                rows.append([[], []])
+            continue
+
+        depth -= 1
+        if tag == f'{_MARKUP_COMPATIBILITY}Fallback':
+            skipping -= 1
+        elif skipping:
+            pass
+        elif tag == f'{_WORDML}t':
+            if paragraphs:
+                paragraphs[-1].append(element.text or '')
+        elif tag == f'{_WORDML}tab':
+            if paragraphs:
+                paragraphs[-1].append('\t')
+        elif tag in (f'{_WORDML}br', f'{_WORDML}cr'):
+            if paragraphs:
+                paragraphs[-1].append('\n')
+        elif tag == f'{_WORDML}p':
+            text = "".join(paragraphs.pop()).strip()
+            if text and rows and not paragraphs:
+                rows[-1][1].append(text)
+            elif text:
+                yield text
+        elif tag == f'{_WORDML}tc':
+            cells, cell = rows[-1]
+            cells.append(" ".join(cell))
+            cell.clear()
+        elif tag == f'{_WORDML}tr':
+            cells, _ = rows.pop()
+            line = "\t".join(cells).strip()
+            if line and rows:
+                rows[-1][1].append(line)  # A table nested in a cell
+            elif line:
+                yield line
+        if depth == container_depth:
+            # A top-level block is done; drop it and everything before it
+            container.clear()
+
+
+def iter_docx_text(source):
+    """
+    Yields the text of a DOCX file paragraph by paragraph, without python-docx.
+
+    The body comes first, in document order with tables inline, followed by
+    headers, footers, footnotes and endnotes. Each part is streamed straight
+    out of the zip archive; a header or footer repeated by several sections
+    is only yielded once.
+
+    Args:
+        source (str | file): Path to the file or a binary file object.
+
+    Yields:
+        str: Text of each non-empty paragraph or table row.
+    """
+    with zipfile.ZipFile(source) as archive:
+        names = set(archive.namelist())
+        with archive.open('word/document.xml') as member:
+            yield from _iter_wordml_paragraphs(member)
+
+        extras = sorted((m.group(1) != 'header', int(m.group(2) or 0), name) for name in names
+                        if (m := _DOCX_PARTS.match(name)))
+        seen = set()
+        for name in [name for *_, name in extras] + [name for name in _DOCX_NOTES if name in names]:
+            with archive.open(name) as member:
+                texts = tuple(_iter_wordml_paragraphs(member))
+            if texts and texts not in seen:
+                seen.add(texts)
+                yield from texts
+
+
+registry = ExtractorRegistry()
+registry.register(Extractor('pdf', ['application/pdf'], ['pdf'],
+                            'app.utils:extract_text_from_pdf', cost=HEAVY))
+registry.register(Extractor('image', ['image/jpeg', 'image/png', 'image/tiff', 'image/gif'],
+                            ['jpg', 'jpeg', 'png'], 'app.utils:extract_text_from_image', cost=HEAVY))
+registry.register(Extractor(
+    'docx', ['application/vnd.openxmlformats-officedocument.wordprocessingml.document'], ['docx'],
+    'app.utils:extract_text_from_docx'))
+registry.register(Extractor(
+    'pptx', ['application/vnd.openxmlformats-officedocument.presentationml.presentation'], ['pptx'],
+    extract_text_from_pptx))
+registry.register(Extractor('text', ['text/plain', 'text/markdown'], ['txt', 'md', 'markdown'],
+                            extract_text_from_txt))
+registry.register(Extractor('html', ['text/html'], ['html', 'htm'], extract_text_from_html))
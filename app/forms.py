@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from wtforms import FileField, StringField, PasswordField, SubmitField
+from wtforms import FileField, MultipleFileField, StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired, Email, Length, EqualTo
 
 class RegistrationForm(FlaskForm):
@@ -22,3 +22,8 @@ class LoginForm(FlaskForm):
 class UploadForm(FlaskForm):
     file = FileField('Choose File', validators=[DataRequired()])
     submit = SubmitField('Upload')
+
+
+class BatchUploadForm(FlaskForm):
+    files = MultipleFileField('Choose Files or Zip Archives', validators=[DataRequired()])
+    submit = SubmitField('Upload')
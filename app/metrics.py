@@ -0,0 +1,448 @@
+import os
+import sys
+import time
+import bisect
+import logging
+import ipaddress
+import threading
+from functools import wraps
+from collections import Counter as _Tally
+from flask import abort, current_app, g, request, Response
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a cached query up to a long summarization call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Distribution of observed values, in cumulative buckets as Prometheus expects.
+
+    An observation is a bisect and three additions under a lock, cheap enough
+    to put on every query and pipeline stage.
+
+    Args:
+        name (str): Metric name.
+        documentation (str): HELP text.
+        labels (tuple): Label names; observations pass a value for each.
+        buckets (tuple): Upper bounds of the buckets, ascending.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, *label_values):
+        """Context manager and decorator observing the elapsed seconds."""
+        return _Timer(self, label_values)
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: label values -> {'count', 'sum', 'buckets': [(upper bound, cumulative count)]}
+        """
+        with self._lock:
+            series = {key: list(value) for key, value in self._series.items()}
+        result = {}
+        for key, values in series.items():
+            cumulative, buckets = 0, []
+            for bound, count in zip(self.buckets + (float('inf'),), values[:-2]):
+                cumulative += count
+                buckets.append((bound, cumulative))
+            result[key] = {'count': values[-1], 'sum': values[-2], 'buckets': buckets}
+        return result
+
+    def render(self):
+        lines = []
+        for key, series in sorted(self.snapshot().items()):
+            for bound, count in series['buckets']:
+                labels = _format_labels(self.labels, key, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{labels} {count}')
+            labels = _format_labels(self.labels, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(series["sum"])}')
+            lines.append(f'{self.name}_count{labels} {series["count"]}')
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class _Timer:
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+
+    def __call__(self, fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            # A timer per call, as calls on different threads overlap
+            with _Timer(self.histogram, self.label_values):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+class Counter:
+    """Monotonically increasing count per label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}' for key, value in values]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge:
+    """
+    Value read from a callback when the metrics are rendered.
+
+    Args:
+        name (str): Metric name.
+        documentation (str): HELP text.
+        callback (Callable[[], float]): Returns the current value.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self):
+        try:
+            value = self.callback()
+        except Exception as e:
+            logger.warning(f"Metric {self.name} unavailable: {str(e)}")
+            return []
+        return [f'{self.name} {_format_value(value)}']
+
+    def reset(self):
+        pass
+
+
+class CallbackCounter(Gauge):
+    """Count kept by another component, read from a callback when the metrics are rendered."""
+
+    kind = 'counter'
+
+
+class MetricsRegistry:
+    """Every metric of this process, rendered together in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            # Callback metrics are replaced, so they read the most recent application
+            if existing is not None and existing.kind == metric.kind and not isinstance(metric, Gauge):
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labels, buckets))
+
+    def counter(self, name, documentation, labels=()):
+        return self._add(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, callback):
+        return self._add(Gauge(name, documentation, callback))
+
+    def callback_counter(self, name, documentation, callback):
+        return self._add(CallbackCounter(name, documentation, callback))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    'upload_stage_seconds', 'Time spent in each stage of receiving and processing an upload.', ('stage',))
+request_seconds = registry.histogram(
+    'http_request_seconds', 'Time to handle a request.', ('endpoint', 'method', 'status'))
+request_queries = registry.histogram(
+    'http_request_db_queries', 'Database queries run while handling a request.', ('endpoint',),
+    buckets=QUERY_COUNT_BUCKETS)
+request_query_seconds = registry.histogram(
+    'http_request_db_seconds', 'Time spent in database queries while handling a request.', ('endpoint',))
+query_seconds = registry.histogram(
+    'db_query_seconds', 'Time to execute a single database query.', ('operation',),
+    buckets=DEFAULT_BUCKETS[:10])
+jobs_total = registry.counter('upload_jobs_total', 'Upload processing jobs by outcome.', ('outcome',))
+
+
+def timed(stage):
+    """
+    Times a pipeline stage into upload_stage_seconds.
+
+    Usable as `with timed('extract'):` or as a decorator `@timed('extract')`.
+    """
+    return stage_seconds.time(stage)
+
+
+# Query count and time of the request running on this thread, if any
+_request_stats = threading.local()
+
+
+def _operation(statement):
+    word = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ''
+    return word if word in ('select', 'insert', 'update', 'delete') else 'other'
+
+
+def instrument_engine(engine):
+    """Times every query on an engine and adds it to the current request's totals."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_query_start'].pop()
+        query_seconds.observe(elapsed, _operation(statement))
+        stats = getattr(_request_stats, 'value', None)
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack at a fixed interval while it handles a request.
+
+    Sampling runs on its own thread and only looks at the profiled thread,
+    so other requests are unaffected and the profiled one is slowed by little
+    more than the GIL hand-offs. Results are collapsed stacks, one
+    'frame;frame;frame count' line per distinct stack, as read by flame graph tools.
+
+    Args:
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = _Tally()
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self, thread_id=None):
+        self._thread_id = thread_id or threading.get_ident()
+        self._sampler = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.samples.most_common()) + '\n'
+
+
+class Metrics:
+    """
+    Flask extension timing requests and their queries and serving /metrics.
+
+    Configured with METRICS_ENABLED, METRICS_ALLOWED_NETWORKS (the client
+    addresses /metrics answers) and, for the profiler, PROFILE_REQUESTS,
+    PROFILE_MIN_SECONDS, PROFILE_INTERVAL and PROFILE_DIR. With
+    PROFILE_REQUESTS on, a request carrying an 'X-Profile: 1' header is
+    sampled, and its stacks are written to PROFILE_DIR if it took at least
+    PROFILE_MIN_SECONDS.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app import db  # Local import to avoid circular import
+
+        app.extensions['metrics'] = registry
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        with app.app_context():
+            for engine in db.engines.values():
+                instrument_engine(engine)
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.render)
+        _register_app_gauges(app)
+
+    @staticmethod
+    def _before_request():
+        # [query count, query seconds, start, status]; a thread-local is much
+        # cheaper to reach than g from the query listeners
+        _request_stats.value = [0, 0.0, time.perf_counter(), 500]
+        config = current_app.config
+        if config['PROFILE_REQUESTS'] and request.headers.get('X-Profile') == '1':
+            g.profiler = SamplingProfiler(config['PROFILE_INTERVAL']).start()
+
+    @staticmethod
+    def _after_request(response):
+        stats = getattr(_request_stats, 'value', None)
+        if stats is not None:
+            stats[3] = response.status_code
+        return response
+
+    @staticmethod
+    def _teardown_request(exc):
+        stats = getattr(_request_stats, 'value', None)
+        if stats is None:
+            return
+        _request_stats.value = None
+        queries, query_time, start, status = stats
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unknown'
+        request_seconds.observe(elapsed, endpoint, request.method, str(status))
+        request_queries.observe(queries, endpoint)
+        request_query_seconds.observe(query_time, endpoint)
+
+        profiler = g.pop('profiler', None) if current_app.config['PROFILE_REQUESTS'] else None
+        if profiler is not None:
+            profiler.stop()
+            if elapsed >= current_app.config['PROFILE_MIN_SECONDS']:
+                _save_profile(profiler, endpoint, elapsed)
+
+    @staticmethod
+    def render():
+        if not _scraper_allowed(request.remote_addr):
+            abort(403)
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _scraper_allowed(address):
+    try:
+        address = ipaddress.ip_address(address or '')
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False)
+               for network in current_app.config['METRICS_ALLOWED_NETWORKS'])
+
+
+def _save_profile(profiler, endpoint, elapsed):
+    directory = current_app.config.get('PROFILE_DIR') or os.path.join(current_app.instance_path, 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{int(time.time() * 1000)}-{endpoint}.folded')
+    with open(path, 'w') as f:
+        f.write(profiler.collapsed())
+    logger.info(f"Profiled {endpoint} ({elapsed:.3f}s, {sum(profiler.samples.values())} samples) to {path}")
+
+
+def _register_app_gauges(app):
+    """Gauges and counters reading state held by the application's other extensions."""
+    def user_cache():
+        return app.extensions['user_cache'].stats()
+
+    registry.callback_counter('user_cache_hits_total', 'Users served from the session user cache.',
+                              lambda: user_cache()['hits'])
+    registry.callback_counter('user_cache_misses_total',
+                              'Users loaded from the database by the session user cache.',
+                              lambda: user_cache()['misses'])
+    registry.gauge('user_cache_size', 'Users held in the session user cache.',
+                   lambda: user_cache()['size'])
+    registry.gauge('write_behind_pending', 'Timestamp updates waiting to be written.',
+                   lambda: app.extensions['write_behind'].pending())
+
+
+metrics = Metrics()
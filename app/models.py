@@ -1,10 +1,54 @@
 from app import db
+from app.config import Config
+from app.database import CompressedText
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-from sqlalchemy.orm import validates
+from sqlalchemy.orm import deferred, load_only, noload, validates
 import re
 
+PREVIEW_LENGTH = 100  # Characters of each text shown in file listings
+# Extractors used to return these messages as text, and those jobs were marked completed
+EXTRACTION_ERROR_PREFIXES = ('Error extracting text', 'File does not exist.', 'Unsupported file type (')
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
+def normalize_email(email):
+    """Validates an email address and returns it lowercased."""
+    if not email:
+        raise ValueError('Email is required')
+    if not EMAIL_PATTERN.match(email):
+        raise ValueError('Invalid email format')
+    return email.lower()  # Store emails in lowercase
+
+
+def check_username(username):
+    """Validates a username and returns it unchanged."""
+    if not username:
+        raise ValueError('Username is required')
+    if len(username) < 3:
+        raise ValueError('Username must be at least 3 characters long')
+    return username
+
+
+def duplicate_user_errors(error):
+    """
+    Maps a unique constraint violation on the users table to form errors.
+
+    Args:
+        error (IntegrityError): Error raised when committing a user.
+
+    Returns:
+        dict: field name -> message, empty if the error is not a duplicate user.
+    """
+    message = str(getattr(error, 'orig', error)).lower()
+    errors = {}
+    if 'username' in message:
+        errors['username'] = 'Username already taken'
+    if 'email' in message:
+        errors['email'] = 'Email already registered'
+    return errors
+
+
 class User(db.Model, UserMixin):
     __tablename__ = 'users'  # Convention: use plural for table names
     
@@ -19,53 +63,36 @@ class User(db.Model, UserMixin):
     # Relationship with uploaded files
     files = db.relationship(
         'UploadedFile',
-        backref=db.backref('owner', lazy='joined'),
+        backref=db.backref('owner', lazy='select'),
         lazy='dynamic',
         cascade='all, delete-orphan'
     )
 
     @validates('email')
     def validate_email(self, key, email):
-        if not email:
-            raise ValueError('Email is required')
-        
-        # Basic email validation pattern
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(pattern, email):
-            raise ValueError('Invalid email format')
-        
-        if User.query.filter(User.email == email, User.id != self.id).first():
-            raise ValueError('Email already registered')
-        
-        return email.lower()  # Store emails in lowercase
+        # Uniqueness is enforced by the unique index; see duplicate_user_errors()
+        return normalize_email(email)
 
     @validates('username')
     def validate_username(self, key, username):
-        if not username:
-            raise ValueError('Username is required')
-        
-        if len(username) < 3:
-            raise ValueError('Username must be at least 3 characters long')
-        
-        if User.query.filter(User.username == username, User.id != self.id).first():
-            raise ValueError('Username already taken')
-        
-        return username
+        return check_username(username)
 
     def set_password(self, password):
         """Set hashed password."""
         if not password or len(password) < 8:
             raise ValueError('Password must be at least 8 characters long')
-        self.password = generate_password_hash(password)
+        from app.security import password_hasher  # Local import to avoid circular import
+        self.password = password_hasher.hash(password)
 
     def check_password(self, password):
         """Check hashed password."""
-        return check_password_hash(self.password, password)
+        from app.security import password_hasher  # Local import to avoid circular import
+        return password_hasher.verify(self.password, password)
 
     def update_last_login(self):
-        """Update last login timestamp."""
-        self.last_login = datetime.utcnow()
-        db.session.commit()
+        """Record the login time; written in bulk later by the write-behind buffer."""
+        from app.write_behind import write_behind  # Local import to avoid circular import
+        write_behind.touch(User.last_login, self.id)
 
     def get_recent_files(self, limit=5):
         """Get user's most recent uploaded files."""
@@ -77,17 +104,39 @@ class User(db.Model, UserMixin):
 
 class UploadedFile(db.Model):
     __tablename__ = 'uploaded_files'  # Convention: use plural for table names
+    __table_args__ = (
+        # Serves the newest-first keyset pagination of a user's files
+        db.Index('ix_uploaded_files_user_uploaded_at_id', 'user_id', 'uploaded_at', 'id'),
+    )
+
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    # Columns needed to render a file in a listing
+    LISTING_COLUMNS = (
+        'id', 'filename', 'original_filename', 'file_size', 'uploaded_at',
+        'processing_status', 'extracted_preview', 'summary_preview'
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)  # Increased length for long filenames
     original_filename = db.Column(db.String(255), nullable=False)  # Store original filename
     file_size = db.Column(db.Integer, nullable=False)  # Size in bytes
     mime_type = db.Column(db.String(127), nullable=False)
-    extracted_text = db.Column(db.Text, nullable=False)
-    summarized_text = db.Column(db.Text, nullable=False)
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of the uploaded bytes
+    # The full texts can be hundreds of KB, so they are only loaded (and the
+    # extracted text decompressed) when accessed; listings use the short previews instead.
+    # Compressed with the settings of the app writing the row
+    extracted_text = deferred(db.Column(CompressedText(), nullable=False))
+    summarized_text = deferred(db.Column(db.Text, nullable=False))
+    extracted_preview = db.Column(db.String(PREVIEW_LENGTH), nullable=False, default='')
+    summary_preview = db.Column(db.String(PREVIEW_LENGTH), nullable=False, default='')
     uploaded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     last_accessed = db.Column(db.DateTime)
     processing_status = db.Column(db.String(20), nullable=False, default='pending')  # pending, processing, completed, failed
+    processing_error = db.Column(db.String(255))  # Reason the last processing attempt failed
     
     # Foreign key relationship
     user_id = db.Column(
@@ -97,17 +146,59 @@ class UploadedFile(db.Model):
         index=True
     )
 
+    @validates('extracted_text')
+    def validate_extracted_text(self, key, text):
+        self.extracted_preview = (text or '')[:PREVIEW_LENGTH]
+        return text
+
+    @validates('summarized_text')
+    def validate_summarized_text(self, key, text):
+        self.summary_preview = (text or '')[:PREVIEW_LENGTH]
+        return text
+
     @validates('file_size')
     def validate_file_size(self, key, file_size):
-        max_size = 10 * 1024 * 1024  # 10MB
+        max_size = Config.MAX_FILE_SIZE
         if file_size > max_size:
             raise ValueError(f'File size exceeds maximum allowed size of {max_size/1024/1024}MB')
         return file_size
 
     def update_last_accessed(self):
-        """Update last accessed timestamp."""
-        self.last_accessed = datetime.utcnow()
-        db.session.commit()
+        """Record the access time; written in bulk later by the write-behind buffer."""
+        from app.write_behind import write_behind  # Local import to avoid circular import
+        write_behind.touch(UploadedFile.last_accessed, self.id)
+
+    @classmethod
+    def listing_query(cls):
+        """Query loading only the narrow columns a file listing needs."""
+        return cls.query.options(
+            load_only(*(getattr(cls, name) for name in cls.LISTING_COLUMNS)),
+            noload(cls.owner)
+        )
+
+    @classmethod
+    def find_processed(cls, content_hash):
+        """Return a completed upload with the same content whose extraction succeeded, if any."""
+        if not content_hash:
+            return None
+        # The previews are plain text, unlike the compressed extracted text
+        return cls.query.filter(
+            cls.content_hash == content_hash,
+            cls.processing_status == cls.STATUS_COMPLETED,
+            cls.processing_error.is_(None),
+            cls.extracted_preview != '',
+            *(~cls.extracted_preview.startswith(prefix, autoescape=True)
+              for prefix in EXTRACTION_ERROR_PREFIXES)
+        ).order_by(cls.id).first()
+
+    def to_status_dict(self):
+        """Return processing state for the status endpoint."""
+        return {
+            'id': self.id,
+            'filename': self.original_filename,
+            'status': self.processing_status,
+            'error': self.processing_error,
+        }
 
     def get_file_size_display(self):
         """Return human-readable file size."""
@@ -0,0 +1,228 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from app.metrics import stage_seconds
+
+logger = logging.getLogger(__name__)
+
+OCR_CONCURRENCY = int(os.environ.get('OCR_CONCURRENCY') or os.cpu_count() or 2)
+OCR_TARGET_DPI = int(os.environ.get('OCR_TARGET_DPI') or 300)
+OCR_MAX_SIDE = 4000  # Longest side in pixels after downscaling, for images without DPI info
+OCR_TILE_PIXELS = 4_000_000  # Images larger than this are split into strips
+OCR_TILE_SEARCH = 40  # Rows searched around each cut for a blank line to split on
+TESSERACT_CMD = os.environ.get('TESSERACT_CMD')  # tesseract binary, if not on PATH
+
+
+class StageTimer:
+    """Accumulates wall-clock time per processing stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            count, total = self._stages.get(stage, (0, 0.0))
+            self._stages[stage] = (count + 1, total + seconds)
+        # Only visible on /metrics when OCR runs in the web process, not in extraction worker processes
+        stage_seconds.observe(seconds, f'ocr_{stage}')
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: stage -> {'count', 'total_seconds', 'mean_seconds'}
+        """
+        with self._lock:
+            return {
+                stage: {'count': count, 'total_seconds': total, 'mean_seconds': total / count}
+                for stage, (count, total) in self._stages.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+timings = StageTimer()
+
+
+def otsu_threshold(histogram):
+    """
+    Picks the grey level that best separates ink from background.
+
+    Args:
+        histogram (list): 256-bin histogram of a greyscale image.
+
+    Returns:
+        int: Threshold; pixels above it are background.
+    """
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def preprocess(image, source_dpi=None, target_dpi=OCR_TARGET_DPI):
+    """
+    Converts an image to a binarized greyscale image at the target resolution.
+
+    Args:
+        image (PIL.Image.Image): Image to prepare.
+        source_dpi (int, optional): Resolution of the image, read from its metadata if omitted.
+        target_dpi (int): Resolution to downscale to; tesseract gains nothing above ~300 DPI.
+
+    Returns:
+        PIL.Image.Image: Mode 'L' image containing only black and white pixels.
+    """
+    from PIL import Image, ImageOps
+
+    image = ImageOps.exif_transpose(image).convert('L')
+    dpi = source_dpi or (image.info.get('dpi') or (None,))[0]
+    if dpi and dpi > target_dpi:
+        scale = target_dpi / dpi
+    else:
+        scale = min(1.0, OCR_MAX_SIDE / max(image.size))
+    if scale < 1.0:
+        size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+
+    threshold = otsu_threshold(image.histogram())
+    return image.point(lambda value: 255 if value > threshold else 0)
+
+
+def split_into_strips(image, max_pixels=OCR_TILE_PIXELS, search=OCR_TILE_SEARCH):
+    """
+    Splits a tall image into full-width strips, cutting on the blankest nearby row.
+
+    Args:
+        image (PIL.Image.Image): Binarized image.
+        max_pixels (int): Maximum pixels per strip.
+        search (int): Rows above and below each nominal cut to search for a blank row.
+
+    Returns:
+        list: Strips in reading order.
+    """
+    from PIL import Image
+
+    width, height = image.size
+    if width * height <= max_pixels:
+        return [image]
+
+    strip_height = max(1, max_pixels // width)
+    # Mean brightness of every row; 255 means the row contains no ink
+    rows = image.resize((1, height), Image.BOX).tobytes()
+
+    strips, top = [], 0
+    while height - top > strip_height:
+        nominal = top + strip_height
+        low, high = max(top, nominal - search), min(height - 2, nominal + search)
+        blank = max(range(low, high + 1), key=lambda y: (rows[y], -abs(y - nominal)))
+        cut = blank + 1  # The blank row ends the upper strip
+        strips.append(image.crop((0, top, width, cut)))
+        top = cut
+    strips.append(image.crop((0, top, width, height)))
+    return strips
+
+
+class OcrPool:
+    """
+    Runs tesseract with bounded concurrency.
+
+    Large images are split into strips that are recognised in parallel, and the
+    number of tesseract processes running at once never exceeds `concurrency`.
+    The cap is per process: extraction worker processes are each given a share
+    of OCR_CONCURRENCY through init_worker().
+    """
+
+    def __init__(self, concurrency=OCR_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Each tesseract process should use one core; parallelism comes from the pool
+                os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ocr')
+            return self._executor
+
+    def _ocr(self, image):
+        import pytesseract
+        if TESSERACT_CMD:
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        with timings.time('ocr'):
+            return pytesseract.image_to_string(image)
+
+    def image_to_string(self, image, source_dpi=None):
+        """
+        Recognises the text in an image.
+
+        Args:
+            image (PIL.Image.Image): Image to read.
+            source_dpi (int, optional): Resolution of the image if known.
+
+        Returns:
+            str: Recognised text.
+        """
+        start = time.perf_counter()
+        with timings.time('preprocess'):
+            prepared = preprocess(image, source_dpi=source_dpi)
+        with timings.time('tile'):
+            strips = split_into_strips(prepared)
+
+        texts = list(self._get_executor().map(self._ocr, strips))
+        logger.debug(f"OCR of {image.size[0]}x{image.size[1]} image in {len(strips)} strips "
+                     f"took {time.perf_counter() - start:.2f}s")
+        return "\n".join(text.strip("\n") for text in texts if text.strip())
+
+    def configure(self, concurrency):
+        """Sets the concurrency cap; takes effect when the executor is next created."""
+        with self._lock:
+            self.concurrency = max(1, concurrency)
+            # An executor inherited through fork has no threads in this process
+            self._executor = None
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+ocr_pool = OcrPool()
+
+
+def init_worker(concurrency):
+    """
+    Initializer of extraction worker processes.
+
+    Args:
+        concurrency (int): tesseract processes this worker may run at once.
+    """
+    ocr_pool.configure(concurrency)
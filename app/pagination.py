@@ -0,0 +1,141 @@
+import base64
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import or_
+
+
+def encode_cursor(uploaded_at, file_id):
+    """
+    Encodes the sort key of a row as an opaque, URL-safe cursor.
+
+    Args:
+        uploaded_at (datetime): Upload time of the row.
+        file_id (int): Primary key of the row, breaking ties between equal times.
+
+    Returns:
+        str: The cursor.
+    """
+    raw = f"{uploaded_at.isoformat()}|{file_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor made by encode_cursor.
+
+    Returns:
+        tuple | None: (uploaded_at, id), or None if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        uploaded_at, file_id = raw.split('|')
+        return datetime.fromisoformat(uploaded_at), int(file_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """One page of a listing, with cursors to the neighbouring pages."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(query, model, per_page, after=None, before=None):
+    """
+    Pages through `query` newest first using the (uploaded_at, id) sort key.
+
+    Unlike OFFSET, each page is a range scan starting at the cursor, so deep
+    pages cost the same as the first one when (user_id, uploaded_at, id) is indexed.
+
+    Args:
+        query (Query): Query already filtered to one user's files.
+        model: Mapped class with `uploaded_at` and `id` columns.
+        per_page (int): Number of items per page.
+        after (str, optional): Cursor; return the items following it.
+        before (str, optional): Cursor; return the items preceding it.
+
+    Returns:
+        KeysetPage: The page.
+    """
+    newest_first = (model.uploaded_at.desc(), model.id.desc())
+    oldest_first = (model.uploaded_at.asc(), model.id.asc())
+    after_key = decode_cursor(after) if after else None
+    before_key = decode_cursor(before) if before else None
+
+    if before_key is not None:
+        uploaded_at, file_id = before_key
+        rows = query.filter(
+            model.uploaded_at >= uploaded_at,
+            or_(model.uploaded_at > uploaded_at, model.id > file_id)
+        ).order_by(*oldest_first).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_newer, has_older = has_more, True
+    else:
+        if after_key is not None:
+            uploaded_at, file_id = after_key
+            # The plain bound on uploaded_at lets the index seek straight to the cursor
+            query = query.filter(
+                model.uploaded_at <= uploaded_at,
+                or_(model.uploaded_at < uploaded_at, model.id < file_id)
+            )
+        # One extra row tells whether another page follows without a COUNT
+        rows = query.order_by(*newest_first).limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_newer, has_older = after_key is not None, len(rows) > per_page
+
+    next_cursor = prev_cursor = None
+    if items and has_older:
+        next_cursor = encode_cursor(items[-1].uploaded_at, items[-1].id)
+    if items and has_newer:
+        prev_cursor = encode_cursor(items[0].uploaded_at, items[0].id)
+    return KeysetPage(items, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+class CountCache:
+    """
+    Remembers per-key row counts for a short time.
+
+    Counting every row of a large listing on each page view is as slow as the
+    deep OFFSET it replaces, and an approximate total is fine for display.
+
+    Args:
+        ttl (float): Seconds a count stays valid.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def get(self, key, compute):
+        """Returns the cached count for `key`, calling `compute()` when it is missing or stale."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                return entry[0]
+        count = compute()
+        with self._lock:
+            self._counts[key] = (count, now)
+        return count
+
+    def invalidate(self, key):
+        with self._lock:
+            self._counts.pop(key, None)
+
+
+file_counts = CountCache()
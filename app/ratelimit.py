@@ -0,0 +1,183 @@
+import os
+import time
+import sqlite3
+import logging
+import itertools
+import threading
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """
+    Token buckets held in this process.
+
+    Buckets are spread over a fixed set of locks by key, so concurrent
+    requests only contend when their keys land on the same shard.
+
+    Args:
+        shards (int): Number of independently locked shards.
+        max_keys (int): Buckets kept per shard before idle ones are pruned.
+    """
+
+    def __init__(self, shards=64, max_keys=10000):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.max_keys = max_keys
+
+    def hit(self, key, rate, burst, now=None):
+        now = time.monotonic() if now is None else now
+        buckets, lock = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            tokens, updated = buckets.get(key, (burst, now, rate, burst))[:2]
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Each bucket keeps its own limits, as keys of different kinds share a shard
+            buckets[key] = (tokens, now, rate, burst)
+            if len(buckets) > self.max_keys:
+                self._prune(buckets, now)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    @staticmethod
+    def _prune(buckets, now):
+        # A bucket that has refilled completely holds no information
+        for key in [key for key, (tokens, updated, rate, burst) in buckets.items()
+                    if tokens + (now - updated) * rate >= burst]:
+            del buckets[key]
+
+    def reset(self):
+        for buckets, lock in self._shards:
+            with lock:
+                buckets.clear()
+
+
+class SQLiteBackend:
+    """
+    Token buckets in a SQLite file shared by every worker process on the host.
+
+    The file is separate from the application database. Each attempt is a
+    single UPSERT, which refills and spends a token atomically. Every
+    `prune_every` attempts, buckets idle for longer than `idle_after` seconds
+    are deleted; set it to at least the time a bucket takes to refill.
+
+    Args:
+        path (str): Location of the SQLite file.
+        prune_every (int): Attempts made through this instance between prunes.
+        idle_after (float): Seconds after which an untouched bucket is deleted.
+    """
+
+    def __init__(self, path, prune_every=1000, idle_after=3600):
+        self.path = path
+        self.prune_every = prune_every
+        self.idle_after = idle_after
+        self._hits = itertools.count(1)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets "
+                         "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        conn = self._connect()
+        if next(self._hits) % self.prune_every == 0:
+            self.prune(now - self.idle_after)
+        refilled = "MIN(:burst, tokens + (:now - updated) * :rate)"
+        cursor = conn.execute(
+            "INSERT INTO buckets (key, tokens, updated) VALUES (:key, :burst - 1, :now) "
+            f"ON CONFLICT(key) DO UPDATE SET tokens = {refilled} - 1, updated = :now "
+            f"WHERE {refilled} >= 1",
+            {'key': key, 'rate': rate, 'burst': burst, 'now': now}
+        )
+        if cursor.rowcount:
+            return True, 0.0
+        row = conn.execute(
+            f"SELECT {refilled} FROM buckets WHERE key = :key",
+            {'key': key, 'rate': rate, 'burst': burst, 'now': now}
+        ).fetchone()
+        tokens = row[0] if row else 0.0
+        return False, max(0.0, (1 - tokens) / rate)
+
+    def prune(self, older_than):
+        """Deletes buckets untouched since `older_than` (a time.time() value)."""
+        self._connect().execute("DELETE FROM buckets WHERE updated < ?", (older_than,))
+
+    def reset(self):
+        self._connect().execute("DELETE FROM buckets")
+
+
+class RateLimiter:
+    """
+    Flask extension limiting login attempts per client IP and per username.
+
+    Each key has a token bucket holding up to `burst` attempts that refills at
+    `per_minute` attempts a minute. Configured with RATELIMIT_BACKEND
+    ('memory', 'sqlite' or 'none'), RATELIMIT_SQLITE_PATH and the
+    LOGIN_LIMIT_* settings.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        name = app.config.get('RATELIMIT_BACKEND') or 'memory'
+        if name == 'memory':
+            backend = MemoryBackend()
+        elif name == 'sqlite':
+            config = app.config
+            # Longest time a login bucket takes to refill completely
+            idle_after = max(config['LOGIN_LIMIT_IP_BURST'] * 60 / config['LOGIN_LIMIT_IP_PER_MINUTE'],
+                             config['LOGIN_LIMIT_USER_BURST'] * 60 / config['LOGIN_LIMIT_USER_PER_MINUTE'])
+            backend = SQLiteBackend(config['RATELIMIT_SQLITE_PATH'], idle_after=idle_after)
+        elif name == 'none':
+            backend = None
+        else:
+            raise ValueError(f"Unknown rate limit backend: {name}")
+        app.extensions['ratelimit'] = backend
+
+    @property
+    def backend(self):
+        return current_app.extensions['ratelimit']
+
+    def check_login(self, ip, username):
+        """
+        Spends one login attempt for the IP and the username.
+
+        Args:
+            ip (str): Client address.
+            username (str): Username being tried, may be empty.
+
+        Returns:
+            tuple: (allowed, seconds until the next attempt is allowed)
+        """
+        backend = self.backend
+        if backend is None:
+            return True, 0.0
+        config = current_app.config
+        allowed, retry_after = backend.hit(
+            f'ip:{ip}', config['LOGIN_LIMIT_IP_PER_MINUTE'] / 60, config['LOGIN_LIMIT_IP_BURST'])
+        if allowed and username:
+            # Usernames are keyed case-insensitively so variants share a bucket
+            allowed, retry_after = backend.hit(
+                f'user:{username.strip().lower()}',
+                config['LOGIN_LIMIT_USER_PER_MINUTE'] / 60, config['LOGIN_LIMIT_USER_BURST'])
+        if not allowed:
+            logger.warning(f"Login rate limit exceeded for {ip} / {username}")
+        return allowed, retry_after
+
+
+rate_limiter = RateLimiter()
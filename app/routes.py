@@ -1,13 +1,24 @@
-import os
-from flask import render_template, request, redirect, url_for, flash, current_app
+from flask import (render_template, request, redirect, url_for, flash, current_app, jsonify, make_response,
+                   Response, stream_with_context)
 from flask_login import login_user, login_required, logout_user, current_user
 from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
-from app.forms import RegistrationForm, LoginForm, UploadForm
-from app.models import User, UploadedFile
-from app.utils import extract_text_from_file, summarize_text
+from sqlalchemy.exc import IntegrityError
+from app.forms import RegistrationForm, LoginForm, UploadForm, BatchUploadForm
+from app.models import User, UploadedFile, duplicate_user_errors
+from app.tasks import pipeline
+from app.uploads import receive_upload, iter_batch_files
+from app.storage import storage
+from app.pagination import keyset_paginate, file_counts
+from app.search import search_index
+from app.security import password_hasher
+from app.ratelimit import rate_limiter
+from app.extractors import registry
+from app.metrics import timed
+from app.streaming import summary_streams, sse_event, DELTA, DONE, ERROR
 from flask import Blueprint
-from app import db, login_manager
+from app import db
+import math
+import time
 import logging
 from datetime import datetime
 from functools import wraps
@@ -18,21 +29,28 @@ logger = logging.getLogger(__name__)
 
 main_bp = Blueprint('main', __name__)
 
-# Constants
-ALLOWED_EXTENSIONS = {'txt', 'pdf', 'doc', 'docx'}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def unsupported_content(received):
+    """Error message if the sniffed content has no extractor, else None."""
+    if registry.find(received.mime_type) is None:
+        return f'File content ({received.mime_type}) is not a supported document type'
+    return None
 
 def rate_limit(func):
+    """Rejects login attempts over the per-IP or per-username limit before the view runs."""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if request.endpoint == "main.login":
-            ip = request.remote_addr
-            # Implementation of rate limiting logic here
-            # This is a placeholder - you'd want to use Redis or similar for production
-            pass
+        if request.method == 'POST':
+            allowed, retry_after = rate_limiter.check_login(
+                request.remote_addr or 'unknown', request.form.get('username', ''))
+            if not allowed:
+                wait = math.ceil(retry_after)
+                flash(f'Too many login attempts. Please try again in {wait} seconds.', 'danger')
+                response = make_response(render_template('login.html', form=LoginForm()), 429)
+                response.headers['Retry-After'] = str(wait)
+                return response
         return func(*args, **kwargs)
     return wrapper
 
@@ -44,11 +62,10 @@ def register():
     form = RegistrationForm()
     if form.validate_on_submit():
         try:
-            hashed_password = generate_password_hash(form.password.data, method='pbkdf2:sha256')
             user = User(
                 username=form.username.data,
                 email=form.email.data,
-                password=hashed_password,
+                password=password_hasher.hash(form.password.data),
                 created_at=datetime.utcnow()
             )
             db.session.add(user)
@@ -56,6 +73,18 @@ def register():
             logger.info(f"New user registered: {user.username}")
             flash('Your account has been created! Please log in.', 'success')
             return redirect(url_for('main.login'))
+        except IntegrityError as e:
+            db.session.rollback()
+            errors = duplicate_user_errors(e)
+            if not errors:
+                logger.error(f"Registration error: {str(e)}")
+                flash('An error occurred during registration. Please try again.', 'danger')
+            for field, message in errors.items():
+                getattr(form, field).errors.append(message)
+                flash(message, 'danger')
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), 'danger')
         except Exception as e:
             db.session.rollback()
             logger.error(f"Registration error: {str(e)}")
@@ -68,40 +97,6 @@ def home():
     welcome_message = f"Welcome{' back, ' + current_user.username if current_user.is_authenticated else ''}!"
     return render_template('home.html', message=welcome_message)
 
-def process_file(filepath):
-    try:
-        if not os.path.exists(filepath):
-            raise FileNotFoundError("Upload file not found")
-
-        file_size = os.path.getsize(filepath)
-        if file_size > MAX_FILE_SIZE:
-            raise ValueError("File size exceeds maximum limit")
-
-        extracted_text = extract_text_from_file(filepath)
-        if not extracted_text:
-            raise ValueError("No text could be extracted from the file")
-
-        summarized_text = summarize_text(extracted_text)
-        filename = os.path.basename(filepath)
-        
-        uploaded_file = UploadedFile(
-            filename=filename,
-            extracted_text=extracted_text,
-            summarized_text=summarized_text,
-            user_id=current_user.id,
-            upload_date=datetime.utcnow(),
-            file_size=file_size
-        )
-
-        db.session.add(uploaded_file)
-        db.session.commit()
-        logger.info(f"File processed successfully: {filename}")
-        return True
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Error processing file {filepath}: {str(e)}")
-        raise
-
 @main_bp.route('/upload', methods=['GET', 'POST'])
 @login_required
 def upload():
@@ -112,33 +107,223 @@ def upload():
         if file and allowed_file(file.filename):
             try:
                 filename = secure_filename(file.filename)
-                upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                
-                # Ensure upload directory exists
-                os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                
-                file.save(upload_path)
-                process_file(upload_path)
-                
-                flash(f'File "{filename}" uploaded and processed successfully!', 'success')
+
+                # Stored under its content hash, so equal names never overwrite each other
+                received = receive_upload(file)
+                error = unsupported_content(received)
+                if error:
+                    received.discard()
+                    flash(error, 'danger')
+                    return render_template('upload.html', form=form), 400
+                with timed('store'):
+                    storage.put(received)
+
+                uploaded_file = UploadedFile(
+                    filename=filename,
+                    original_filename=file.filename,
+                    file_size=received.size,
+                    mime_type=received.mime_type,
+                    content_hash=received.digest,
+                    extracted_text='',
+                    summarized_text='',
+                    processing_status=UploadedFile.STATUS_PENDING,
+                    user_id=current_user.id
+                )
+                db.session.add(uploaded_file)
+                with timed('db_commit'):
+                    db.session.commit()
+                file_counts.invalidate(current_user.id)
+                pipeline.submit(uploaded_file.id, uploaded_file.mime_type)
+
+                if request.accept_mimetypes.best == 'application/json':
+                    return jsonify({
+                        'job_id': uploaded_file.id,
+                        'status_url': url_for('main.upload_status', file_id=uploaded_file.id)
+                    }), 202
+
+                flash(f'File "{filename}" uploaded and queued for processing (job {uploaded_file.id}).', 'success')
                 return redirect(url_for('main.profile'))
             except Exception as e:
+                db.session.rollback()
                 logger.error(f"Upload error: {str(e)}")
                 flash(f'Error processing file: {str(e)}', 'danger')
         else:
-            flash('Invalid file type. Allowed types are: ' + ', '.join(ALLOWED_EXTENSIONS), 'danger')
+            allowed = ', '.join(sorted(current_app.config['ALLOWED_EXTENSIONS']))
+            flash('Invalid file type. Allowed types are: ' + allowed, 'danger')
 
     return render_template('upload.html', form=form)
 
+@main_bp.route('/upload/batch', methods=['GET', 'POST'])
+@login_required
+def batch_upload():
+    # A batch may be much larger than a single upload
+    request.max_content_length = current_app.config['MAX_BATCH_SIZE']
+    form = BatchUploadForm()
+
+    if form.validate_on_submit():
+        manifest = []
+        rows = []
+        try:
+            for name, received, error in iter_batch_files(form.files.data, allowed_file):
+                error = error or unsupported_content(received)
+                if error:
+                    if received is not None:
+                        received.discard()
+                    manifest.append({'filename': name, 'status': 'rejected', 'error': error})
+                    continue
+                with timed('store'):
+                    storage.put(received)
+                rows.append(UploadedFile(
+                    filename=secure_filename(name.rsplit('/', 1)[-1]),
+                    original_filename=name[:255],
+                    file_size=received.size,
+                    mime_type=received.mime_type,
+                    content_hash=received.digest,
+                    extracted_text='',
+                    summarized_text='',
+                    processing_status=UploadedFile.STATUS_PENDING,
+                    user_id=current_user.id
+                ))
+                manifest.append({'filename': name, 'status': 'queued'})
+
+            # All rows go in with a single transaction
+            db.session.add_all(rows)
+            with timed('db_commit'):
+                db.session.flush()
+                jobs = [(row.id, row.mime_type) for row in rows]
+                db.session.commit()
+            file_counts.invalidate(current_user.id)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Batch upload error: {str(e)}")
+            return jsonify({'error': f'Error processing batch: {str(e)}'}), 500
+
+        job_ids = [job_id for job_id, _ in jobs]
+        queued = iter(job_ids)
+        for entry in manifest:
+            if entry['status'] == 'queued':
+                entry['job_id'] = next(queued)
+                entry['status_url'] = url_for('main.upload_status', file_id=entry['job_id'])
+        for job_id, mime_type in jobs:
+            pipeline.submit(job_id, mime_type)
+        logger.info(f"Batch upload queued {len(job_ids)} files, rejected {len(manifest) - len(job_ids)}")
+
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'files': manifest}), 202 if job_ids else 400
+
+        flash(f'Queued {len(job_ids)} files for processing, rejected {len(manifest) - len(job_ids)}.',
+              'success' if job_ids else 'danger')
+        return redirect(url_for('main.profile'))
+
+    return render_template('batch_upload.html', form=form)
+
+@main_bp.route('/upload/<int:file_id>/status')
+@login_required
+def upload_status(file_id):
+    uploaded_file = UploadedFile.query.filter_by(id=file_id, user_id=current_user.id).first()
+    if uploaded_file is None:
+        return jsonify({'error': 'File not found'}), 404
+    uploaded_file.update_last_accessed()
+    return jsonify(uploaded_file.to_status_dict())
+
+def _summary_events(file_id, timeout, poll):
+    """
+    Yields the Server-Sent Events of an upload's summary.
+
+    A job running in this process is followed through its channel, piece by
+    piece. Otherwise the row is polled until the job finishes elsewhere, and
+    the whole summary arrives as the final event. After `timeout` seconds the
+    stream ends without a final event and the browser reconnects after `poll`.
+    """
+    payloads = {DELTA: 'text', DONE: 'summary', ERROR: 'error'}
+    deadline = time.monotonic() + timeout
+    yield f"retry: {int(poll * 1000)}\n\n"
+    while True:
+        channel = summary_streams.get(file_id)
+        if channel is not None:
+            for item in channel.follow(timeout=poll):
+                if item is None:
+                    if time.monotonic() > deadline:
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                event, data = item
+                yield sse_event(event, {payloads[event]: data})
+                if event != DELTA:
+                    return
+            return
+
+        row = db.session.query(
+            UploadedFile.processing_status, UploadedFile.summarized_text, UploadedFile.processing_error
+        ).filter_by(id=file_id).first()
+        db.session.rollback()  # End the read so the next poll sees other processes' commits
+        if row is None:
+            yield sse_event(ERROR, {'error': 'File not found'})
+            return
+        if row.processing_status == UploadedFile.STATUS_COMPLETED:
+            yield sse_event(DONE, {'summary': row.summarized_text})
+            return
+        if row.processing_status == UploadedFile.STATUS_FAILED:
+            yield sse_event(ERROR, {'error': row.processing_error})
+            return
+        if time.monotonic() > deadline:
+            return
+        yield ": keep-alive\n\n"
+        time.sleep(poll)
+
+@main_bp.route('/upload/<int:file_id>/summary/stream')
+@login_required
+def summary_stream(file_id):
+    """Streams an upload's summary as Server-Sent Events while it is generated."""
+    uploaded_file = UploadedFile.query.filter_by(id=file_id, user_id=current_user.id).first()
+    if uploaded_file is None:
+        return jsonify({'error': 'File not found'}), 404
+    uploaded_file.update_last_accessed()
+    db.session.rollback()
+
+    config = current_app.config
+    user_id = current_user.id
+    if not summary_streams.add_reader(user_id, config['SUMMARY_STREAMS_PER_USER']):
+        # EventSource does not retry a refused stream; the page polls the job status instead
+        response = jsonify({'error': 'Too many open summary streams'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(math.ceil(config['SUMMARY_STREAM_TIMEOUT']))
+        return response
+    events = _summary_events(file_id, config['SUMMARY_STREAM_TIMEOUT'], config['SUMMARY_STREAM_POLL'])
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Keep nginx from buffering the events
+    streams = summary_streams.channels  # The response is closed outside the app context
+    response.call_on_close(lambda: streams.remove_reader(user_id))
+    return response
+
+@main_bp.route('/search')
+@login_required
+def search():
+    query = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    hits = search_index.search(current_user.id, query, limit=limit) if query else []
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'query': query, 'results': [hit.to_dict() for hit in hits]})
+    return render_template('search.html', query=query, hits=hits)
+
 @main_bp.route('/profile')
 @login_required
 def profile():
-    page = request.args.get('page', 1, type=int)
     per_page = 10
-    uploaded_files = UploadedFile.query.filter_by(user_id=current_user.id)\
-        .order_by(UploadedFile.uploaded_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
-    
+    user_id = current_user.id
+    uploaded_files = keyset_paginate(
+        UploadedFile.listing_query().filter_by(user_id=user_id),
+        UploadedFile,
+        per_page,
+        after=request.args.get('after'),
+        before=request.args.get('before')
+    )
+    uploaded_files.total = file_counts.get(
+        user_id, lambda: UploadedFile.query.filter_by(user_id=user_id).count()
+    )
+
     return render_template('profile.html', 
                          files=uploaded_files, 
                          username=current_user.username)
@@ -152,8 +337,11 @@ def login():
     if form.validate_on_submit():
         try:
             user = User.query.filter_by(username=form.username.data).first()
-            if user and check_password_hash(user.password, form.password.data):
+            if user and user.check_password(form.password.data):
+                if password_hasher.needs_rehash(user.password):
+                    password_hasher.rehash_later(user.id, user.password, form.password.data)
                 login_user(user)
+                user.update_last_login()
                 logger.info(f"User logged in: {user.username}")
                 flash(f'Welcome back, {user.username}!', 'success')
                 next_page = request.args.get('next')
@@ -176,10 +364,6 @@ def logout():
     flash('You have been logged out. See you soon!', 'info')
     return redirect(url_for('main.login'))
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
 # Error handlers
 @main_bp.errorhandler(404)
 def not_found_error(error):
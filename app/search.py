@@ -0,0 +1,303 @@
+import re
+import heapq
+import logging
+from markupsafe import Markup, escape
+from flask import current_app
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Snippet highlight markers; control characters never appear in extracted text
+# and survive HTML escaping, so they are swapped for <mark> afterwards
+_OPEN, _CLOSE = '\x02', '\x03'
+SNIPPET_WORDS = 16
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def query_terms(query):
+    """Splits free text typed by a user into search terms."""
+    return _TERM.findall(query or '')
+
+
+def owner_token(user_id):
+    """Token identifying a user's files in the FTS5 index."""
+    return f'u{user_id}'
+
+
+def _highlight(snippet):
+    return Markup(str(escape(snippet)).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
+
+
+class SearchHit:
+    """One search result: the file, its score and a highlighted snippet."""
+
+    def __init__(self, file_id, filename, rank, snippet):
+        self.file_id = file_id
+        self.filename = filename
+        self.rank = rank
+        self.snippet = snippet
+
+    def to_dict(self):
+        return {
+            'id': self.file_id,
+            'filename': self.filename,
+            'rank': self.rank,
+            'snippet': str(self.snippet),
+        }
+
+
+class SearchBackend:
+    """
+    Full-text index over the extracted and summarized text of uploads.
+
+    Backends are kept up to date one file at a time by the processing pipeline.
+    """
+
+    def index(self, session, uploaded_file):
+        """Adds or replaces a processed file in the index."""
+        raise NotImplementedError
+
+    def remove(self, session, file_id):
+        raise NotImplementedError
+
+    def rebuild(self, session):
+        """Indexes every completed file from scratch; returns the number indexed."""
+        raise NotImplementedError
+
+    def search(self, session, user_id, query, limit=20):
+        """
+        Finds a user's files matching every term of `query`.
+
+        Args:
+            session (Session): Database session.
+            user_id (int): Owner whose files are searched.
+            query (str): Free text typed by the user.
+            limit (int): Maximum number of hits.
+
+        Returns:
+            list: SearchHit objects, best match first.
+        """
+        raise NotImplementedError
+
+
+class Fts5Backend(SearchBackend):
+    """
+    SQLite FTS5 index, ranked with BM25.
+
+    The index is external-content: it keeps no copy of the texts, and reads
+    them for snippets through a view over uploaded_files that decompresses the
+    extracted text with the decompress_text() SQL function. Triggers on
+    uploaded_files update the index in the same transaction as the row, so
+    indexing needs no separate step. rowid is the UploadedFile id. The owner is
+    stored as an indexed token ('u<id>') and matched alongside the query terms,
+    so FTS5 intersects the owner's posting list with the terms' instead of
+    ranking every user's matches and filtering them afterwards.
+    """
+
+    TABLE = 'uploaded_files_fts'
+    CONTENT = 'uploaded_files_search'
+    # Columns user queries match and snippets come from; owner is only ever matched by its own filter
+    CONTENT_COLUMNS = ('filename', 'extracted_text', 'summarized_text')
+    # Also in migration e7b9d1f3a5c8, which creates them for existing databases
+    SCHEMA = (
+        f"CREATE VIEW IF NOT EXISTS {CONTENT} AS "
+        "SELECT id, original_filename AS filename, decompress_text(extracted_text) AS extracted_text, "
+        "summarized_text, 'u' || user_id AS owner FROM uploaded_files WHERE processing_status = 'completed'",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+        "filename, extracted_text, summarized_text, owner, "
+        f"content = '{CONTENT}', content_rowid = 'id', tokenize = 'porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLE}_insert AFTER INSERT ON uploaded_files "
+        "WHEN new.processing_status = 'completed' BEGIN "
+        f"INSERT INTO {TABLE} (rowid, filename, extracted_text, summarized_text, owner) VALUES (new.id, "
+        "new.original_filename, decompress_text(new.extracted_text), new.summarized_text, 'u' || new.user_id); "
+        "END",
+        # Only the indexed columns, so last_accessed updates don't reindex the file
+        f"CREATE TRIGGER IF NOT EXISTS {TABLE}_update AFTER UPDATE OF "
+        "original_filename, extracted_text, summarized_text, user_id, processing_status ON uploaded_files BEGIN "
+        f"INSERT INTO {TABLE} ({TABLE}, rowid, filename, extracted_text, summarized_text, owner) "
+        "SELECT 'delete', old.id, old.original_filename, decompress_text(old.extracted_text), "
+        "old.summarized_text, 'u' || old.user_id WHERE old.processing_status = 'completed'; "
+        f"INSERT INTO {TABLE} (rowid, filename, extracted_text, summarized_text, owner) "
+        "SELECT new.id, new.original_filename, decompress_text(new.extracted_text), new.summarized_text, "
+        "'u' || new.user_id WHERE new.processing_status = 'completed'; "
+        "END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLE}_delete AFTER DELETE ON uploaded_files "
+        "WHEN old.processing_status = 'completed' BEGIN "
+        f"INSERT INTO {TABLE} ({TABLE}, rowid, filename, extracted_text, summarized_text, owner) "
+        "VALUES ('delete', old.id, old.original_filename, decompress_text(old.extracted_text), "
+        "old.summarized_text, 'u' || old.user_id); "
+        "END",
+    )
+
+    def __init__(self):
+        self._table_ready = False
+
+    def _ensure_table(self, session):
+        if self._table_ready:
+            return
+        exists = session.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                                 {'name': self.TABLE}).scalar()
+        for statement in self.SCHEMA:
+            session.execute(text(statement))
+        if not exists:
+            # Files completed before the triggers existed
+            session.execute(text(f"INSERT INTO {self.TABLE} ({self.TABLE}) VALUES ('rebuild')"))
+        self._table_ready = True
+
+    def index(self, session, uploaded_file):
+        # The triggers indexed the file when its row was written
+        self._ensure_table(session)
+
+    def remove(self, session, file_id):
+        # Removed by the delete trigger along with the row
+        self._ensure_table(session)
+
+    def rebuild(self, session):
+        self._ensure_table(session)
+        session.execute(text(f"INSERT INTO {self.TABLE} ({self.TABLE}) VALUES ('rebuild')"))
+        session.execute(text(f"INSERT INTO {self.TABLE} ({self.TABLE}) VALUES ('optimize')"))
+        return session.execute(text(f"SELECT COUNT(*) FROM {self.CONTENT}")).scalar()
+
+    def search(self, session, user_id, query, limit=20):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        self._ensure_table(session)
+        # Quoting each term keeps FTS5 query syntax in user input from being interpreted,
+        # and the column filter keeps terms such as 'u1' from matching the owner tokens
+        match = (f'owner : {owner_token(user_id)} AND '
+                 f'{{{" ".join(self.CONTENT_COLUMNS)}}} : (' + ' '.join(f'"{term}"' for term in terms) + ')')
+        snippets = ', '.join(f"snippet({self.TABLE}, {column}, :open, :close, '…', :words)"
+                             for column in range(len(self.CONTENT_COLUMNS)))
+        rows = session.execute(
+            text(f"SELECT rowid, filename, bm25({self.TABLE}, 4.0, 1.0, 2.0, 0.0) AS score, {snippets} "
+                 f"FROM {self.TABLE} WHERE {self.TABLE} MATCH :match "
+                 "ORDER BY score LIMIT :limit"),
+            {'open': _OPEN, 'close': _CLOSE, 'words': SNIPPET_WORDS, 'match': match, 'limit': limit}
+        )
+        # The snippet of the content column with the most highlighted terms, never the owner's
+        return [SearchHit(file_id, filename, -score,
+                          _highlight(max(snippets, key=lambda snippet: (snippet or '').count(_OPEN)) or ''))
+                for file_id, filename, score, *snippets in rows]
+
+
+class LikeBackend(SearchBackend):
+    """
+    Fallback for databases without a configured full-text index.
+
+    Every term must appear, case-insensitively, in the filename, the summary
+    or the extracted text. The extracted text is stored compressed, so the
+    database can't search it: the user's completed files are read in batches
+    and matched here, keeping only the best `limit` for snippets. Every file
+    of the user is decompressed, so this is only suitable for small collections.
+    """
+
+    # Weights of a term occurrence in each text when ranking, as in the FTS5 ranking
+    FILENAME_WEIGHT, SUMMARY_WEIGHT, TEXT_WEIGHT = 4, 2, 1
+    SCAN_BATCH = 100  # Files read and decompressed at a time
+
+    def index(self, session, uploaded_file):
+        pass
+
+    def remove(self, session, file_id):
+        pass
+
+    def rebuild(self, session):
+        return 0
+
+    def search(self, session, user_id, query, limit=20):
+        from app.models import UploadedFile
+
+        terms = query_terms(query)
+        if not terms:
+            return []
+        rows = session.query(
+            UploadedFile.id, UploadedFile.original_filename, UploadedFile.summarized_text,
+            UploadedFile.extracted_text
+        ).filter(
+            UploadedFile.user_id == user_id,
+            UploadedFile.processing_status == UploadedFile.STATUS_COMPLETED
+        ).order_by(UploadedFile.id).yield_per(self.SCAN_BATCH)
+
+        best = []  # Heap of the best (rank, -id, filename, body) so far
+        lowered = [term.lower() for term in terms]
+        for file_id, filename, summary, extracted in rows:
+            texts = (filename.lower(), (summary or '').lower(), (extracted or '').lower())
+            if not all(any(term in text for text in texts) for term in lowered):
+                continue
+            rank = sum(self.FILENAME_WEIGHT * texts[0].count(term) + self.SUMMARY_WEIGHT * texts[1].count(term)
+                       + self.TEXT_WEIGHT * texts[2].count(term) for term in lowered)
+            body = summary if all(term in texts[1] for term in lowered) else extracted or ''
+            entry = (rank, -file_id, filename, body)
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+        return [SearchHit(-negative_id, filename, rank, _highlight(self._snippet(body, terms)))
+                for rank, negative_id, filename, body in sorted(best, reverse=True)]
+
+    @staticmethod
+    def _snippet(body, terms):
+        pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+        words = body.split()
+        first = next((i for i, word in enumerate(words) if pattern.search(word)), 0)
+        start = max(0, first - SNIPPET_WORDS // 4)
+        window = ' '.join(words[start:start + SNIPPET_WORDS])
+        snippet = pattern.sub(lambda m: f'{_OPEN}{m.group(0)}{_CLOSE}', window)
+        if start > 0:
+            snippet = '…' + snippet
+        if start + SNIPPET_WORDS < len(words):
+            snippet += '…'
+        return snippet
+
+
+BACKENDS = {
+    'fts5': Fts5Backend,
+    'like': LikeBackend,
+}
+
+
+class SearchIndex:
+    """Flask extension selecting a search backend for each application."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        name = app.config.get('SEARCH_BACKEND') or 'auto'
+        if name == 'auto':
+            uri = app.config['SQLALCHEMY_DATABASE_URI']
+            name = 'fts5' if uri.startswith('sqlite') else 'like'
+        app.extensions['search'] = BACKENDS[name]()
+
+    @property
+    def backend(self):
+        return current_app.extensions['search']
+
+    def index(self, uploaded_file):
+        """Indexes a processed file and commits; failures are logged, not raised."""
+        from app import db
+        try:
+            self.backend.index(db.session, uploaded_file)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error indexing upload {uploaded_file.id} for search: {str(e)}")
+
+    def remove(self, file_id):
+        from app import db
+        self.backend.remove(db.session, file_id)
+
+    def rebuild(self):
+        from app import db
+        count = self.backend.rebuild(db.session)
+        db.session.commit()
+        return count
+
+    def search(self, user_id, query, limit=20):
+        from app import db
+        return self.backend.search(db.session, user_id, query, limit=limit)
+
+
+search_index = SearchIndex()
@@ -0,0 +1,178 @@
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordPolicy:
+    """
+    How new password hashes are made.
+
+    Both algorithms come from hashlib: PBKDF2 is tuned by its iteration count,
+    scrypt by its CPU/memory cost `n`, block size `r` and parallelism `p`.
+
+    Args:
+        algorithm (str): 'pbkdf2' or 'scrypt'.
+        digest (str): Hash function used by PBKDF2.
+        iterations (int, optional): PBKDF2 iterations, werkzeug's default if omitted.
+        scrypt_n (int): scrypt cost; memory use is about 128 * n * r bytes.
+        scrypt_r (int): scrypt block size.
+        scrypt_p (int): scrypt parallelism.
+    """
+
+    def __init__(self, algorithm='pbkdf2', digest='sha256', iterations=None,
+                 scrypt_n=2 ** 15, scrypt_r=8, scrypt_p=1):
+        if algorithm not in ('pbkdf2', 'scrypt'):
+            raise ValueError(f"Unsupported password hash algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.digest = digest
+        self.iterations = iterations or DEFAULT_PBKDF2_ITERATIONS
+        self.scrypt_n = scrypt_n
+        self.scrypt_r = scrypt_r
+        self.scrypt_p = scrypt_p
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            algorithm=config.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2'),
+            digest=config.get('PASSWORD_HASH_DIGEST', 'sha256'),
+            iterations=config.get('PASSWORD_HASH_ITERATIONS'),
+            scrypt_n=config.get('PASSWORD_SCRYPT_N', 2 ** 15),
+            scrypt_r=config.get('PASSWORD_SCRYPT_R', 8),
+            scrypt_p=config.get('PASSWORD_SCRYPT_P', 1),
+        )
+
+    @property
+    def method(self):
+        """werkzeug method string, also the prefix of every hash made with it."""
+        if self.algorithm == 'scrypt':
+            return f'scrypt:{self.scrypt_n}:{self.scrypt_r}:{self.scrypt_p}'
+        return f'pbkdf2:{self.digest}:{self.iterations}'
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with different settings."""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def __repr__(self):
+        return f"<PasswordPolicy {self.method}>"
+
+
+class PasswordHasher:
+    """
+    Flask extension hashing and checking passwords under the configured policy.
+
+    Hashing runs on a small dedicated pool of PASSWORD_HASH_WORKERS threads.
+    hashlib releases the GIL while it works, so other request threads keep
+    running, and a login burst can't use more cores than the pool has.
+    With PASSWORD_HASH_WORKERS = 0 everything runs on the calling thread.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        workers = app.config.get('PASSWORD_HASH_WORKERS', 0)
+        state = _HasherState(PasswordPolicy.from_config(app.config), workers)
+        app.extensions['password_hasher'] = state
+        atexit.register(state.shutdown)
+
+    @property
+    def _state(self):
+        return current_app.extensions['password_hasher']
+
+    @property
+    def policy(self):
+        return self._state.policy
+
+    def hash(self, password):
+        """Hashes a password with the current policy."""
+        state = self._state
+        return state.run(state.policy.hash, password)
+
+    def verify(self, password_hash, password):
+        """Checks a password against a stored hash made with any policy."""
+        return self._state.run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return self._state.policy.needs_rehash(password_hash)
+
+    def rehash_later(self, user_id, password_hash, password):
+        """
+        Re-hashes a user's password with the current policy, off the request thread.
+
+        The stored hash is only replaced if it still equals `password_hash`, so a
+        password change made in the meantime is never overwritten.
+
+        Args:
+            user_id (int): User whose password is re-hashed.
+            password_hash (str): Hash that was just verified.
+            password (str): The plaintext password that matched it.
+        """
+        app = current_app._get_current_object()
+        state = self._state
+        if state.workers:
+            state.executor().submit(_rehash, app, user_id, password_hash, password)
+        else:
+            _rehash(app, user_id, password_hash, password)
+
+    def shutdown(self, wait=True):
+        self._state.shutdown(wait=wait)
+
+
+class _HasherState:
+    """Per-application policy and hashing pool."""
+
+    def __init__(self, policy, workers):
+        self.policy = policy
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password')
+            return self._executor
+
+    def run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        return self.executor().submit(fn, *args).result()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+def _rehash(app, user_id, password_hash, password):
+    from app import db
+    from app.models import User
+
+    with app.app_context():
+        try:
+            new_hash = app.extensions['password_hasher'].policy.hash(password)
+            result = db.session.execute(
+                User.__table__.update()
+                .where(User.id == user_id, User.password == password_hash)
+                .values(password=new_hash)
+            )
+            db.session.commit()
+            if result.rowcount:
+                app.extensions['user_cache'].invalidate(user_id)
+                logger.info(f"Re-hashed password of user {user_id} with {new_hash.split('$', 1)[0]}")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error re-hashing password of user {user_id}: {str(e)}")
+
+
+password_hasher = PasswordHasher()
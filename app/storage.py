@@ -0,0 +1,183 @@
+import os
+import time
+import logging
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend:
+    """
+    Stores uploaded files as blobs addressed by the SHA-256 of their content.
+
+    Identical uploads share one blob and names chosen by users never collide.
+    """
+
+    #: Directory where uploads are received before being stored. It must be on
+    #: the same filesystem as the blobs for a local backend, so storing is a rename.
+    temp_dir = None
+
+    def put(self, sink):
+        """
+        Stores a received upload under its digest.
+
+        Args:
+            sink (UploadSink): The received file.
+
+        Returns:
+            str: The key the blob is stored under.
+        """
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def path(self, key):
+        """Local filesystem path of a blob, for extractors that need one."""
+        raise NotImplementedError
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def iter_keys(self):
+        """Yields (key, modified timestamp) for every stored blob."""
+        raise NotImplementedError
+
+    def iter_stale_temp_files(self, older_than):
+        """Yields paths of temporary files abandoned before `older_than`."""
+        return iter(())
+
+
+class LocalStorage(StorageBackend):
+    """
+    Blobs on the local filesystem, sharded two levels deep by digest prefix.
+
+    A file with digest 'ab12cd...' is stored at <root>/ab/12/ab12cd..., which
+    keeps every directory small no matter how many files are stored.
+
+    Args:
+        root (str): Directory holding the blobs.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.temp_dir = os.path.join(root, '.incoming')
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def put(self, sink):
+        key = sink.digest
+        path = self.path(key)
+        if os.path.exists(path):
+            # Same content is already stored; refresh its age so the garbage
+            # collector can't remove it before the new row is committed
+            os.utime(path)
+            sink.discard()
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            sink.commit(path)
+        return key
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def iter_keys(self):
+        for first in os.scandir(self.root):
+            if not first.is_dir() or len(first.name) != 2:
+                continue
+            for second in os.scandir(first.path):
+                if not second.is_dir():
+                    continue
+                for blob in os.scandir(second.path):
+                    if blob.is_file() and len(blob.name) == 64:
+                        yield blob.name, blob.stat().st_mtime
+
+    def iter_stale_temp_files(self, older_than):
+        for entry in os.scandir(self.temp_dir):
+            if entry.is_file() and entry.stat().st_mtime < older_than:
+                yield entry.path
+
+
+def collect_garbage(backend, live_keys, grace_seconds=3600, now=None):
+    """
+    Deletes blobs that no UploadedFile row references any more.
+
+    Blobs and temporary files younger than the grace period are kept, because
+    their row may not have been committed yet.
+
+    Args:
+        backend (StorageBackend): Storage to clean up.
+        live_keys (set): Keys still referenced by the database.
+        grace_seconds (int): Minimum age before an orphan is removed.
+        now (float, optional): Current time, for tests.
+
+    Returns:
+        int: Number of files removed.
+    """
+    cutoff = (now or time.time()) - grace_seconds
+    removed = 0
+    for key, modified in list(backend.iter_keys()):
+        if key not in live_keys and modified < cutoff:
+            backend.delete(key)
+            removed += 1
+    for path in list(backend.iter_stale_temp_files(cutoff)):
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    logger.info(f"Storage garbage collection removed {removed} files")
+    return removed
+
+
+class UploadStorage:
+    """Flask extension giving each application its storage backend."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        root = app.config.get('STORAGE_ROOT') or app.config['UPLOAD_FOLDER']
+        app.extensions['storage'] = LocalStorage(root)
+
+    @property
+    def backend(self):
+        return current_app.extensions['storage']
+
+    def put(self, sink):
+        return self.backend.put(sink)
+
+    def path_for(self, uploaded_file):
+        """
+        Returns the local path of an upload's content.
+
+        Rows stored before content addressing live under their filename in UPLOAD_FOLDER.
+        """
+        backend = self.backend
+        if uploaded_file.content_hash and backend.exists(uploaded_file.content_hash):
+            return backend.path(uploaded_file.content_hash)
+        return os.path.join(current_app.config['UPLOAD_FOLDER'], uploaded_file.filename)
+
+    def collect_garbage(self, grace_seconds=3600):
+        from app import db
+        from app.models import UploadedFile
+
+        live_keys = {
+            key for (key,) in db.session.query(UploadedFile.content_hash).distinct() if key
+        }
+        return collect_garbage(self.backend, live_keys, grace_seconds)
+
+
+storage = UploadStorage()
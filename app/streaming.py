@@ -0,0 +1,166 @@
+import json
+import threading
+from flask import current_app
+
+# Events a reader of a summary channel receives
+DELTA = 'delta'
+DONE = 'done'
+ERROR = 'error'
+
+
+class SummaryChannel:
+    """
+    The summary of one upload, published piece by piece as it is generated.
+
+    The job thread publishes pieces and then finishes or fails the channel;
+    any number of readers follow it. Pieces are kept until the channel is
+    dropped, so a reader that arrives late still gets the summary from the start.
+    """
+
+    def __init__(self):
+        self._pieces = []
+        self._condition = threading.Condition()
+        self._result = None  # (DONE, summary) or (ERROR, message) once closed
+
+    def publish(self, piece):
+        with self._condition:
+            self._pieces.append(piece)
+            self._condition.notify_all()
+
+    def finish(self, summary):
+        self._close((DONE, summary))
+
+    def fail(self, message):
+        self._close((ERROR, message))
+
+    def _close(self, result):
+        with self._condition:
+            if self._result is None:
+                self._result = result
+            self._condition.notify_all()
+
+    @property
+    def closed(self):
+        return self._result is not None
+
+    def follow(self, timeout=None):
+        """
+        Yields (event, data) for every piece published, then the final event.
+
+        Args:
+            timeout (float, optional): Seconds to wait for news before yielding
+                None, so the caller can send a keep-alive.
+
+        Yields:
+            tuple | None: (DELTA, piece), ..., then (DONE, summary) or (ERROR, message).
+        """
+        sent = 0
+        while True:
+            with self._condition:
+                if sent == len(self._pieces) and self._result is None:
+                    self._condition.wait(timeout)
+                pieces = self._pieces[sent:]
+                result = self._result
+            sent += len(pieces)
+            for piece in pieces:
+                yield DELTA, piece
+            if result is not None:
+                yield result
+                return
+            if not pieces and result is None:
+                yield None
+
+
+class ChannelRegistry:
+    """Open summary channels of one process, by upload id."""
+
+    def __init__(self):
+        self._channels = {}
+        self._readers = {}  # user id -> open streams
+        self._lock = threading.Lock()
+
+    def open(self, file_id):
+        channel = SummaryChannel()
+        with self._lock:
+            self._channels[file_id] = channel
+        return channel
+
+    def get(self, file_id):
+        with self._lock:
+            return self._channels.get(file_id)
+
+    def drop(self, file_id, channel):
+        """Forgets a channel; readers already following it still get its final event."""
+        with self._lock:
+            if self._channels.get(file_id) is channel:
+                del self._channels[file_id]
+
+    def add_reader(self, user_id, limit):
+        """
+        Counts a stream opened by a user.
+
+        Returns:
+            bool: False, without counting it, if the user already has `limit` streams open.
+        """
+        with self._lock:
+            count = self._readers.get(user_id, 0)
+            if count >= limit:
+                return False
+            self._readers[user_id] = count + 1
+            return True
+
+    def remove_reader(self, user_id):
+        with self._lock:
+            count = self._readers.pop(user_id, 0) - 1
+            if count > 0:
+                self._readers[user_id] = count
+
+    def __len__(self):
+        with self._lock:
+            return len(self._channels)
+
+
+def sse_event(event, data):
+    """Formats one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class SummaryStreams:
+    """
+    Lets the processing pipeline stream summaries to the browser.
+
+    Channels live in the memory of the process running the job, so they are
+    only found by requests served by the same process; the stream endpoint
+    falls back to polling the database for jobs running elsewhere. Each stream
+    holds a worker thread, so streams are capped per user and end after
+    SUMMARY_STREAM_TIMEOUT, when the browser reconnects.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['summary_streams'] = ChannelRegistry()
+
+    @property
+    def channels(self):
+        return current_app.extensions['summary_streams']
+
+    def open(self, file_id):
+        return self.channels.open(file_id)
+
+    def get(self, file_id):
+        return self.channels.get(file_id)
+
+    def drop(self, file_id, channel):
+        self.channels.drop(file_id, channel)
+
+    def add_reader(self, user_id, limit):
+        return self.channels.add_reader(user_id, limit)
+
+    def remove_reader(self, user_id):
+        self.channels.remove_reader(user_id)
+
+
+summary_streams = SummaryStreams()
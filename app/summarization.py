@@ -0,0 +1,256 @@
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# llama3-8b-8192 has an 8192 token window; leave room for the prompt and the reply
+CHUNK_TOKENS = 3000
+MAX_WORKERS = 4
+
+CHUNK_PROMPT = "Summarize the following section of a longer document: {text}"
+COMBINE_PROMPT = "Combine the following section summaries into a single summary of the document: {text}"
+SINGLE_PROMPT = "Summarize the following text: {text}"
+TRUNCATION_MARKER = "[truncated]"
+
+# Roughly one match per BPE token: words, numbers and individual punctuation marks
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    """
+    Estimates how many model tokens a piece of text will use.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: Approximate token count.
+    """
+    return len(_TOKEN_RE.findall(text))
+
+
+def _split_oversized(piece, max_tokens):
+    """Splits a piece that is too big on its own, first by sentence and then by word."""
+    for sentence in _SENTENCE_RE.split(piece):
+        if estimate_tokens(sentence) <= max_tokens:
+            yield sentence
+            continue
+        words, used = [], 0
+        for word in sentence.split():
+            cost = estimate_tokens(word)
+            if words and used + cost > max_tokens:
+                yield " ".join(words)
+                words, used = [], 0
+            words.append(word)
+            used += cost
+        if words:
+            yield " ".join(words)
+
+
+def _truncate(text, max_tokens):
+    """Cuts text to about max_tokens on a word boundary, ending it with TRUNCATION_MARKER."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - estimate_tokens(TRUNCATION_MARKER)
+    words, used = [], 0
+    for word in text.split():
+        used += estimate_tokens(word)
+        if words and used > budget:
+            break
+        words.append(word)
+    return " ".join(words + [TRUNCATION_MARKER])
+
+
+def iter_chunks(source, max_tokens=CHUNK_TOKENS):
+    """
+    Packs text into chunks that each fit within a token budget.
+
+    Paragraph boundaries are preferred; paragraphs that are too long are split
+    by sentence and then by word.
+
+    Args:
+        source (str | Iterable[str]): The text, or an iterable of text pieces
+            such as pages, so chunks can be produced while the text is still
+            being extracted.
+        max_tokens (int): Maximum estimated tokens per chunk.
+
+    Yields:
+        str: Consecutive chunks of the text.
+    """
+    if isinstance(source, str):
+        source = [source]
+
+    parts, used = [], 0
+    for block in source:
+        for paragraph in _PARAGRAPH_RE.split(block):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            cost = estimate_tokens(paragraph)
+            pieces = [paragraph] if cost <= max_tokens else _split_oversized(paragraph, max_tokens)
+            for piece in pieces:
+                cost = estimate_tokens(piece)
+                if parts and used + cost > max_tokens:
+                    yield "\n\n".join(parts)
+                    parts, used = [], 0
+                parts.append(piece)
+                used += cost
+    if parts:
+        yield "\n\n".join(parts)
+
+
+class ChunkCache:
+    """Thread-safe LRU cache of completions keyed by a digest of the prompt."""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model, prompt):
+        return hashlib.sha256(f"{model}\0{prompt}".encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+chunk_cache = ChunkCache()
+
+
+class MapReduceSummarizer:
+    """
+    Summarizes documents of any length by summarizing chunks and then the summaries.
+
+    Args:
+        complete (Callable[[str], str]): Sends a prompt to the model and returns its reply.
+        model (str): Model name, part of the cache key.
+        max_tokens (int): Token budget per chunk.
+        max_workers (int): Maximum number of chunk summaries requested at once.
+        cache (ChunkCache | None): Cache of completions; unchanged chunks are not re-sent.
+    """
+
+    def __init__(self, complete, model='', max_tokens=CHUNK_TOKENS, max_workers=MAX_WORKERS,
+                 cache=chunk_cache):
+        self.complete = complete
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_workers = max_workers
+        self.cache = cache
+
+    def _complete(self, template, text):
+        prompt = template.format(text=text)
+        if self.cache is None:
+            return self.complete(prompt)
+        key = ChunkCache.key(self.model, prompt)
+        cached = self.cache.get(key)
+        if cached is None:
+            cached = self.complete(prompt)
+            self.cache.set(key, cached)
+        return cached
+
+    def _map(self, executor, chunks, template):
+        # Chunks are submitted as they are produced, so a streaming source is
+        # summarized while the rest of it is still being read
+        futures = [executor.submit(self._complete, template, chunk) for chunk in chunks]
+        return [future.result() for future in futures]
+
+    def _final_prompt(self, source):
+        """
+        Runs every step but the last and returns what the last prompt needs.
+
+        Returns:
+            tuple | None: (template, text) of the final prompt, None for empty input.
+        """
+        chunks = iter_chunks(source, self.max_tokens)
+        first = next(chunks, None)
+        if first is None:
+            return None
+        second = next(chunks, None)
+        if second is None:
+            return SINGLE_PROMPT, first
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='summarize') as executor:
+            summaries = self._map(executor, _prepend([first, second], chunks), CHUNK_PROMPT)
+            # Reduce until the joined summaries fit into a single prompt. If a round
+            # fails to shrink them the model is not condensing, so every summary is
+            # cut to an equal share of the prompt instead; none is left out.
+            while True:
+                groups = list(iter_chunks(summaries, self.max_tokens))
+                if len(groups) == 1:
+                    return COMBINE_PROMPT, groups[0]
+                if len(groups) >= len(summaries):
+                    share = max(1, self.max_tokens // len(summaries))
+                    return COMBINE_PROMPT, "\n\n".join(_truncate(summary, share) for summary in summaries)
+                summaries = self._map(executor, groups, COMBINE_PROMPT)
+
+    def summarize(self, source):
+        """
+        Summarizes text, splitting it when it does not fit in one prompt.
+
+        Args:
+            source (str | Iterable[str]): The text or a stream of text pieces.
+
+        Returns:
+            str: The summary.
+        """
+        final = self._final_prompt(source)
+        return "" if final is None else self._complete(*final)
+
+    def stream(self, source, complete_stream):
+        """
+        Like summarize(), but yields the final summary in pieces as the model produces them.
+
+        Chunk summaries are still requested whole and concurrently; only the
+        last prompt, whose reply is the summary, is streamed.
+
+        Args:
+            source (str | Iterable[str]): The text or a stream of text pieces.
+            complete_stream (Callable[[str], Iterable[str]]): Sends a prompt and
+                yields the reply in pieces.
+
+        Yields:
+            str: Successive pieces of the summary.
+        """
+        final = self._final_prompt(source)
+        if final is None:
+            return
+        template, text = final
+        prompt = template.format(text=text)
+        key = ChunkCache.key(self.model, prompt)
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            yield cached
+            return
+        pieces = []
+        for piece in complete_stream(prompt):
+            pieces.append(piece)
+            yield piece
+        if self.cache is not None:
+            self.cache.set(key, "".join(pieces))
+
+
+def _prepend(items, iterator):
+    yield from items
+    yield from iterator
@@ -0,0 +1,491 @@
+import re
+import math
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from collections import Counter
+from flask import current_app
+from app.summarization import MapReduceSummarizer, chunk_cache
+
+logger = logging.getLogger(__name__)
+
+
+class SummarizationError(Exception):
+    """Raised when a summary could not be produced."""
+
+
+class CircuitOpenError(SummarizationError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service for a while.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail immediately. Once `reset_timeout` seconds have passed one trial call
+    is let through; it closes the circuit if it succeeds and re-opens it if not.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_timeout (float): Seconds the circuit stays open.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """Raises CircuitOpenError unless a call may go ahead."""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return
+        raise CircuitOpenError('Summarization service is unavailable, circuit breaker is open')
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+
+def retry(fn, attempts=3, base_delay=0.5, max_delay=8.0, retryable=(Exception,), sleep=time.sleep):
+    """
+    Calls `fn`, retrying retryable errors with exponential backoff and full jitter.
+
+    Args:
+        fn (Callable[[], T]): Call to make.
+        attempts (int): Total number of tries.
+        base_delay (float): Upper bound of the first wait, doubled after every try.
+        max_delay (float): Cap on any single wait.
+        retryable (tuple): Exception types worth another try.
+
+    Returns:
+        T: Result of the first successful call.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except retryable as e:
+            if attempt == attempts - 1:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            logger.warning(f"Summarization call failed ({str(e)}), retrying in {delay:.2f}s")
+            sleep(delay)
+
+
+class Summarizer:
+    """Turns a document into a summary."""
+
+    name = None
+
+    def summarize(self, source):
+        """
+        Args:
+            source (str | Iterable[str]): The text or a stream of text pieces.
+
+        Returns:
+            str: The summary.
+
+        Raises:
+            SummarizationError: If no summary could be produced.
+        """
+        raise NotImplementedError
+
+    def stream(self, source):
+        """
+        Yields the summary in pieces as it is produced; joined, they equal summarize().
+
+        Providers that can't stream yield the whole summary at once.
+
+        Raises:
+            SummarizationError: If no summary could be produced.
+        """
+        yield self.summarize(source)
+
+    def close(self):
+        pass
+
+
+class GroqSummarizer(Summarizer):
+    """
+    Summarizes through the Groq chat completions API.
+
+    One HTTP client with a keep-alive connection pool is shared by every
+    request, so chunk summaries reuse TLS connections instead of opening one
+    each. Transient errors (connection failures, timeouts, rate limits, 5xx)
+    are retried with backoff, and a circuit breaker stops calls while the
+    service keeps failing. With `slots`, each request to the API holds one of
+    them, so reading the document and waiting between retries leave the slots
+    to other jobs.
+
+    Args:
+        api_key (str): Groq API key.
+        model (str): Chat model.
+        timeout (float): Seconds allowed for one completion.
+        max_connections (int): Size of the connection pool.
+        attempts (int): Tries per completion.
+        backoff (float): Upper bound in seconds of the first wait between tries.
+        breaker (CircuitBreaker, optional): Defaults to a new breaker.
+        slots (threading.Semaphore, optional): Limits requests in flight across jobs.
+    """
+
+    name = 'groq'
+
+    def __init__(self, api_key, model='llama3-8b-8192', timeout=30.0, max_connections=8,
+                 attempts=3, backoff=0.5, breaker=None, slots=None):
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.attempts = attempts
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.slots = slots
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                import httpx
+                from groq import Groq
+
+                http_client = httpx.Client(
+                    timeout=httpx.Timeout(self.timeout, connect=5.0),
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections,
+                                        keepalive_expiry=60),
+                )
+                # Retries are handled here so they count towards the circuit breaker
+                self._client = Groq(api_key=self.api_key, http_client=http_client, max_retries=0)
+            return self._client
+
+    def _send(self, prompt, **kwargs):
+        return self._get_client().chat.completions.create(
+            messages=[{
+                "role": "user",
+                "content": prompt,
+            }],
+            model=self.model,
+            **kwargs
+        )
+
+    @contextmanager
+    def _slot(self):
+        if self.slots is None:
+            yield
+            return
+        # Local import to avoid circular import
+        from app.metrics import timed
+        with timed('summary_wait'):
+            self.slots.acquire()
+        try:
+            yield
+        finally:
+            self.slots.release()
+
+    def _reply(self, prompt):
+        with self._slot():
+            return self._send(prompt).choices[0].message.content
+
+    def complete(self, prompt):
+        """Sends one prompt, with retries, behind the circuit breaker."""
+        import groq
+
+        retryable = (groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError)
+        self.breaker.allow()
+        try:
+            reply = retry(lambda: self._reply(prompt), attempts=self.attempts,
+                          base_delay=self.backoff, retryable=retryable)
+        except groq.APIError as e:
+            self.breaker.record_failure()
+            raise SummarizationError(f"Groq request failed: {str(e)}") from e
+        except Exception:
+            # Any outcome must be recorded, or a failed half-open trial keeps the circuit open for good
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return reply
+
+    def complete_stream(self, prompt):
+        """Sends one prompt and yields the reply as the model produces it."""
+        import groq
+        import httpx
+
+        self.breaker.allow()
+        try:
+            # The slot is held until the reply has been read, as the request is open till then
+            with self._slot():
+                # Only opening the stream is retried; once pieces were yielded a retry would repeat them
+                chunks = retry(lambda: self._send(prompt, stream=True), attempts=self.attempts,
+                               base_delay=self.backoff,
+                               retryable=(groq.APIConnectionError, groq.RateLimitError,
+                                          groq.InternalServerError))
+                for chunk in chunks:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except (groq.APIError, httpx.HTTPError) as e:
+            self.breaker.record_failure()
+            raise SummarizationError(f"Groq request failed: {str(e)}") from e
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except GeneratorExit:
+            # The reader went away; the service itself was working
+            self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+
+    def _summarizer(self):
+        if not self.api_key:
+            raise SummarizationError("GROQ_API_KEY is not set")
+        return MapReduceSummarizer(self.complete, model=self.model, cache=chunk_cache)
+
+    def summarize(self, source):
+        return self._summarizer().summarize(source)
+
+    def stream(self, source):
+        return self._summarizer().stream(source, self.complete_stream)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+_WORD = re.compile(r'[a-z0-9]+')
+# Words too common to say anything about a sentence
+_STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers herself him himself his how i if in into is it its itself
+just me more most my myself no nor not now of off on once only or other our ours ourselves out
+over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours yourself yourselves
+""".split())
+
+
+class ExtractiveSummarizer(Summarizer):
+    """
+    Local summarizer picking the most informative sentences by TF-IDF.
+
+    Each sentence is treated as a document: words frequent in a sentence but
+    rare across the text score highly. The best sentences are returned in
+    their original order. Needs no network and runs in linear time.
+
+    Args:
+        max_sentences (int): Upper bound on sentences in the summary.
+        ratio (float): Fraction of the sentences to keep, before the bound.
+    """
+
+    name = 'extractive'
+
+    def __init__(self, max_sentences=7, ratio=0.2):
+        self.max_sentences = max_sentences
+        self.ratio = ratio
+
+    def summarize(self, source):
+        return " ".join(self._select(source))
+
+    def stream(self, source):
+        for number, sentence in enumerate(self._select(source)):
+            yield sentence if number == 0 else " " + sentence
+
+    def _select(self, source):
+        """Returns the sentences of the summary, in document order."""
+        text = source if isinstance(source, str) else "\n\n".join(source)
+        sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s and s.strip()]
+        keep = max(1, min(self.max_sentences, math.ceil(len(sentences) * self.ratio)))
+        if len(sentences) <= keep:
+            return sentences
+
+        bags = [Counter(w for w in _WORD.findall(s.lower()) if w not in _STOP_WORDS) for s in sentences]
+        document_frequency = Counter()
+        for bag in bags:
+            document_frequency.update(bag.keys())
+        count = len(sentences)
+        idf = {word: math.log(count / df) + 1.0 for word, df in document_frequency.items()}
+
+        def score(bag):
+            total = sum(bag.values())
+            if not total:
+                return 0.0
+            # Normalised by length so long sentences don't win on size alone
+            return sum(tf * idf[word] for word, tf in bag.items()) / math.sqrt(total)
+
+        ranked = sorted(range(count), key=lambda i: score(bags[i]), reverse=True)[:keep]
+        return [sentences[i] for i in sorted(ranked)]
+
+
+class _Recording:
+    """Passes the pieces of a text stream through, keeping a copy in case it must be read again."""
+
+    def __init__(self, source):
+        self._source = iter(source)
+        self.pieces = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        piece = next(self._source)
+        self.pieces.append(piece)
+        return piece
+
+    def text(self):
+        """The whole text: the pieces read so far and the rest of the stream."""
+        self.pieces.extend(self._source)
+        return "\n".join(self.pieces)
+
+
+class FallbackSummarizer(Summarizer):
+    """
+    Uses `primary`, switching to `fallback` whenever it fails.
+
+    A stream of text pieces reaches the primary as it arrives, so it can start
+    before the last page is parsed; the fallback gets the text read so far plus
+    the rest of the stream.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f'{primary.name}+{fallback.name}'
+
+    def summarize(self, source):
+        recording = source if isinstance(source, str) else _Recording(source)
+        try:
+            return self.primary.summarize(recording)
+        except SummarizationError as e:
+            logger.warning(f"{self.primary.name} summarizer failed ({str(e)}), "
+                           f"using {self.fallback.name}")
+            return self.fallback.summarize(source if isinstance(source, str) else recording.text())
+
+    def stream(self, source):
+        recording = source if isinstance(source, str) else _Recording(source)
+        started = False
+        try:
+            for piece in self.primary.stream(recording):
+                started = True
+                yield piece
+        except SummarizationError as e:
+            if started:
+                # Part of the summary has already been sent and can't be taken back
+                raise
+            logger.warning(f"{self.primary.name} summarizer failed ({str(e)}), "
+                           f"using {self.fallback.name}")
+            yield from self.fallback.stream(source if isinstance(source, str) else recording.text())
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
+
+
+class FakeSummarizer(Summarizer):
+    """
+    Local stand-in for a streaming provider, for tests and development.
+
+    The summary is the first `words` words of the text, streamed one word
+    every `delay` seconds.
+    """
+
+    name = 'fake'
+
+    def __init__(self, words=30, delay=0.0):
+        self.words = words
+        self.delay = delay
+
+    def summarize(self, source):
+        return "".join(self.stream(source))
+
+    def stream(self, source):
+        text = source if isinstance(source, str) else " ".join(source)
+        for number, word in enumerate(text.split()[:self.words]):
+            if self.delay:
+                time.sleep(self.delay)
+            yield word if number == 0 else " " + word
+
+
+def build_summarizer(config):
+    """
+    Creates the summarizer selected by SUMMARY_PROVIDER.
+
+    'groq' uses the API only, 'extractive' the local summarizer only, and
+    'auto' uses Groq with the local summarizer as fallback, or the local
+    summarizer alone when no API key is configured. 'fake' is for tests.
+    """
+    provider = config.get('SUMMARY_PROVIDER') or 'auto'
+    api_key = config.get('GROQ_API_KEY')
+    if provider == 'fake':
+        return FakeSummarizer(delay=config.get('SUMMARY_FAKE_DELAY', 0.0))
+    extractive = ExtractiveSummarizer()
+    if provider == 'extractive' or (provider == 'auto' and not api_key):
+        return extractive
+
+    groq = GroqSummarizer(
+        api_key,
+        model=config.get('SUMMARY_MODEL', 'llama3-8b-8192'),
+        timeout=config.get('SUMMARY_TIMEOUT', 30.0),
+        max_connections=config.get('SUMMARY_CONCURRENCY', 4) * 2,
+        attempts=config.get('SUMMARY_RETRIES', 3),
+        breaker=CircuitBreaker(config.get('SUMMARY_BREAKER_FAILURES', 5),
+                               config.get('SUMMARY_BREAKER_RESET', 30.0)),
+        slots=threading.BoundedSemaphore(max(1, config.get('SUMMARY_CONCURRENCY', 4))),
+    )
+    if provider == 'groq':
+        return groq
+    if provider == 'auto':
+        return FallbackSummarizer(groq, extractive)
+    raise ValueError(f"Unknown summary provider: {provider}")
+
+
+class Summarizers:
+    """Flask extension holding each application's summarizer."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['summarizer'] = build_summarizer(app.config)
+
+    @property
+    def current(self):
+        return current_app.extensions['summarizer']
+
+
+summarizers = Summarizers()
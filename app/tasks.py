@@ -0,0 +1,293 @@
+import time
+import atexit
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from flask import current_app
+from app.extractors import FAST, HEAVY, registry
+from app.metrics import jobs_total, stage_seconds, timed
+from app.ocr import OCR_CONCURRENCY, init_worker
+
+logger = logging.getLogger(__name__)
+
+
+class _SingleFlight:
+    """Lets concurrent jobs for the same content share one computation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        Runs fn() unless a call for key is already running, in which case waits for it.
+
+        Returns:
+            tuple: (result, True if this caller ran fn)
+        """
+        if key is None:
+            return fn(), True
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), False
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, True
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class _Workers:
+    """Executors owned by a single application instance."""
+
+    def __init__(self, config):
+        self.mode = config['PROCESSING_MODE']
+        self.extraction_workers = max(1, config['EXTRACTION_WORKERS'])
+        self.fast_lane_workers = max(1, config.get('FAST_LANE_WORKERS', 4))
+        self.summary_concurrency = max(1, config['SUMMARY_CONCURRENCY'])
+        self.in_flight = _SingleFlight()
+        self._extract_executor = None
+        self._job_executor = None
+        self._fast_job_executor = None
+        self._lock = threading.Lock()
+
+    def extract_executor(self):
+        with self._lock:
+            if self._extract_executor is None:
+                if self.mode == 'process':
+                    # Every worker runs its own OCR pool, so OCR_CONCURRENCY is split between them
+                    self._extract_executor = ProcessPoolExecutor(
+                        max_workers=self.extraction_workers, initializer=init_worker,
+                        initargs=(max(1, OCR_CONCURRENCY // self.extraction_workers),))
+                else:
+                    self._extract_executor = ThreadPoolExecutor(
+                        max_workers=self.extraction_workers, thread_name_prefix='extract')
+            return self._extract_executor
+
+    def job_executor(self, lane=HEAVY):
+        with self._lock:
+            if lane == FAST:
+                if self._fast_job_executor is None:
+                    self._fast_job_executor = ThreadPoolExecutor(
+                        max_workers=self.fast_lane_workers, thread_name_prefix='upload-job-fast')
+                return self._fast_job_executor
+            if self._job_executor is None:
+                # One coordinating thread per extraction slot plus one per summary slot,
+                # so a job waiting on the API never blocks an idle extraction worker.
+                self._job_executor = ThreadPoolExecutor(
+                    max_workers=self.extraction_workers + self.summary_concurrency,
+                    thread_name_prefix='upload-job')
+            return self._job_executor
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            for executor in (self._fast_job_executor, self._job_executor, self._extract_executor):
+                if executor is not None:
+                    executor.shutdown(wait=wait)
+            self._fast_job_executor = None
+            self._job_executor = None
+            self._extract_executor = None
+
+
+class ProcessingPipeline:
+    """
+    Moves uploads through pending -> processing -> completed/failed off the request thread.
+
+    Extraction (PDF parsing, OCR) is CPU bound and runs in a process pool sized by
+    EXTRACTION_WORKERS. Summarization is an API round-trip and is limited separately
+    by SUMMARY_CONCURRENCY. Files whose extractor is marked fast skip the pool and
+    run on a separate set of FAST_LANE_WORKERS job threads.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        workers = _Workers(app.config)
+        app.extensions['pipeline'] = workers
+        atexit.register(workers.shutdown)
+
+    def submit(self, file_id, mime_type=None):
+        """
+        Queues an uploaded file for processing.
+
+        Args:
+            file_id (int): Primary key of the UploadedFile row to process.
+            mime_type (str, optional): Sniffed type, which picks the fast or heavy lane.
+
+        Returns:
+            Future | None: Future of the job, or None when it ran inline.
+        """
+        app = current_app._get_current_object()
+        workers = app.extensions['pipeline']
+        if workers.mode == 'inline':
+            run_job(app, file_id)
+            return None
+        lane = registry.lane(mime_type) if mime_type else HEAVY
+        return workers.job_executor(lane).submit(run_job, app, file_id, time.perf_counter())
+
+    def shutdown(self, wait=True):
+        current_app.extensions['pipeline'].shutdown(wait=wait)
+
+
+pipeline = ProcessingPipeline()
+
+
+@timed('extract')
+def _extract(workers, filepath, filename, lane=HEAVY):
+    from app.utils import extract_text_from_file
+    if workers.mode == 'inline' or lane == FAST:
+        return extract_text_from_file(filepath, filename)
+    return workers.extract_executor().submit(extract_text_from_file, filepath, filename).result()
+
+
+def _summarize(workers, text, stage='summarize', channel=None):
+    # SUMMARY_CONCURRENCY is enforced by the summarizer around each API request,
+    # so no slot is held while a streamed source is still being extracted
+    from app.utils import stream_summary, summarize_text
+    with timed(stage):
+        if channel is None:
+            return summarize_text(text)
+        pieces = []
+        for piece in stream_summary(text):
+            pieces.append(piece)
+            channel.publish(piece)
+        return "".join(pieces)
+
+
+def _extract_and_summarize(workers, filepath, filename, mime_type=None, channel=None):
+    """
+    Returns (extracted_text, summarized_text) for a file.
+
+    PDF pages are extracted in batches across the extraction pool and fed to the
+    summarizer as they arrive, so summarizing starts before the last page is parsed.
+    With a channel, the summary is published to it as it is generated.
+    """
+    if mime_type is None:
+        with open(filepath, 'rb') as f:
+            mime_type, _ = registry.detect(f, filename)
+    if mime_type != 'application/pdf':
+        extracted_text = _extract(workers, filepath, filename, registry.lane(mime_type))
+        if not extracted_text:
+            raise ValueError("No text could be extracted from the file")
+        return extracted_text, _summarize(workers, extracted_text, channel=channel)
+
+    from app.utils import iter_pdf_pages
+    executor = None if workers.mode == 'inline' else workers.extract_executor()
+    pages = []
+    errors = []
+
+    def stream():
+        try:
+            for page in iter_pdf_pages(filepath, executor=executor):
+                pages.append(page)
+                yield page
+        except Exception as e:
+            # Keep the summarizer from reporting extraction errors as its own
+            errors.append(e)
+
+    # Pages are parsed while the summarizer consumes them, so the two can't be timed apart
+    summarized_text = _summarize(workers, stream(), stage='extract_and_summarize', channel=channel)
+    if errors:
+        raise errors[0]
+    if not pages:
+        raise ValueError("No text could be extracted from the file")
+    return "\n".join(pages), summarized_text
+
+
+@timed('db_commit')
+def _complete(uploaded_file, extracted_text, summarized_text):
+    from app import db
+    uploaded_file.extracted_text = extracted_text
+    uploaded_file.summarized_text = summarized_text
+    uploaded_file.processing_status = uploaded_file.STATUS_COMPLETED
+    uploaded_file.processing_error = None
+    db.session.commit()
+
+    # Indexed here, off the request thread, once the texts are final
+    from app.search import search_index
+    search_index.index(uploaded_file)
+
+
+def run_job(app, file_id, queued_at=None):
+    """
+    Extracts and summarizes a single upload, recording progress on its row.
+
+    Args:
+        app (Flask): Application whose database and config the job uses.
+        file_id (int): Primary key of the UploadedFile row to process.
+        queued_at (float, optional): time.perf_counter() when the job was queued.
+
+    Returns:
+        bool: True if the file was processed successfully.
+    """
+    from app import db
+    from app.models import UploadedFile
+    from app.storage import storage
+    from app.streaming import summary_streams
+
+    started = time.perf_counter()
+    if queued_at is not None:
+        stage_seconds.observe(started - queued_at, 'queue_wait')
+    with app.app_context():
+        workers = app.extensions['pipeline']
+        uploaded_file = db.session.get(UploadedFile, file_id)
+        if uploaded_file is None:
+            logger.warning(f"Upload {file_id} disappeared before processing")
+            return False
+
+        uploaded_file.processing_status = UploadedFile.STATUS_PROCESSING
+        db.session.commit()
+        filepath = storage.path_for(uploaded_file)
+        filename = uploaded_file.filename
+        channel = summary_streams.open(file_id) if app.config.get('SUMMARY_STREAMING') else None
+
+        def process():
+            # Reuse the results of any earlier upload with identical content
+            previous = UploadedFile.find_processed(uploaded_file.content_hash)
+            if previous is not None:
+                logger.info(f"Reusing results of upload {previous.id} for upload {file_id}")
+                texts = (previous.extracted_text, previous.summarized_text)
+            else:
+                texts = _extract_and_summarize(workers, filepath, filename, uploaded_file.mime_type,
+                                               channel=channel)
+            # Commit before releasing the in-flight slot so later duplicates find this row
+            _complete(uploaded_file, *texts)
+            return texts
+
+        try:
+            texts, leader = workers.in_flight.do(uploaded_file.content_hash, process)
+            if not leader:
+                _complete(uploaded_file, *texts)
+            logger.info(f"File processed successfully: {uploaded_file.filename}")
+            jobs_total.inc('completed' if leader else 'deduplicated')
+            if channel is not None:
+                # Only once committed, so a reader that reloads sees the same summary
+                channel.finish(texts[1])
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error processing upload {file_id}: {str(e)}")
+            uploaded_file = db.session.get(UploadedFile, file_id)
+            if uploaded_file is not None:
+                uploaded_file.processing_status = UploadedFile.STATUS_FAILED
+                uploaded_file.processing_error = str(e)[:255]
+                db.session.commit()
+            jobs_total.inc('failed')
+            if channel is not None:
+                channel.fail(str(e)[:255])
+            return False
+        finally:
+            if channel is not None:
+                summary_streams.drop(file_id, channel)
+            stage_seconds.observe(time.perf_counter() - started, 'job')
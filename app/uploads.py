@@ -0,0 +1,335 @@
+import os
+import io
+import mmap
+import hashlib
+import zipfile
+import tempfile
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 512
+
+# Leading bytes of the formats we accept, checked in order
+_SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+)
+
+# Office Open XML files are zip archives; the extension tells them apart
+_ZIP_TYPES = {
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+}
+
+# Text formats the content alone doesn't reliably tell apart
+_TEXT_TYPES = {
+    'md': 'text/markdown',
+    'markdown': 'text/markdown',
+    'html': 'text/html',
+    'htm': 'text/html',
+}
+_HTML_START = (b'<!doctype html', b'<html')
+
+
+def sniff_mime_type(head, filename=''):
+    """
+    Determines a file's MIME type from its first bytes.
+
+    Args:
+        head (bytes): The first bytes of the file.
+        filename (str): Original filename, used to tell zip based formats apart.
+
+    Returns:
+        str: The detected MIME type, 'application/octet-stream' if unknown.
+    """
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if head.startswith(b'PK\x03\x04'):
+        return _ZIP_TYPES.get(ext, 'application/zip')
+    if head and b'\x00' not in head:
+        try:
+            # A multi-byte character may be cut off at the end of the sample
+            head.decode('utf-8')
+        except UnicodeDecodeError as e:
+            if e.start < len(head) - 3:
+                return 'application/octet-stream'
+        if head.lstrip(b'\xef\xbb\xbf \t\r\n')[:14].lower().startswith(_HTML_START):
+            return 'text/html'
+        return _TEXT_TYPES.get(ext, 'text/plain')
+    return 'application/octet-stream'
+
+
+class UploadSink:
+    """
+    Writable file the form parser streams an uploaded file into.
+
+    The size limit, SHA-256 digest and MIME sniffing are all handled as bytes
+    arrive, so an oversized upload is rejected at the first chunk over the
+    limit and the file is never re-read to be hashed or measured.
+
+    Args:
+        directory (str): Directory for the temporary file; must be on the same
+            filesystem as the final location so commit() is an atomic rename.
+        max_size (int | None): Maximum number of bytes accepted.
+        filename (str): Original filename, used for MIME sniffing.
+    """
+
+    def __init__(self, directory, max_size=None, filename=''):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self._head = b''
+        self.max_size = max_size
+        self.filename = filename or ''
+        self.size = 0
+        self.committed = False
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def write(self, data):
+        if self.max_size is not None and self.size + len(data) > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge(
+                f'File size exceeds maximum allowed size of {self.max_size / 1024 / 1024:g}MB')
+        if len(self._head) < SNIFF_BYTES:
+            self._head += bytes(data[:SNIFF_BYTES - len(self._head)])
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readinto(self, buffer):
+        return self._file.readinto(buffer)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def fileno(self):
+        return self._file.fileno()
+
+    @property
+    def digest(self):
+        """SHA-256 hex digest of everything written so far."""
+        return self._hash.hexdigest()
+
+    @property
+    def mime_type(self):
+        return sniff_mime_type(self._head, self.filename)
+
+    def copy_from(self, stream, chunk_size=CHUNK_SIZE):
+        """Fills the sink from another stream, e.g. an entry of an archive."""
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            self.write(chunk)
+        return self
+
+    def commit(self, path):
+        """
+        Moves the received file into its final location.
+
+        Args:
+            path (str): Destination path.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.temp_path, path)
+        self.committed = True
+
+    def discard(self):
+        """Removes the temporary file if it was not committed."""
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def close(self):
+        self.discard()
+
+
+def incoming_dir(app=None):
+    """Directory uploads are streamed into before being moved into storage."""
+    app = app or current_app
+    return app.extensions['storage'].temp_dir
+
+
+class UploadRequest(Request):
+    """Request that streams uploaded files straight into UploadSinks."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        max_size = current_app.config['MAX_FILE_SIZE']
+        if is_archive(filename):
+            # Archives are unpacked and each entry is held to MAX_FILE_SIZE instead
+            max_size = current_app.config['MAX_BATCH_SIZE']
+        sink = UploadSink(incoming_dir(), max_size=max_size, filename=filename)
+        self.__dict__.setdefault('_upload_sinks', []).append(sink)
+        return sink
+
+    def _load_form_data(self):
+        if self.mimetype != 'multipart/form-data':
+            return super()._load_form_data()
+        from app.metrics import timed
+        # Parsing the body is where uploaded files are streamed to disk
+        with timed('receive'):
+            super()._load_form_data()
+
+    def close(self):
+        super().close()
+        # Anything the view did not commit is abandoned
+        for sink in self.__dict__.get('_upload_sinks', ()):
+            sink.discard()
+
+
+def receive_upload(file_storage, max_size=None):
+    """
+    Returns the UploadSink holding an uploaded file.
+
+    Files parsed by UploadRequest already are sinks. Anything else (for example
+    a file built by hand) is streamed through a new sink.
+
+    Args:
+        file_storage (FileStorage): The uploaded file from the request.
+        max_size (int, optional): Size limit, defaults to MAX_FILE_SIZE.
+
+    Returns:
+        UploadSink: The received file, positioned at the start.
+    """
+    if isinstance(file_storage.stream, UploadSink):
+        sink = file_storage.stream
+    else:
+        max_size = current_app.config['MAX_FILE_SIZE'] if max_size is None else max_size
+        sink = UploadSink(incoming_dir(), max_size=max_size, filename=file_storage.filename)
+        sink.copy_from(file_storage.stream)
+    sink.seek(0)
+    return sink
+
+
+def is_archive(filename):
+    return bool(filename) and filename.lower().endswith('.zip')
+
+
+def iter_batch_files(file_storages, allowed, max_files=None):
+    """
+    Expands a batch of uploaded files and zip archives into individual files.
+
+    Archive entries are streamed one at a time into their own UploadSink, so
+    memory use does not grow with the size or number of files in the batch.
+
+    Args:
+        file_storages (list): Uploaded files from the request.
+        allowed (Callable[[str], bool]): Whether a filename has an accepted type.
+        max_files (int, optional): Maximum number of files, defaults to MAX_BATCH_FILES.
+
+    Yields:
+        tuple: (original filename, UploadSink or None, error message or None)
+    """
+    max_files = current_app.config['MAX_BATCH_FILES'] if max_files is None else max_files
+    max_size = current_app.config['MAX_FILE_SIZE']
+    count = 0
+
+    def over_limit():
+        return count >= max_files
+
+    for file_storage in file_storages:
+        name = file_storage.filename or ''
+        if not name:
+            continue
+        if not is_archive(name):
+            if over_limit():
+                yield name, None, f'Batch is limited to {max_files} files'
+            elif not allowed(name):
+                yield name, None, 'File type not allowed'
+            else:
+                count += 1
+                yield name, receive_upload(file_storage), None
+            continue
+
+        archive_sink = receive_upload(file_storage)
+        try:
+            with zipfile.ZipFile(archive_sink) as archive:
+                for info in archive.infolist():
+                    entry = os.path.basename(info.filename)
+                    if info.is_dir() or not entry or info.filename.startswith('__MACOSX/'):
+                        continue
+                    label = f'{name}/{info.filename}'
+                    if over_limit():
+                        yield label, None, f'Batch is limited to {max_files} files'
+                    elif not allowed(entry):
+                        yield label, None, 'File type not allowed'
+                    elif info.file_size > max_size:
+                        yield label, None, 'File size exceeds maximum limit'
+                    else:
+                        sink = UploadSink(incoming_dir(), max_size=max_size, filename=secure_filename(entry))
+                        try:
+                            # Declared sizes can lie, so the sink enforces the limit while inflating
+                            with archive.open(info) as member:
+                                sink.copy_from(member)
+                        except (RequestEntityTooLarge, zipfile.BadZipFile, OSError) as e:
+                            sink.discard()
+                            yield label, None, getattr(e, 'description', None) or str(e)
+                            continue
+                        count += 1
+                        sink.seek(0)
+                        yield label, sink, None
+        except zipfile.BadZipFile:
+            yield name, None, 'Not a valid zip archive'
+        finally:
+            archive_sink.discard()
+
+
+class _MappedFile(mmap.mmap):
+    """Memory map with the file object methods zipfile needs (mmap lacks them before Python 3.13)."""
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+
+def open_buffer(filepath):
+    """
+    Opens a stored file as a read-only memory map, so extractors read it without copying.
+
+    Args:
+        filepath (str): Path to the file.
+
+    Returns:
+        mmap.mmap | io.BytesIO: Buffer over the file's content.
+    """
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return io.BytesIO(b'')
+        return _MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ)
@@ -0,0 +1,140 @@
+import time
+import threading
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.session import make_transient_to_detached
+
+
+class UserCache:
+    """
+    Per-process LRU cache of user rows with a time-to-live.
+
+    Only column values are cached, never ORM instances, so entries can be
+    shared between threads and sessions. Entries are dropped when a user is
+    updated or deleted in this process; changes made by other processes are
+    picked up once the entry expires.
+
+    Args:
+        maxsize (int): Maximum number of cached users.
+        ttl (float): Seconds an entry stays valid.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Returns the cached column values of a user, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(user_id)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._items.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._items[user_id]
+            self.misses += 1
+            return None
+
+    def set(self, user_id, values):
+        with self._lock:
+            self._items[user_id] = (values, time.monotonic())
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'hits', 'misses' and current 'size' of the cache.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._items)}
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _columns(mapper):
+    return [attr.key for attr in mapper.column_attrs]
+
+
+def load_cached_user(user_id):
+    """
+    Returns the User with this id, from the cache when possible.
+
+    A cache hit is attached to the current session with merge(load=False), which
+    issues no query; a miss loads the row and caches its column values.
+
+    Args:
+        user_id (int): Primary key of the user.
+
+    Returns:
+        User | None: The user, or None if it does not exist.
+    """
+    from app import db
+    from app.models import User
+
+    cache = current_app.extensions['user_cache']
+    values = cache.get(user_id)
+    if values is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            cache.set(user_id, {key: getattr(user, key) for key in _columns(User.__mapper__)})
+        return user
+
+    # Rebuild a detached instance without running the model's validators
+    user = User.__mapper__.class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(user, key, value)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def _invalidate(user_ids):
+    if user_ids and has_app_context():
+        cache = current_app.extensions.get('user_cache')
+        if cache is not None:
+            for user_id in user_ids:
+                cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    from app.models import User
+
+    changed = {
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+    }
+    if changed:
+        # Dropped now, and again after commit in case another request re-cached
+        # the old row between this flush and the commit
+        _invalidate(changed)
+        session.info.setdefault('changed_user_ids', set()).update(changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session):
+    _invalidate(session.info.pop('changed_user_ids', ()))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('changed_user_ids', None)
@@ -0,0 +1,156 @@
+import io
+import csv
+import json
+import logging
+from datetime import datetime
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+class ImportResult:
+    """Outcome of a bulk user import."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.skipped = 0
+        self.errors = []  # (line number, message)
+
+    def to_dict(self):
+        return {'inserted': self.inserted, 'skipped': self.skipped, 'errors': self.errors}
+
+
+def iter_records(stream, fmt):
+    """
+    Yields (line number, record dict) from a CSV or JSON Lines stream.
+
+    Args:
+        stream (TextIO): Text stream to read.
+        fmt (str): 'csv' or 'jsonl'.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, {'_error': f'Invalid JSON: {e.msg}'}
+    else:
+        raise ValueError(f'Unsupported import format: {fmt}')
+
+
+def _prepare(record, now):
+    """Validates one record and returns the row to insert; raises ValueError."""
+    from app.models import check_username, normalize_email
+    from app.security import password_hasher
+
+    if '_error' in record:
+        raise ValueError(record['_error'])
+    username = check_username((record.get('username') or '').strip())
+    email = normalize_email((record.get('email') or '').strip())
+    password = record.get('password_hash')
+    if not password:
+        plain = record.get('password') or ''
+        if len(plain) < 8:
+            raise ValueError('Password must be at least 8 characters long')
+        password = password_hasher.hash(plain)
+    return {
+        'username': username,
+        'email': email,
+        'password': password,
+        'created_at': now,
+        'is_active': True,
+    }
+
+
+def _insert_batch(session, batch, result):
+    """Inserts prepared rows, skipping users whose username or email already exists."""
+    from app.models import User
+
+    usernames = [row['username'] for _, row in batch]
+    emails = [row['email'] for _, row in batch]
+    # One query per batch finds existing users, instead of two per row
+    existing = session.execute(
+        User.__table__.select().with_only_columns(User.username, User.email)
+        .where(or_(User.username.in_(usernames), User.email.in_(emails)))
+    ).all()
+    taken_usernames = {username for username, _ in existing}
+    taken_emails = {email for _, email in existing}
+
+    rows = []
+    for number, row in batch:
+        if row['username'] in taken_usernames or row['email'] in taken_emails:
+            result.skipped += 1
+            continue
+        taken_usernames.add(row['username'])
+        taken_emails.add(row['email'])
+        rows.append((number, row))
+    if not rows:
+        return
+
+    try:
+        # Core executemany; the ORM validators already ran in _prepare()
+        session.execute(insert(User.__table__), [row for _, row in rows])
+        session.commit()
+        result.inserted += len(rows)
+    except IntegrityError:
+        # A concurrent registration took one of the names; retry row by row
+        session.rollback()
+        for number, row in rows:
+            try:
+                session.execute(insert(User.__table__), row)
+                session.commit()
+                result.inserted += 1
+            except IntegrityError:
+                session.rollback()
+                result.skipped += 1
+
+
+def import_users(stream, fmt, session=None, batch_size=BATCH_SIZE):
+    """
+    Creates users in bulk from a CSV or JSON Lines stream.
+
+    Each record has 'username', 'email' and either 'password_hash' (stored as
+    is) or 'password' (hashed on import, which dominates the import time).
+    Records are validated in Python and inserted in batches; users whose
+    username or email already exists are skipped.
+
+    Args:
+        stream (TextIO | bytes): Data to import.
+        fmt (str): 'csv' or 'jsonl'.
+        session (Session, optional): Session to use, defaults to db.session.
+        batch_size (int): Rows inserted per statement.
+
+    Returns:
+        ImportResult: Counts of inserted and skipped users, and per-line errors.
+    """
+    from app import db
+
+    session = session or db.session
+    if isinstance(stream, bytes):
+        stream = io.StringIO(stream.decode('utf-8'))
+    result = ImportResult()
+    now = datetime.utcnow()
+    batch = []
+    for number, record in iter_records(stream, fmt):
+        try:
+            batch.append((number, _prepare(record, now)))
+        except ValueError as e:
+            result.errors.append((number, str(e)))
+            continue
+        if len(batch) >= batch_size:
+            _insert_batch(session, batch, result)
+            batch = []
+    if batch:
+        _insert_batch(session, batch, result)
+    logger.info(f"User import inserted {result.inserted}, skipped {result.skipped}, "
+                f"rejected {len(result.errors)}")
+    return result
@@ -1,119 +1,254 @@
 
-#client = Groq(api_key=os.environ.get("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"))
-
 import os
-from docx import Document
-from PIL import Image
-import pdfplumber
-import pytesseract
-from groq import Groq
+from collections import deque
+from flask import current_app
+from app.ocr import OCR_TARGET_DPI, ocr_pool
+from app.extractors import ExtractionError
+from app.summarizers import SummarizationError
+from app.uploads import open_buffer
 
-api_key = os.environ.get("GROQ_API_KEY")
-if not api_key:
-    raise ValueError("GROQ_API_KEY environment variable is not set")
+# Large PDFs stop early instead of tying up a worker for minutes
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES") or 500)
+PDF_MAX_CHARS = int(os.environ.get("PDF_MAX_CHARS") or 2_000_000)
+PDF_PAGES_PER_TASK = 8
+PDF_OCR_EMPTY_PAGES = os.environ.get("PDF_OCR_EMPTY_PAGES", "1") != "0"
 
-client = Groq(api_key=api_key)
-def summarize_text(text):
+def summarize_text(text, summarizer=None):
     """
-    Summarizes the input text using the Groq API.
+    Summarizes the input text with the configured summarization provider.
+
+    With Groq, long texts are split into chunks that fit the model's context
+    window, the chunks are summarized concurrently and the chunk summaries are
+    then summarized together.
     
     Args:
-        text (str): The text to be summarized.
+        text (str | Iterable[str]): The text to be summarized, or a stream of text pieces.
+        summarizer (Summarizer, optional): Defaults to the application's summarizer.
         
     Returns:
-        str: Summarized text or error message.
+        str: Summarized text.
+
+    Raises:
+        SummarizationError: If no summary could be produced.
     """
+    summarizer = summarizer or current_app.extensions['summarizer']
     try:
-        # Make an API call to summarize the text
-        chat_completion = client.chat.completions.create(
-            messages=[{
-                "role": "user",
-                "content": f"Summarize the following text: {text}",
-            }],
-            model="llama3-8b-8192"  # Customize with the desired model
-        )
-        return chat_completion.choices[0].message.content
+        return summarizer.summarize(text)
+    except SummarizationError:
+        raise
     except Exception as e:
-        return f"Error summarizing text: {str(e)}"
+        raise SummarizationError(f"Error summarizing text: {str(e)}") from e
 
-def extract_text_from_file(filepath):
+def stream_summary(text, summarizer=None):
     """
-    Extracts text from a file based on its extension.
+    Summarizes the input text, yielding the summary in pieces as it is generated.
+
+    Args:
+        text (str | Iterable[str]): The text to be summarized, or a stream of text pieces.
+        summarizer (Summarizer, optional): Defaults to the application's summarizer.
+
+    Yields:
+        str: Consecutive pieces of the summary.
+
+    Raises:
+        SummarizationError: If no summary could be produced.
+    """
+    summarizer = summarizer or current_app.extensions['summarizer']
+    try:
+        yield from summarizer.stream(text)
+    except SummarizationError:
+        raise
+    except Exception as e:
+        raise SummarizationError(f"Error summarizing text: {str(e)}") from e
+
+def extract_text_from_file(filepath, filename=None):
+    """
+    Extracts text from a file with the extractor registered for its sniffed type.
+
+    The file is memory-mapped once; its first bytes pick the extractor, which
+    then reads from that buffer.
 
     Args:
         filepath (str): Path to the file to extract text from.
+        filename (str, optional): Original name, used to tell zip and text based
+            formats apart for stored blobs whose path has none. Defaults to filepath.
         
     Returns:
-        str: Extracted text or error message.
+        str: Extracted text.
+
+    Raises:
+        ExtractionError: If the file is missing, unsupported or can't be read.
     """
-    if not os.path.exists(filepath):
-        return "File does not exist."
+    from app.extractors import registry
 
-    ext = filepath.split('.')[-1].lower()
+    try:
+        buffer = open_buffer(filepath)
+    except FileNotFoundError:
+        raise ExtractionError("File does not exist.")
 
     try:
-        # Determine file type based on the extension and call appropriate extraction function
-        if ext == 'pdf':
-            return extract_text_from_pdf(filepath)
-        elif ext == 'docx':
-            return extract_text_from_docx(filepath)
-        elif ext in ['jpg', 'jpeg', 'png']:
-            return extract_text_from_image(filepath)
-        else:
-            return "Unsupported file type. Supported types: PDF, DOCX, JPG, JPEG, PNG."
+        mime_type, extractor = registry.detect(buffer, os.path.basename(filename or filepath))
+        if extractor is None:
+            supported = ", ".join(sorted(registry.extensions())).upper()
+            raise ExtractionError(f"Unsupported file type ({mime_type}). Supported types: {supported}.")
+        return extractor(buffer)
+    except ExtractionError:
+        raise
     except Exception as e:
-        return f"Error extracting text: {str(e)}"
+        raise ExtractionError(f"Error extracting text: {str(e)}") from e
+    finally:
+        buffer.close()
+
+def _ocr_pdf_page(page):
+    """Renders a page with no text layer (a scan) and runs OCR on it."""
+    image = page.to_image(resolution=OCR_TARGET_DPI).original
+    return ocr_pool.image_to_string(image, source_dpi=OCR_TARGET_DPI)
+
+def _iter_pdf_page_range(source, start, stop):
+    import pdfplumber
+    with pdfplumber.open(source, pages=range(start + 1, stop + 1)) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text() or ""  # Handle pages with no text
+            if not text.strip() and PDF_OCR_EMPTY_PAGES:
+                text = _ocr_pdf_page(page)
+            yield text
+            page.close()  # Drop the page's parsed objects before moving on
+
+def _extract_pdf_pages(source, start, stop):
+    """
+    Extracts the text of pages [start, stop) of a PDF. Runs inside extraction workers.
+
+    Returns:
+        list: Text of each page, empty for pages with no text.
+    """
+    return list(_iter_pdf_page_range(source, start, stop))
+
+def iter_pdf_pages(source, max_pages=None, max_chars=None, executor=None, window=4):
+    """
+    Yields the text of a PDF page by page, in order.
+
+    With an executor, batches of pages are extracted in parallel while earlier
+    pages are already being consumed. Extraction stops early once the page or
+    character budget is used up.
+
+    Args:
+        source (str | file): Path to the PDF file or a binary file object.
+        max_pages (int, optional): Maximum number of pages to read, defaults to PDF_MAX_PAGES.
+        max_chars (int, optional): Maximum number of characters to yield, defaults to PDF_MAX_CHARS.
+        executor (Executor, optional): Pool that page batches are spread across.
+        window (int): Number of page batches submitted ahead of the consumer.
 
-def extract_text_from_pdf(filepath):
+    Yields:
+        str: Text of each page that has any.
+    """
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    max_chars = PDF_MAX_CHARS if max_chars is None else max_chars
+
+    import pdfplumber
+    with pdfplumber.open(source) as pdf:
+        page_count = min(len(pdf.pages), max_pages)
+
+    # Workers in other processes open the file themselves, so that needs a path
+    if executor is None or not isinstance(source, str) or page_count <= PDF_PAGES_PER_TASK:
+        batches = ([text] for text in _iter_pdf_page_range(source, 0, page_count))
+        pending = deque()
+    else:
+        starts = iter(range(0, page_count, PDF_PAGES_PER_TASK))
+        pending = deque()
+
+        def submit_next():
+            start = next(starts, None)
+            if start is not None:
+                stop = min(start + PDF_PAGES_PER_TASK, page_count)
+                pending.append(executor.submit(_extract_pdf_pages, source, start, stop))
+
+        def results():
+            while pending:
+                texts = pending.popleft().result()
+                submit_next()
+                yield texts
+
+        for _ in range(window):
+            submit_next()
+        batches = results()
+
+    remaining = max_chars
+    try:
+        for texts in batches:
+            for text in texts:
+                if not text:
+                    continue
+                yield text[:remaining]
+                remaining -= len(text)
+                if remaining <= 0:
+                    return
+    finally:
+        # Budget reached or consumer stopped: don't parse pages nobody will read
+        for future in pending:
+            future.cancel()
+        batches.close()
+
+def extract_text_from_pdf(source, executor=None):
     """
     Extracts text from a PDF file.
 
     Args:
-        filepath (str): Path to the PDF file.
+        source (str | file): Path to the PDF file or a binary file object.
+        executor (Executor, optional): Pool to spread page extraction across.
         
     Returns:
-        str: Extracted text or error message.
+        str: Extracted text.
+
+    Raises:
+        ExtractionError: If the file can't be parsed.
     """
-    text = ""
     try:
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() or ""  # Handle pages with no text
+        return "\n".join(iter_pdf_pages(source, executor=executor))
     except Exception as e:
-        text = f"Error extracting text from PDF: {str(e)}"
-    return text
+        raise ExtractionError(f"Error extracting text from PDF: {str(e)}") from e
 
-def extract_text_from_docx(filepath):
+def extract_text_from_docx(source):
     """
-    Extracts text from a DOCX file.
+    Extracts text from a DOCX file, including tables, headers, footers and notes.
+
+    The XML is streamed out of the archive rather than loaded with python-docx,
+    so large documents are read in bounded memory.
 
     Args:
-        filepath (str): Path to the DOCX file.
+        source (str | file): Path to the DOCX file or a binary file object.
         
     Returns:
-        str: Extracted text or error message.
+        str: Extracted text.
+
+    Raises:
+        ExtractionError: If the file can't be parsed.
     """
-    text = ""
+    from app.extractors import iter_docx_text
     try:
-        doc = Document(filepath)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
+        return "\n".join(iter_docx_text(source))
     except Exception as e:
-        text = f"Error extracting text from DOCX: {str(e)}"
-    return text
+        raise ExtractionError(f"Error extracting text from DOCX: {str(e)}") from e
 
-def extract_text_from_image(filepath):
+def extract_text_from_image(source):
     """
     Extracts text from an image file using Tesseract OCR.
 
+    The image is binarized and downscaled to OCR_TARGET_DPI first; very large
+    images are split into strips that are recognised in parallel.
+
     Args:
-        filepath (str): Path to the image file.
+        source (str | file): Path to the image file or a binary file object.
         
     Returns:
-        str: Extracted text or error message.
+        str: Extracted text.
+
+    Raises:
+        ExtractionError: If the image can't be read or recognised.
     """
+    from PIL import Image
     try:
-        image = Image.open(filepath)
-        return pytesseract.image_to_string(image)
+        with Image.open(source) as image:
+            return ocr_pool.image_to_string(image)
     except Exception as e:
-        return f"Error extracting text from image: {str(e)}"
+        raise ExtractionError(f"Error extracting text from image: {str(e)}") from e
+
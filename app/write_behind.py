@@ -0,0 +1,163 @@
+import atexit
+import logging
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, or_
+
+logger = logging.getLogger(__name__)
+
+
+class TouchBuffer:
+    """
+    Collects timestamp updates in memory and writes them in bulk.
+
+    Touching a row only records (table, column, id) -> newest time. A
+    background thread writes everything collected every `interval` seconds,
+    or sooner once `max_items` touches are waiting, as one executemany UPDATE
+    per column in a single transaction. Reads that touch rows therefore never
+    open a write transaction of their own.
+
+    Args:
+        app (Flask): Application whose database the updates go to.
+        interval (float): Seconds between flushes; 0 writes every touch immediately.
+        max_items (int): Pending touches that trigger an early flush.
+    """
+
+    def __init__(self, app, interval=5.0, max_items=1000):
+        self.app = app
+        self.interval = interval
+        self.max_items = max_items
+        self._pending = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def touch(self, column, row_id, when=None):
+        """
+        Records that a row's timestamp column should be set to `when`.
+
+        Args:
+            column (Column): Mapped timestamp column, e.g. User.last_login.
+            row_id (int): Primary key of the row.
+            when (datetime, optional): Defaults to now (UTC).
+        """
+        if hasattr(column, 'property'):  # A mapped attribute such as User.last_login
+            column = column.property.columns[0]
+        when = when or datetime.utcnow()
+        with self._lock:
+            self._add(column, row_id, when)
+            full = self._count >= self.max_items
+        if self.interval <= 0:
+            self.flush()
+            return
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def _add(self, column, row_id, when):
+        # Keyed by name: Column objects overload == and can't be compared as dict keys
+        key = (column.table.name, column.key)
+        rows = self._pending.setdefault(key, (column, {}))[1]
+        if row_id not in rows:
+            self._count += 1
+        if rows.get(row_id) is None or rows[row_id] < when:
+            rows[row_id] = when
+
+    def pending(self):
+        with self._lock:
+            return self._count
+
+    def flush(self):
+        """
+        Writes every pending touch now.
+
+        Returns:
+            int: Number of rows updated.
+        """
+        with self._lock:
+            pending, self._pending, self._count = self._pending, {}, 0
+        if not pending:
+            return 0
+
+        from app import db
+        updated = 0
+        with self.app.app_context():
+            try:
+                for column, rows in pending.values():
+                    table = column.table
+                    # Never move a timestamp backwards if a newer one was written meanwhile
+                    statement = table.update().where(
+                        table.c.id == bindparam('row_id'),
+                        or_(column.is_(None), column < bindparam('when'))
+                    ).values({column.key: bindparam('when')})
+                    db.session.execute(statement, [
+                        {'row_id': row_id, 'when': when} for row_id, when in rows.items()
+                    ])
+                    updated += len(rows)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error writing buffered timestamps: {str(e)}")
+                # Keep them for the next flush rather than losing them
+                with self._lock:
+                    for column, rows in pending.values():
+                        for row_id, when in rows.items():
+                            self._add(column, row_id, when)
+                return 0
+        logger.debug(f"Flushed {updated} buffered timestamps")
+        return updated
+
+    def _ensure_thread(self):
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def shutdown(self):
+        """Stops the background thread and writes anything still pending."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+
+class WriteBehind:
+    """Flask extension giving each application its TouchBuffer."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        buffer = TouchBuffer(
+            app,
+            interval=app.config.get('WRITE_BEHIND_INTERVAL', 5.0),
+            max_items=app.config.get('WRITE_BEHIND_MAX_ITEMS', 1000)
+        )
+        app.extensions['write_behind'] = buffer
+        atexit.register(buffer.shutdown)
+
+    @property
+    def buffer(self):
+        return current_app.extensions['write_behind']
+
+    def touch(self, column, row_id, when=None):
+        self.buffer.touch(column, row_id, when)
+
+    def flush(self):
+        return self.buffer.flush()
+
+
+write_behind = WriteBehind()
@@ -0,0 +1,103 @@
+"""
+Measures throughput of concurrent uploads and profile reads on file SQLite.
+
+Runs the same mixed workload against a database with SQLAlchemy's default
+settings and against one using the engine options and pragmas from Config.
+
+    python benchmarks/db_concurrency.py --threads 8 --seconds 5 --write-ratio 0.3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from app.config import Config, TestConfig, engine_options
+from app.models import User, UploadedFile
+
+
+def run(label, engine_opts, pragmas, args):
+    workdir = tempfile.mkdtemp()
+    uri = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    class BenchConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = engine_opts
+        SQLITE_PRAGMAS = pragmas
+        UPLOAD_FOLDER = workdir
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'x',
+             'created_at': datetime.utcnow(), 'is_active': True}
+            for i in range(1, 51)
+        ])
+        db.session.commit()
+
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed):
+        rng = random.Random(seed)
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                user_id = rng.randint(1, 50)
+                kind = 'writes' if rng.random() < args.write_ratio else 'reads'
+                try:
+                    if kind == 'writes':
+                        db.session.add(UploadedFile(
+                            filename='f.pdf', original_filename='f.pdf', file_size=1,
+                            mime_type='application/pdf', user_id=user_id,
+                            extracted_text='x' * 2000, summarized_text='y' * 200
+                        ))
+                        db.session.commit()
+                    else:
+                        UploadedFile.listing_query().filter_by(user_id=user_id)\
+                            .order_by(UploadedFile.uploaded_at.desc()).limit(10).all()
+                        db.session.rollback()
+                    outcome = kind
+                except OperationalError:
+                    db.session.rollback()
+                    outcome = 'locked'
+                with lock:
+                    counts[outcome] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with app.app_context():
+        db.engine.dispose()
+
+    total = counts['reads'] + counts['writes']
+    print(f"{label:<10} {total / args.seconds:>9.0f} ops/s  reads {counts['reads']:>7}  "
+          f"writes {counts['writes']:>6}  'database is locked' {counts['locked']:>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.write_ratio:.0%} writes, {args.seconds:g}s each")
+    # SQLite's own defaults: rollback journal, synchronous=FULL, 5s lock timeout
+    run('before', {}, {}, args)
+    run('after', engine_options('sqlite:///bench.db'), Config.SQLITE_PRAGMAS, args)
+
+
+if __name__ == '__main__':
+    main()
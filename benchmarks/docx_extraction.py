@@ -0,0 +1,69 @@
+"""
+Compares the streaming DOCX extractor with loading the document through python-docx.
+
+The python-docx version is the extractor this app used before: it builds the
+whole object model and keeps only body paragraphs, so it reports fewer
+characters (no tables, headers or notes). Peak memory is measured with
+tracemalloc, which only sees Python allocations, lxml's included.
+
+    python benchmarks/docx_extraction.py --pages 100 300 1000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import extract_text_from_docx
+from synthetic import make_docx
+
+# Paragraphs of three sentences that fill a page, and a 3x3 table every few pages
+PARAGRAPHS_PER_PAGE = 8
+PAGES_PER_TABLE = 5
+
+
+def extract_with_python_docx(source):
+    from docx import Document
+    text = ""
+    for para in Document(source).paragraphs:
+        text += para.text + "\n"
+    return text
+
+
+def measure(extract, content, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = extract(io.BytesIO(content))
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    extract(io.BytesIO(content))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[100, 300, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    extractors = [('python-docx', extract_with_python_docx), ('streaming', extract_text_from_docx)]
+    print(f"{'pages':>6} {'KB':>7} {'extractor':<12} {'ms':>9} {'peak MB':>8} {'chars':>9}")
+    for pages in args.pages:
+        content = make_docx(pages * PARAGRAPHS_PER_PAGE, seed=pages, tables=pages // PAGES_PER_TABLE)
+        times = {}
+        for name, extract in extractors:
+            best, peak, chars = measure(extract, content, args.repeat)
+            times[name] = best
+            print(f"{pages:>6} {len(content) // 1024:>7} {name:<12} {best * 1000:>9.1f} "
+                  f"{peak / 2 ** 20:>8.1f} {chars:>9}")
+        print(f"{'':>6} {'':>7} speed-up {times['python-docx'] / times['streaming']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Reports the throughput of the local extractive summarizer.
+
+The extractive summarizer is the fallback when Groq is unavailable, so it
+must keep up with uploads on its own.
+
+    python benchmarks/extractive_summary.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.summarizers import ExtractiveSummarizer
+
+WORDS = ("report revenue growth quarter market customer product design system network "
+         "energy storage policy research data model analysis result method cost risk "
+         "the a of and to in is was for on with as by that this it").split()
+
+
+def make_text(chars, seed=0):
+    rng = random.Random(seed)
+    sentences, size = [], 0
+    while size < chars:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 25))]
+        sentence = " ".join(words).capitalize() + "."
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='Document sizes in characters')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    summarizer = ExtractiveSummarizer()
+    print(f"{'chars':>10} {'ms':>9} {'MB/s':>7}")
+    for size in args.sizes:
+        text = make_text(size)
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            summarizer.summarize(text)
+            best = min(best, time.perf_counter() - start)
+        print(f"{size:>10} {best * 1000:>9.1f} {len(text) / best / 1e6:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+"""
+Load test: users register, log in, upload documents and view their profile concurrently.
+
+Each concurrency level gets a fresh application and SQLite database. Requests
+go through the Flask test client ('client') or over HTTP to a local threaded
+server ('server'). Summaries come from the real Groq summarizer with its
+HTTP client replaced by a fake with configurable latency, so no API key or
+network is needed. Documents are synthetic and distinct per upload, so
+neither the upload dedupe nor the summary cache hides any work.
+
+Reports p50/p95/p99 latency per operation, request throughput, the time to
+drain the processing queue and peak RSS, and writes them as JSON. Each level
+runs in a freshly spawned process, so its peak RSS is its own:
+
+    python benchmarks/load.py --concurrency 1 4 16 --uploads 3 --kinds pdf docx txt \\
+        --output load.json
+    python benchmarks/load.py --concurrency 1 4 16 --compare load.json
+"""
+import argparse
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.config import TestConfig, engine_options
+from app.models import UploadedFile
+from synthetic import fake_groq_summarizer, make_document
+
+OPERATIONS = ('register', 'login', 'upload', 'profile')
+# Status each operation returns when it worked
+EXPECTED = {'register': 302, 'login': 302, 'upload': 202, 'profile': 200}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(fraction * len(values)) - 1))
+    return values[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS; it never goes down
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class TestClientSession:
+    """One user's session through the Flask test client."""
+
+    def __init__(self, app, base_url=None):
+        self.client = app.test_client()
+
+    def get(self, path):
+        return self.client.get(path).status_code
+
+    def post(self, path, data, upload=None):
+        data = dict(data)
+        if upload is not None:
+            name, content = upload
+            data['file'] = (io.BytesIO(content), name)
+        return self.client.post(path, data=data, headers={'Accept': 'application/json'}).status_code
+
+    def close(self):
+        pass
+
+
+class HttpSession:
+    """One user's session over HTTP to the local server."""
+
+    def __init__(self, app, base_url):
+        import httpx
+        self.client = httpx.Client(base_url=base_url, timeout=120)
+
+    def get(self, path):
+        return self.client.get(path).status_code
+
+    def post(self, path, data, upload=None):
+        files = {'file': upload} if upload is not None else None
+        return self.client.post(path, data=data, files=files,
+                                headers={'Accept': 'application/json'}).status_code
+
+    def close(self):
+        self.client.close()
+
+
+def make_app(workdir, args):
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+        UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+        PROCESSING_MODE = args.processing
+        PASSWORD_HASH_ITERATIONS = args.hash_iterations
+        PASSWORD_HASH_WORKERS = os.cpu_count() or 2
+        RATELIMIT_BACKEND = 'none'  # Every user logs in from the same address
+        WRITE_BEHIND_INTERVAL = 5
+
+    app = create_app(Config)
+    app.extensions['summarizer'] = fake_groq_summarizer(args.latency, args.jitter, args.error_rate)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def run_user(session_class, app, base_url, number, documents):
+    """Runs one user's requests; returns (latencies, errors) by operation, for this user only."""
+    session = session_class(app, base_url)
+    latencies = {operation: [] for operation in OPERATIONS}
+    errors = {operation: 0 for operation in OPERATIONS}
+
+    def timed(operation, fn):
+        start = time.perf_counter()
+        status = fn()
+        latencies[operation].append(time.perf_counter() - start)
+        if status != EXPECTED[operation]:
+            errors[operation] += 1
+
+    username, password = f'user{number}', 'correct horse battery'
+    try:
+        timed('register', lambda: session.post('/register', {
+            'username': username, 'email': f'{username}@example.com',
+            'password': password, 'confirm_password': password}))
+        timed('login', lambda: session.post('/login', {'username': username, 'password': password}))
+        for document in documents:
+            timed('upload', lambda: session.post('/upload', {}, upload=document))
+            timed('profile', lambda: session.get('/profile'))
+    finally:
+        session.close()
+    return latencies, errors
+
+
+def wait_for_jobs(app, timeout):
+    """Waits for every upload to finish processing; returns (seconds, counts by status)."""
+    start = time.perf_counter()
+    with app.app_context():
+        while True:
+            counts = dict(db.session.query(UploadedFile.processing_status, db.func.count())
+                          .group_by(UploadedFile.processing_status).all())
+            db.session.rollback()
+            busy = counts.get(UploadedFile.STATUS_PENDING, 0) + counts.get(UploadedFile.STATUS_PROCESSING, 0)
+            if not busy or time.perf_counter() - start > timeout:
+                return time.perf_counter() - start, counts
+            time.sleep(0.05)
+
+
+def run_level(mode, concurrency, args, documents):
+    workdir = tempfile.mkdtemp()
+    app = server = None
+    try:
+        app = make_app(workdir, args)
+        base_url = None
+        if mode == 'server':
+            from werkzeug.serving import make_server
+            server = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f'http://127.0.0.1:{server.server_port}'
+        session_class = HttpSession if mode == 'server' else TestClientSession
+
+        latencies = {operation: [] for operation in OPERATIONS}
+        errors = {operation: 0 for operation in OPERATIONS}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(run_user, session_class, app, base_url, number,
+                                documents[number * args.uploads:(number + 1) * args.uploads])
+                for number in range(concurrency * args.users_per_worker)
+            ]
+            # Each user counted on its own; merged here once its thread is done
+            for future in futures:
+                user_latencies, user_errors = future.result()
+                for operation in OPERATIONS:
+                    latencies[operation].extend(user_latencies[operation])
+                    errors[operation] += user_errors[operation]
+        wall = time.perf_counter() - start
+        drain, jobs = wait_for_jobs(app, args.drain_timeout)
+    finally:
+        if server is not None:
+            server.shutdown()
+        if app is not None:
+            app.extensions['pipeline'].shutdown()
+            app.extensions['write_behind'].shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    requests = sum(len(values) for values in latencies.values())
+    operations = {}
+    for operation, values in latencies.items():
+        values.sort()
+        operations[operation] = {
+            'count': len(values),
+            'errors': errors[operation],
+            'mean_ms': round(sum(values) / len(values) * 1000, 2) if values else None,
+            **{f'p{int(q * 100)}_ms': round(percentile(values, q) * 1000, 2) if values else None
+               for q in (0.5, 0.95, 0.99)},
+        }
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(requests / wall, 2),
+        'uploads_per_second': round(len(latencies['upload']) / wall, 2),
+        'drain_seconds': round(drain, 3),
+        'jobs': jobs,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'operations': operations,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_result(result):
+    print(f"\n{result['mode']} x{result['concurrency']}: {result['throughput_rps']} req/s, "
+          f"{result['uploads_per_second']} uploads/s, queue drained in {result['drain_seconds']}s, "
+          f"jobs {result['jobs']}, peak RSS {result['peak_rss_mb']} MB")
+    print(f"  {'operation':<10} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for operation, stats in result['operations'].items():
+        print(f"  {operation:<10} {stats['count']:>6} {stats['errors']:>6} "
+              f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['mode'], r['concurrency']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get((result['mode'], result['concurrency']))
+        if before is None:
+            continue
+        change = (result['throughput_rps'] - before['throughput_rps']) / before['throughput_rps'] * 100
+        print(f"  {result['mode']} x{result['concurrency']}: throughput {change:+.1f}%")
+        for operation, stats in result['operations'].items():
+            old = before['operations'].get(operation, {}).get('p95_ms')
+            if old and stats['p95_ms']:
+                print(f"    {operation:<10} p95 {old} -> {stats['p95_ms']} ms "
+                      f"({(stats['p95_ms'] - old) / old * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=['client', 'server'], nargs='+', default=['client', 'server'])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--users-per-worker', type=int, default=1)
+    parser.add_argument('--uploads', type=int, default=3, help='Uploads per user')
+    parser.add_argument('--kinds', nargs='+', default=['pdf', 'docx', 'txt'],
+                        choices=['pdf', 'docx', 'jpg', 'txt'])
+    parser.add_argument('--size', type=int, default=5,
+                        help='Pages per PDF, paragraphs per DOCX, lines per image, KB per text file')
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds per fake Groq completion')
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of fake Groq calls that fail')
+    parser.add_argument('--processing', choices=['thread', 'process', 'inline'], default='thread')
+    parser.add_argument('--hash-iterations', type=int, default=600_000)
+    parser.add_argument('--drain-timeout', type=float, default=300)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Earlier JSON results to compare with')
+    args = parser.parse_args()
+
+    most = max(args.concurrency) * args.users_per_worker * args.uploads
+    kinds = itertools.cycle(args.kinds)
+    documents = [make_document(next(kinds), args.size, seed=seed) for seed in range(most)]
+
+    results = []
+    for mode in args.mode:
+        for concurrency in args.concurrency:
+            # ru_maxrss never goes down, so a process shared between levels would report the highest so far
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                result = executor.submit(run_level, mode, concurrency, args, documents).result()
+            print_result(result)
+            results.append(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                    'git_revision': git_revision(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'cpus': os.cpu_count(),
+                    'arguments': vars(args),
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures what instrumentation adds to a request and to a single observation.
+
+Serves the same page with METRICS_ENABLED on and off and compares the mean
+request time, then times Histogram.observe on its own.
+
+    python benchmarks/metrics_overhead.py --requests 2000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.config import TestConfig
+from app.metrics import Histogram
+
+
+def mean_request_seconds(enabled, requests, workdir):
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, f'bench-{enabled}.db')}"
+        UPLOAD_FOLDER = workdir
+        METRICS_ENABLED = enabled
+
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    for _ in range(50):
+        client.get('/login')
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get('/login')
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--observations', type=int, default=200_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        off = mean_request_seconds(False, args.requests, workdir)
+        on = mean_request_seconds(True, args.requests, workdir)
+    finally:
+        shutil.rmtree(workdir)
+    print(f"GET /login: {off * 1e6:.0f} us without metrics, {on * 1e6:.0f} us with "
+          f"({(on - off) * 1e6:+.0f} us, {(on - off) / off * 100:+.1f}%)")
+
+    histogram = Histogram('bench_seconds', 'Benchmark.', ('stage',))
+    start = time.perf_counter()
+    for i in range(args.observations):
+        histogram.observe(i * 1e-6, 'extract')
+    elapsed = time.perf_counter() - start
+    print(f"Histogram.observe: {elapsed / args.observations * 1e9:.0f} ns per observation")
+
+
+if __name__ == '__main__':
+    main()
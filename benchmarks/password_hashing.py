@@ -0,0 +1,48 @@
+"""
+Reports password checks per second per core for each hashing setting.
+
+A login verifies one hash, so this is the login rate a single core sustains
+before any database or template work.
+
+    python benchmarks/password_hashing.py --seconds 2
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import check_password_hash
+
+from app.security import PasswordPolicy
+
+POLICIES = [
+    PasswordPolicy('pbkdf2', iterations=100_000),
+    PasswordPolicy('pbkdf2', iterations=310_000),
+    PasswordPolicy('pbkdf2', iterations=600_000),
+    PasswordPolicy('pbkdf2', iterations=1_000_000),
+    PasswordPolicy('scrypt', scrypt_n=2 ** 14),
+    PasswordPolicy('scrypt', scrypt_n=2 ** 15),
+    PasswordPolicy('scrypt', scrypt_n=2 ** 16),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0, help='Time spent on each setting')
+    args = parser.parse_args()
+
+    print(f"{'method':<24} {'ms/check':>9} {'logins/s/core':>14}")
+    for policy in POLICIES:
+        password_hash = policy.hash('correct horse battery staple')
+        checks, start = 0, time.perf_counter()
+        while time.perf_counter() - start < args.seconds:
+            check_password_hash(password_hash, 'correct horse battery staple')
+            checks += 1
+        elapsed = time.perf_counter() - start
+        print(f"{policy.method:<24} {elapsed / checks * 1000:>9.1f} {checks / elapsed:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
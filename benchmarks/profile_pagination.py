@@ -0,0 +1,105 @@
+"""
+Compares OFFSET and keyset pagination of the profile file listing.
+
+Seeds one user with many files in a temporary SQLite database, then times
+fetching pages at increasing depth with both strategies.
+
+    python benchmarks/profile_pagination.py --files 50000 --per-page 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.config import TestConfig
+from app.models import User, UploadedFile
+from app.pagination import encode_cursor, keyset_paginate
+
+
+def seed(user_id, count, batch=5000):
+    start = datetime(2024, 1, 1)
+    for offset in range(0, count, batch):
+        db.session.execute(UploadedFile.__table__.insert(), [
+            {
+                'filename': f'file{i}.pdf', 'original_filename': f'file{i}.pdf',
+                'file_size': 1024, 'mime_type': 'application/pdf',
+                'extracted_text': 'x' * 2000, 'summarized_text': 'y' * 200,
+                'extracted_preview': 'x' * 100, 'summary_preview': 'y' * 100,
+                # Some uploads share a timestamp so the id tie-break is exercised
+                'uploaded_at': start + timedelta(seconds=i // 3),
+                'processing_status': UploadedFile.STATUS_COMPLETED, 'user_id': user_id,
+            }
+            for i in range(offset, min(count, offset + batch))
+        ])
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=50000)
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        UPLOAD_FOLDER = workdir
+
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        print(f"Seeding {args.files} files...")
+        seed(user.id, args.files)
+
+        listing = UploadedFile.listing_query().filter_by(user_id=user.id)
+        pages = args.files // args.per_page
+        print(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10} {'speedup':>8}")
+        for page in (1, pages // 100 or 1, pages // 10 or 1, pages // 2 or 1, pages):
+            def offset_page():
+                listing.order_by(UploadedFile.uploaded_at.desc(), UploadedFile.id.desc())\
+                    .offset((page - 1) * args.per_page).limit(args.per_page).all()
+                db.session.expunge_all()
+
+            # The cursor for a page is the key of the last row of the page before it
+            cursor = None
+            if page > 1:
+                last = db.session.query(UploadedFile.uploaded_at, UploadedFile.id)\
+                    .filter_by(user_id=user.id)\
+                    .order_by(UploadedFile.uploaded_at.desc(), UploadedFile.id.desc())\
+                    .offset((page - 1) * args.per_page - 1).limit(1).one()
+                cursor = encode_cursor(*last)
+
+            def keyset_page():
+                keyset_paginate(listing, UploadedFile, args.per_page, after=cursor)
+                db.session.expunge_all()
+
+            offset_s = timed(offset_page, args.repeat)
+            keyset_s = timed(keyset_page, args.repeat)
+            print(f"{page:>8} {offset_s * 1000:>10.2f} {keyset_s * 1000:>10.2f} "
+                  f"{offset_s / keyset_s:>7.1f}x")
+
+        count_s = timed(lambda: UploadedFile.query.filter_by(user_id=user.id).count(), args.repeat)
+        print(f"COUNT(*) of all files: {count_s * 1000:.2f} ms (cached by the profile page)")
+
+
+if __name__ == '__main__':
+    main()
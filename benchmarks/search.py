@@ -0,0 +1,95 @@
+"""
+Measures full-text search latency on a large synthetic corpus.
+
+Seeds the FTS5 index of a temporary SQLite database with generated documents
+spread over many users, then times searches for rare, common and multi-term
+queries.
+
+    python benchmarks/search.py --files 1000000 --users 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.config import TestConfig
+from app.search import Fts5Backend, owner_token, search_index
+
+VOCABULARY = [f'word{i}' for i in range(20000)]
+
+
+def document(rng, words):
+    # Zipf-like choice: a few words are very common, most are rare
+    return ' '.join(VOCABULARY[min(int(rng.paretovariate(1.1)) - 1, len(VOCABULARY) - 1)]
+                    for _ in range(words))
+
+
+def seed(count, users, words, batch=10000):
+    rng = random.Random(42)
+    backend = search_index.backend
+    backend._ensure_table(db.session)
+    insert = text(f"INSERT INTO {Fts5Backend.TABLE} (rowid, filename, extracted_text, summarized_text, owner) "
+                  "VALUES (:id, :filename, :extracted, :summarized, :owner)")
+    for offset in range(0, count, batch):
+        db.session.execute(insert, [
+            {'id': i + 1, 'filename': f'file{i}.pdf', 'extracted': document(rng, words),
+             'summarized': document(rng, words // 10), 'owner': owner_token(i % users + 1)}
+            for i in range(offset, min(count, offset + batch))
+        ])
+        db.session.commit()
+    db.session.execute(text(f"INSERT INTO {Fts5Backend.TABLE} ({Fts5Backend.TABLE}) VALUES ('optimize')"))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--words', type=int, default=200, help='Words of extracted text per file')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'search.db')}"
+        UPLOAD_FOLDER = workdir
+        SEARCH_BACKEND = 'fts5'
+
+    app = create_app(Config)
+    with app.app_context():
+        start = time.perf_counter()
+        seed(args.files, args.users, args.words)
+        print(f"Indexed {args.files} files in {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(7)
+        queries = {
+            'common term': 'word0',
+            'mid term': 'word50',
+            'rare term': 'word5000',
+            'two terms': 'word3 word40',
+            'stemmed': 'word12s',
+        }
+        print(f"{'query':>12} {'p50 ms':>8} {'p95 ms':>8} {'hits':>5}")
+        for label, query in queries.items():
+            samples, hits = [], 0
+            for _ in range(args.repeat):
+                user_id = rng.randint(1, args.users)
+                began = time.perf_counter()
+                hits = len(search_index.search(user_id, query))
+                samples.append((time.perf_counter() - began) * 1000)
+            samples.sort()
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            print(f"{label:>12} {statistics.median(samples):>8.2f} {p95:>8.2f} {hits:>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Reports how long importing the application and calling create_app() takes.
+
+Each run is a fresh interpreter started with -X importtime, so module caches
+don't hide anything. Prints the median wall time and the slowest imports.
+
+    python benchmarks/startup.py --runs 5 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = """
+import time
+start = time.perf_counter()
+from app import create_app
+from app.config import TestConfig
+create_app(TestConfig)
+import app.routes
+print(f"startup_ms={(time.perf_counter() - start) * 1000:.1f}")
+"""
+
+
+def run_once():
+    """
+    Returns:
+        tuple: (wall time in ms, {module: cumulative import time in ms})
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative) / 1000
+    wall = float(result.stdout.strip().rsplit('startup_ms=', 1)[1])
+    return wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to list')
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    walls = [wall for wall, _ in runs]
+    print(f"startup: median {statistics.median(walls):.0f} ms, "
+          f"min {min(walls):.0f} ms, max {max(walls):.0f} ms over {args.runs} runs")
+
+    modules = runs[-1][1]
+    print(f"\n{'cumulative ms':>13}  module")
+    for name, ms in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{ms:>13.1f}  {name}")
+
+    heavy = [name for name in ('docx', 'PIL', 'pdfplumber', 'pytesseract', 'groq', 'httpx') if name in modules]
+    print(f"\nextraction/summarization libraries loaded at startup: {', '.join(heavy) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Synthetic documents and a fake Groq client for benchmarks.
+
+Every generator is deterministic for a given seed, so runs compare like with like.
+"""
+import io
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+WORDS = ("report revenue growth quarter market customer product design system network "
+         "energy storage policy research data model analysis result method cost risk "
+         "forecast budget region team supply demand pricing margin contract schedule "
+         "the a of and to in is was for on with as by that this it").split()
+
+
+def sentences(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 20))]
+        yield " ".join(words).capitalize() + "."
+
+
+def make_text(chars, seed=0):
+    """Plain text of about `chars` characters, in paragraphs of five sentences."""
+    parts, size = [], 0
+    for number, sentence in enumerate(sentences(chars, seed)):
+        parts.append(sentence + ("\n\n" if number % 5 == 4 else " "))
+        size += len(sentence) + 1
+        if size >= chars:
+            break
+    return "".join(parts).strip()
+
+
+def make_pdf(pages, lines_per_page=40, seed=0):
+    """
+    A PDF with text in the standard Helvetica font, built without any PDF library.
+
+    Returns:
+        bytes: The file.
+    """
+    text = sentences(pages * lines_per_page, seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        lines = [next(text)[:90] for _ in range(lines_per_page)]
+        body = " ".join(f"({line}) Tj T*" for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 760 Td {body} ET".encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def make_docx(paragraphs, seed=0, tables=0):
+    """
+    A DOCX with `paragraphs` paragraphs of three sentences and optional 3x3 tables.
+
+    Returns:
+        bytes: The file.
+    """
+    from docx import Document
+
+    text = sentences(paragraphs * 3 + tables * 9, seed)
+    document = Document()
+    for _ in range(paragraphs):
+        document.add_paragraph(" ".join(next(text) for _ in range(3)))
+    for _ in range(tables):
+        table = document.add_table(rows=3, cols=3)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = next(text)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def make_image(width=1240, height=1754, lines=40, seed=0):
+    """
+    A JPEG of black text on white, roughly an A4 page scanned at 150 DPI.
+
+    Returns:
+        bytes: The file.
+    """
+    from PIL import Image, ImageDraw
+
+    image = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    step = max(1, (height - 100) // max(1, lines))
+    for number, line in enumerate(sentences(lines, seed)):
+        draw.text((60, 50 + number * step), line[:100], fill=0)
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=85, dpi=(150, 150))
+    return buffer.getvalue()
+
+
+def make_document(kind, size, seed=0):
+    """
+    Returns (filename, content) for a document of a given kind and size.
+
+    Args:
+        kind (str): 'pdf', 'docx', 'jpg' or 'txt'.
+        size (int): Pages for PDFs, paragraphs for DOCX, text lines for images,
+            kilobytes for text.
+    """
+    if kind == 'pdf':
+        return f'doc{seed}.pdf', make_pdf(size, seed=seed)
+    if kind == 'docx':
+        return f'doc{seed}.docx', make_docx(size, seed=seed)
+    if kind == 'jpg':
+        return f'scan{seed}.jpg', make_image(lines=size, seed=seed)
+    if kind == 'txt':
+        return f'notes{seed}.txt', make_text(size * 1024, seed=seed).encode('utf-8')
+    raise ValueError(f"Unknown document kind: {kind}")
+
+
+class FakeGroqClient:
+    """
+    Stands in for groq.Groq: each completion sleeps like an API round-trip.
+
+    Latency is `latency` seconds plus up to `jitter` more, and one call in
+    `1 / error_rate` fails with a connection error, so retries get exercised.
+
+    Args:
+        latency (float): Base seconds per completion.
+        jitter (float): Extra random seconds per completion.
+        error_rate (float): Fraction of calls that fail.
+        seed (int): Seed for the jitter and failures.
+    """
+
+    def __init__(self, latency=0.2, jitter=0.05, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, model, **kwargs):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._rng.random() * self.jitter
+            fail = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        if fail:
+            import groq
+            import httpx
+            raise groq.APIConnectionError(request=httpx.Request('POST', 'https://fake.groq'))
+        prompt = messages[-1]['content']
+        reply = f"Summary of {len(prompt)} characters: " + prompt[-200:].strip()
+        message = SimpleNamespace(content=reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def close(self):
+        pass
+
+
+def fake_groq_summarizer(latency=0.2, jitter=0.05, error_rate=0.0):
+    """The real GroqSummarizer, with its HTTP client replaced by FakeGroqClient."""
+    from app.summarizers import GroqSummarizer
+
+    summarizer = GroqSummarizer('fake-key', backoff=0.01)
+    summarizer._client = FakeGroqClient(latency, jitter, error_rate)
+    return summarizer
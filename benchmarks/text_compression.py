@@ -0,0 +1,162 @@
+"""
+Reports database size and read latency of the app's schema with extracted text plain and compressed.
+
+Each codec gets its own SQLite file built by the application: the
+uploaded_files table and the FTS5 search index over it, holding the same
+completed uploads. 'text' is the layout before compression: raw text, and a
+search index keeping its own copy of every text. The others store
+extracted_text with CompressedText and index it through the external-content
+FTS5 table. Reported per codec: the file size after VACUUM, the part of it
+taken by the search index, the time to insert every upload (indexing
+included), the p50/p95 latency of loading one extracted text by id (query
+plus decompression) and the time to read them all.
+
+Synthetic text comes from a small vocabulary and compresses better than real
+documents; pass --corpus with a directory of .txt files to measure your own.
+
+    python benchmarks/text_compression.py --documents 2000 --size 100
+    python benchmarks/text_compression.py --corpus ./extracted --codecs text zlib
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text as sql
+
+from app import create_app, db
+from app.config import TestConfig, engine_options
+from app.models import User, UploadedFile
+from app.search import Fts5Backend, search_index
+from synthetic import make_text
+
+INSERT_BATCH = 200
+
+
+def load_documents(args):
+    if not args.corpus:
+        return [make_text(args.size * 1024, seed=seed) for seed in range(args.documents)]
+    documents = []
+    for name in sorted(os.listdir(args.corpus)):
+        if name.endswith('.txt'):
+            with open(os.path.join(args.corpus, name), encoding='utf-8', errors='replace') as f:
+                documents.append(f.read())
+    return documents
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def make_app(codec, level, workdir):
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, f'{codec}.db')}"
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+        UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+        SEARCH_BACKEND = 'fts5'
+        TEXT_COMPRESSION = 'none' if codec == 'text' else codec
+        TEXT_COMPRESSION_LEVEL = level
+
+    return create_app(Config)
+
+
+def use_legacy_index():
+    """Replaces the search index with the one kept before compression, which copies every text."""
+    table = Fts5Backend.TABLE
+    for trigger in ('insert', 'update', 'delete'):
+        db.session.execute(sql(f"DROP TRIGGER {table}_{trigger}"))
+    db.session.execute(sql(f"DROP TABLE {table}"))
+    db.session.execute(sql(
+        f"CREATE VIRTUAL TABLE {table} USING fts5("
+        "filename, extracted_text, summarized_text, owner, tokenize = 'porter unicode61')"))
+    db.session.execute(sql(
+        f"INSERT INTO {table} (rowid, filename, extracted_text, summarized_text, owner) "
+        f"SELECT id, filename, extracted_text, summarized_text, owner FROM {Fts5Backend.CONTENT}"))
+    db.session.commit()
+
+
+def measure(codec, level, documents, reads, workdir):
+    app = make_app(codec, level, workdir)
+    path = app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):]
+    with app.app_context():
+        db.create_all()
+        user = User(username='benchmark', email='benchmark@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        search_index.rebuild()  # Creates the index, so the triggers index every insert
+
+        start = time.perf_counter()
+        for first in range(0, len(documents), INSERT_BATCH):
+            db.session.add_all([
+                UploadedFile(filename=f'{number}.txt', original_filename=f'{number}.txt',
+                             file_size=len(text), mime_type='text/plain', user_id=user.id,
+                             extracted_text=text, summarized_text=text[:500],
+                             processing_status=UploadedFile.STATUS_COMPLETED)
+                for number, text in enumerate(documents[first:first + INSERT_BATCH], start=first + 1)
+            ])
+            db.session.commit()
+        if codec == 'text':
+            use_legacy_index()
+        write = time.perf_counter() - start
+
+        db.session.execute(sql('VACUUM'))
+        index_size = db.session.execute(sql(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE :prefix"),
+            {'prefix': f'{Fts5Backend.TABLE}%'}).scalar() or 0
+        size = os.path.getsize(path)
+
+        rng = random.Random(0)
+        latencies = []
+        query = db.session.query(UploadedFile.extracted_text)
+        for _ in range(reads):
+            start = time.perf_counter()
+            query.filter(UploadedFile.id == rng.randint(1, len(documents))).scalar()
+            latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        chars = sum(len(text) for text, in query.yield_per(INSERT_BATCH))
+        scan = time.perf_counter() - start
+        db.session.remove()
+        db.engine.dispose()
+    app.extensions['pipeline'].shutdown()
+    app.extensions['write_behind'].shutdown()
+    return {'size': size, 'index': index_size, 'write': write, 'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95), 'scan': scan, 'chars': chars}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--documents', type=int, default=2000)
+    parser.add_argument('--size', type=int, default=100, help='KB of synthetic text per document')
+    parser.add_argument('--corpus', help='Directory of .txt files to use instead of synthetic text')
+    parser.add_argument('--codecs', nargs='+', default=['text', 'none', 'zlib', 'lzma'],
+                        choices=['text', 'none', 'zlib', 'lzma'])
+    parser.add_argument('--level', type=int, default=6)
+    parser.add_argument('--reads', type=int, default=2000, help='Single-document reads to time')
+    args = parser.parse_args()
+
+    documents = load_documents(args)
+    total = sum(len(text.encode('utf-8')) for text in documents)
+    print(f"{len(documents)} documents, {total / 2 ** 20:.1f} MB of text, level {args.level}")
+    print(f"{'codec':<6} {'DB MB':>8} {'index MB':>9} {'ratio':>6} {'write s':>8} {'read p50 ms':>12} "
+          f"{'read p95 ms':>12} {'scan s':>7}")
+    workdir = tempfile.mkdtemp()
+    try:
+        baseline = None
+        for codec in args.codecs:
+            result = measure(codec, args.level, documents, args.reads, workdir)
+            baseline = baseline or result['size']
+            print(f"{codec:<6} {result['size'] / 2 ** 20:>8.1f} {result['index'] / 2 ** 20:>9.1f} "
+                  f"{baseline / result['size']:>6.2f} {result['write']:>8.2f} {result['p50'] * 1000:>12.3f} "
+                  f"{result['p95'] * 1000:>12.3f} {result['scan']:>7.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Compares committing each timestamp touch with buffering them.
+
+    python benchmarks/write_behind.py --touches 5000 --users 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.config import TestConfig
+from app.models import User
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--touches', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        UPLOAD_FOLDER = workdir
+        WRITE_BEHIND_INTERVAL = 3600  # Flushed explicitly below
+
+    app = create_app(Config)
+    rng = random.Random(1)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'x',
+             'created_at': datetime.utcnow(), 'is_active': True}
+            for i in range(args.users)
+        ])
+        db.session.commit()
+        ids = [rng.randint(1, args.users) for _ in range(args.touches)]
+
+        start = time.perf_counter()
+        for user_id in ids:
+            db.session.execute(User.__table__.update().where(User.id == user_id)
+                               .values(last_login=datetime.utcnow()))
+            db.session.commit()
+        direct = time.perf_counter() - start
+
+        buffer = app.extensions['write_behind']
+        start = time.perf_counter()
+        for user_id in ids:
+            buffer.touch(User.last_login, user_id)
+        touched = time.perf_counter() - start
+        start = time.perf_counter()
+        written = buffer.flush()
+        flushed = time.perf_counter() - start
+        buffer.shutdown()
+
+    print(f"Commit per touch: {args.touches} transactions in {direct * 1000:.0f} ms "
+          f"({direct / args.touches * 1e6:.0f} us per read)")
+    print(f"Write-behind:     {touched / args.touches * 1e6:.1f} us per read, then one transaction "
+          f"writing {written} rows in {flushed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""Add processing_error to uploaded files
+
+Revision ID: 3c1d8e2f4a90
+Revises: 76104f735e12
+Create Date: 2026-10-18 09:12:41.503127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1d8e2f4a90'
+down_revision = '76104f735e12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('processing_error', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.drop_column('processing_error')
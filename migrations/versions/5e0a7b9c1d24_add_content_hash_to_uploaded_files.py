@@ -0,0 +1,28 @@
+"""Add content_hash to uploaded files
+
+Revision ID: 5e0a7b9c1d24
+Revises: 3c1d8e2f4a90
+Create Date: 2026-10-18 10:02:17.884311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0a7b9c1d24'
+down_revision = '3c1d8e2f4a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index('ix_uploaded_files_content_hash', ['content_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.drop_index('ix_uploaded_files_content_hash')
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,47 @@
+"""Add text previews to uploaded files
+
+Revision ID: 7a1c3e5f9b02
+Revises: 5e0a7b9c1d24
+Create Date: 2026-10-18 11:24:05.316902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a1c3e5f9b02'
+down_revision = '5e0a7b9c1d24'
+branch_labels = None
+depends_on = None
+
+PREVIEW_LENGTH = 100
+BACKFILL_BATCH = 1000
+
+
+def upgrade():
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('extracted_preview', sa.String(length=PREVIEW_LENGTH),
+                                      nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('summary_preview', sa.String(length=PREVIEW_LENGTH),
+                                      nullable=False, server_default=''))
+
+    # Backfill in id ranges so a large table is not locked by one long UPDATE
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text('SELECT MAX(id) FROM uploaded_files')).scalar() or 0
+    for start in range(0, max_id + 1, BACKFILL_BATCH):
+        bind.execute(
+            sa.text(
+                'UPDATE uploaded_files '
+                'SET extracted_preview = SUBSTR(extracted_text, 1, :length), '
+                'summary_preview = SUBSTR(summarized_text, 1, :length) '
+                'WHERE id >= :start AND id < :stop'
+            ),
+            {'length': PREVIEW_LENGTH, 'start': start, 'stop': start + BACKFILL_BATCH}
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.drop_column('summary_preview')
+        batch_op.drop_column('extracted_preview')
@@ -0,0 +1,27 @@
+"""Add (user_id, uploaded_at, id) index to uploaded files
+
+Revision ID: 8b2d4f6a0c13
+Revises: 7a1c3e5f9b02
+Create Date: 2026-10-18 12:08:41.552170
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2d4f6a0c13'
+down_revision = '7a1c3e5f9b02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.create_index('ix_uploaded_files_user_uploaded_at_id',
+                              ['user_id', 'uploaded_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.drop_index('ix_uploaded_files_user_uploaded_at_id')
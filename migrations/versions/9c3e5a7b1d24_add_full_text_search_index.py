@@ -0,0 +1,38 @@
+"""Add full-text search index over uploaded files
+
+Revision ID: 9c3e5a7b1d24
+Revises: 8b2d4f6a0c13
+Create Date: 2026-10-18 13:40:12.903417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5a7b1d24'
+down_revision = '8b2d4f6a0c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Other databases use the LIKE search backend, which needs no index
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS uploaded_files_fts USING fts5("
+        "filename, extracted_text, summarized_text, owner, "
+        "tokenize = 'porter unicode61')"
+    )
+    op.execute(
+        "INSERT INTO uploaded_files_fts (rowid, filename, extracted_text, summarized_text, owner) "
+        "SELECT id, original_filename, extracted_text, summarized_text, 'u' || user_id "
+        "FROM uploaded_files WHERE processing_status = 'completed'"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE IF EXISTS uploaded_files_fts")
@@ -0,0 +1,71 @@
+"""Compress extracted text of uploaded files
+
+Revision ID: d5f7a9b1c3e6
+Revises: 9c3e5a7b1d24
+Create Date: 2026-10-18 16:05:41.228310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.database import CompressedText
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f7a9b1c3e6'
+down_revision = '9c3e5a7b1d24'
+branch_labels = None
+depends_on = None
+
+REWRITE_BATCH = 200  # Rows read and rewritten at a time; extracted texts can be hundreds of KB
+
+
+def _rewrite(convert, type_):
+    """
+    Rewrites extracted_text in id ranges, so no single statement holds a large table.
+
+    Args:
+        convert (Callable): Maps a stored value to its new value, or None to leave it.
+        type_ (TypeEngine): Type the new values are bound as.
+    """
+    bind = op.get_bind()
+    update = sa.text('UPDATE uploaded_files SET extracted_text = :value WHERE id = :id')\
+        .bindparams(sa.bindparam('value', type_=type_))
+    max_id = bind.execute(sa.text('SELECT MAX(id) FROM uploaded_files')).scalar() or 0
+    for start in range(0, max_id + 1, REWRITE_BATCH):
+        rows = bind.execute(
+            sa.text('SELECT id, extracted_text FROM uploaded_files WHERE id >= :start AND id < :stop'),
+            {'start': start, 'stop': start + REWRITE_BATCH}
+        ).all()
+        updates = [{'id': row_id, 'value': new} for row_id, new in
+                   ((row_id, convert(value)) for row_id, value in rows) if new is not None]
+        if updates:
+            bind.execute(update, updates)
+
+
+def upgrade():
+    column = CompressedText()  # The app's TEXT_COMPRESSION settings, as the model uses
+    # SQLite stores whatever it is given, so only other databases need a binary column
+    if op.get_bind().dialect.name != 'sqlite':
+        with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+            batch_op.alter_column('extracted_text', existing_type=sa.Text(), type_=sa.LargeBinary(),
+                                  existing_nullable=False,
+                                  postgresql_using="convert_to(extracted_text, 'UTF8')")
+
+    _rewrite(lambda value: None if CompressedText.is_encoded(value)
+             else column.encode(CompressedText.decode(value)), sa.LargeBinary())
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        _rewrite(lambda value: CompressedText.decode(value) if CompressedText.is_encoded(value) else None,
+                 sa.Text())
+        return
+
+    _rewrite(lambda value: CompressedText.decode(value).encode('utf-8')
+             if CompressedText.is_encoded(value) else None, sa.LargeBinary())
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.alter_column('extracted_text', existing_type=sa.LargeBinary(), type_=sa.Text(),
+                              existing_nullable=False,
+                              postgresql_using="convert_from(extracted_text, 'UTF8')")
@@ -0,0 +1,81 @@
+"""Index uploaded files for search without keeping a copy of their texts
+
+Revision ID: e7b9d1f3a5c8
+Revises: d5f7a9b1c3e6
+Create Date: 2026-10-18 18:22:07.514903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.database import create_sqlite_functions
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b9d1f3a5c8'
+down_revision = 'd5f7a9b1c3e6'
+branch_labels = None
+depends_on = None
+
+COLUMNS = "filename, extracted_text, summarized_text, owner"
+# What the rows are indexed as; extracted_text is stored compressed
+OLD_VALUES = ("old.original_filename, decompress_text(old.extracted_text), old.summarized_text, "
+              "'u' || old.user_id")
+NEW_VALUES = ("new.original_filename, decompress_text(new.extracted_text), new.summarized_text, "
+              "'u' || new.user_id")
+
+
+def _create_functions():
+    # The app defines them on every connection; done again in case this one predates that
+    create_sqlite_functions(op.get_bind().connection.driver_connection)
+
+
+def upgrade():
+    # Other databases use the LIKE search backend, which needs no index
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _create_functions()
+    op.execute("DROP TABLE IF EXISTS uploaded_files_fts")
+    op.execute(
+        "CREATE VIEW uploaded_files_search AS "
+        "SELECT id, original_filename AS filename, decompress_text(extracted_text) AS extracted_text, "
+        "summarized_text, 'u' || user_id AS owner FROM uploaded_files WHERE processing_status = 'completed'"
+    )
+    op.execute(
+        f"CREATE VIRTUAL TABLE uploaded_files_fts USING fts5({COLUMNS}, "
+        "content = 'uploaded_files_search', content_rowid = 'id', tokenize = 'porter unicode61')"
+    )
+    op.execute(
+        "CREATE TRIGGER uploaded_files_fts_insert AFTER INSERT ON uploaded_files "
+        "WHEN new.processing_status = 'completed' BEGIN "
+        f"INSERT INTO uploaded_files_fts (rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER uploaded_files_fts_update AFTER UPDATE OF "
+        "original_filename, extracted_text, summarized_text, user_id, processing_status ON uploaded_files BEGIN "
+        f"INSERT INTO uploaded_files_fts (uploaded_files_fts, rowid, {COLUMNS}) "
+        f"SELECT 'delete', old.id, {OLD_VALUES} WHERE old.processing_status = 'completed'; "
+        f"INSERT INTO uploaded_files_fts (rowid, {COLUMNS}) "
+        f"SELECT new.id, {NEW_VALUES} WHERE new.processing_status = 'completed'; END"
+    )
+    op.execute(
+        "CREATE TRIGGER uploaded_files_fts_delete AFTER DELETE ON uploaded_files "
+        "WHEN old.processing_status = 'completed' BEGIN "
+        f"INSERT INTO uploaded_files_fts (uploaded_files_fts, rowid, {COLUMNS}) "
+        f"VALUES ('delete', old.id, {OLD_VALUES}); END"
+    )
+    op.execute("INSERT INTO uploaded_files_fts (uploaded_files_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _create_functions()
+    for trigger in ('insert', 'update', 'delete'):
+        op.execute(f"DROP TRIGGER IF EXISTS uploaded_files_fts_{trigger}")
+    op.execute("DROP TABLE IF EXISTS uploaded_files_fts")
+    op.execute(
+        f"CREATE VIRTUAL TABLE uploaded_files_fts USING fts5({COLUMNS}, tokenize = 'porter unicode61')"
+    )
+    op.execute(f"INSERT INTO uploaded_files_fts (rowid, {COLUMNS}) SELECT id, {COLUMNS} FROM uploaded_files_search")
+    op.execute("DROP VIEW IF EXISTS uploaded_files_search")
@@ -0,0 +1,51 @@
+import shutil
+import tempfile
+import unittest
+
+from app import create_app, db
+from app.config import TestConfig
+from app.models import User
+from werkzeug.security import generate_password_hash
+
+PASSWORD = 'password123'
+
+
+class AppTestCase(unittest.TestCase):
+    """Runs each test against a fresh app and database with one user, testuser.
+
+    Subclasses adjust the config by overriding settings() and set logged_in to
+    start every test signed in as testuser.
+    """
+
+    logged_in = False
+
+    def settings(self):
+        """Config values to set on top of TestConfig."""
+        return {}
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        config = type('Config', (TestConfig,), {'UPLOAD_FOLDER': self.upload_dir, **self.settings()})
+        self.app = create_app(config)
+        with self.app.app_context():
+            db.create_all()
+            self.user_id = self.create_user('testuser', 'test@example.com')
+        self.client = self.app.test_client()
+        if self.logged_in:
+            self.login()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+        shutil.rmtree(self.upload_dir)
+
+    def create_user(self, username, email=None):
+        """Adds a user with the shared test password and returns its id; needs an app context."""
+        user = User(username=username, email=email or f'{username}@example.com',
+                    password=generate_password_hash(PASSWORD))
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+    def login(self, username='testuser'):
+        return self.client.post('/login', data={'username': username, 'password': PASSWORD})
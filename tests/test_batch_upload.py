@@ -0,0 +1,98 @@
+import io
+import os
+import zipfile
+import unittest
+from unittest import mock
+
+from app.models import UploadedFile
+from helpers import AppTestCase
+
+
+def make_zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+class TestBatchUpload(AppTestCase):
+
+    logged_in = True
+
+    def settings(self):
+        return {'MAX_FILE_SIZE': 64 * 1024, 'MAX_BATCH_FILES': 250}
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('app.utils.summarize_text', side_effect=lambda text: 'summary')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('app.utils.extract_text_from_file',
+                             side_effect=lambda path, filename: open(path, 'rb').read().decode())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, files):
+        return self.client.post('/upload/batch', data={'files': files},
+                                headers={'Accept': 'application/json'})
+
+    def test_multiple_files_and_archives_are_expanded(self):
+        archive = make_zip({
+            'docs/a.txt': 'archived a',
+            'docs/b.docx': 'archived b',
+            'docs/': '',
+            'notes.exe': 'not allowed',
+            '__MACOSX/docs/._a.txt': 'resource fork',
+        })
+        response = self.post([
+            (io.BytesIO(b'plain one'), 'one.txt'),
+            (io.BytesIO(b'plain two'), 'two.docx'),
+            (io.BytesIO(b'binary'), 'tool.exe'),
+            (archive, 'bundle.zip'),
+        ])
+        self.assertEqual(response.status_code, 202)
+        manifest = response.get_json()['files']
+
+        statuses = {entry['filename']: entry['status'] for entry in manifest}
+        self.assertEqual(statuses, {
+            'one.txt': 'queued',
+            'two.docx': 'queued',
+            'tool.exe': 'rejected',
+            'bundle.zip/docs/a.txt': 'queued',
+            'bundle.zip/docs/b.docx': 'queued',
+            'bundle.zip/notes.exe': 'rejected',
+        })
+
+        with self.app.app_context():
+            rows = UploadedFile.query.order_by(UploadedFile.id).all()
+            self.assertEqual([row.filename for row in rows], ['one.txt', 'two.docx', 'a.txt', 'b.docx'])
+            self.assertEqual(sorted(row.extracted_text for row in rows),
+                             ['archived a', 'archived b', 'plain one', 'plain two'])
+            self.assertTrue(all(row.processing_status == UploadedFile.STATUS_COMPLETED for row in rows))
+        self.assertEqual(os.listdir(os.path.join(self.upload_dir, '.incoming')), [])
+
+    def test_oversized_archive_entries_are_rejected(self):
+        archive = make_zip({'big.pdf': 'x' * (128 * 1024), 'small.pdf': 'fine'})
+        manifest = self.post([(archive, 'bundle.zip')]).get_json()['files']
+        statuses = {entry['filename']: entry['status'] for entry in manifest}
+        self.assertEqual(statuses, {'bundle.zip/big.pdf': 'rejected', 'bundle.zip/small.pdf': 'queued'})
+
+    def test_hundreds_of_files_in_one_request(self):
+        archive = make_zip({f'file{i}.pdf': f'document {i}' for i in range(300)})
+        manifest = self.post([(archive, 'many.zip')]).get_json()['files']
+
+        queued = [entry for entry in manifest if entry['status'] == 'queued']
+        self.assertEqual(len(queued), 250)
+        self.assertEqual(len(manifest), 300)
+        with self.app.app_context():
+            self.assertEqual(UploadedFile.query.count(), 250)
+
+    def test_nothing_accepted_is_a_client_error(self):
+        response = self.post([(io.BytesIO(b'binary'), 'tool.exe')])
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.config import TestConfig, engine_options
+from app.database import CompressedText
+
+
+class TestEngineOptions(unittest.TestCase):
+
+    def test_server_databases_get_a_pre_pinged_pool(self):
+        options = engine_options('postgresql://db/app', 'production')
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertEqual(options['pool_size'], 10)
+        self.assertLess(engine_options('postgresql://db/app')['pool_size'], options['pool_size'])
+
+    def test_in_memory_sqlite_gets_no_pool_options(self):
+        self.assertEqual(engine_options('sqlite:///:memory:'), {})
+
+    def test_sqlite_lock_timeout_is_only_the_pragma(self):
+        self.assertNotIn('connect_args', engine_options('sqlite:///app.db'))
+        self.assertIn('busy_timeout', TestConfig.SQLITE_PRAGMAS)
+
+    def test_sqlite_pragmas_are_applied_on_connect(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+
+        class Config(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'app.db')}"
+            SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+            SQLITE_PRAGMAS = dict(TestConfig.SQLITE_PRAGMAS)
+            UPLOAD_FOLDER = workdir
+
+        app = create_app(Config)
+        with app.app_context():
+            self.assertEqual(db.session.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+            self.assertEqual(db.session.execute(text('PRAGMA synchronous')).scalar(), 1)  # NORMAL
+            self.assertEqual(db.session.execute(text('PRAGMA busy_timeout')).scalar(), 5000)
+            db.session.remove()
+            db.engine.dispose()
+
+
+class TestCompressedText(unittest.TestCase):
+
+    TEXT = 'Quarterly revenue grew in every region. ' * 100
+
+    def test_round_trip(self):
+        for codec in CompressedText.CODECS:
+            column = CompressedText(codec, min_size=0)
+            stored = column.encode(self.TEXT)
+            self.assertEqual(stored[:2], b'\x00' + CompressedText.CODECS[codec])
+            self.assertEqual(CompressedText.decode(stored), self.TEXT)
+        self.assertLess(len(CompressedText('zlib').encode(self.TEXT)), len(self.TEXT) // 10)
+
+    def test_short_text_is_stored_raw(self):
+        self.assertEqual(CompressedText('zlib', min_size=512).encode('héllo'), b'\x00rh\xc3\xa9llo')
+
+    def test_settings_come_from_the_current_app(self):
+        column = CompressedText()
+        self.assertEqual(column.settings(), ('zlib', 6, 512))
+        for codec in ('none', 'lzma'):
+            class Config(TestConfig):
+                TEXT_COMPRESSION = codec
+                TEXT_COMPRESSION_MIN_SIZE = 0
+                UPLOAD_FOLDER = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, Config.UPLOAD_FOLDER)
+            with create_app(Config).app_context():
+                self.assertEqual(column.encode(self.TEXT)[:2], b'\x00' + CompressedText.CODECS[codec])
+        self.assertEqual(CompressedText('zlib', min_size=0).settings(), ('zlib', 6, 0))
+
+    def test_values_written_before_compression_are_read(self):
+        self.assertEqual(CompressedText.decode('plain text'), 'plain text')
+        self.assertEqual(CompressedText.decode(memoryview('plain text'.encode())), 'plain text')
+        self.assertIsNone(CompressedText.decode(None))
+
+    def test_model_column_is_compressed_in_the_database(self):
+        from app.models import User, UploadedFile
+
+        class Config(TestConfig):
+            UPLOAD_FOLDER = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, Config.UPLOAD_FOLDER)
+
+        app = create_app(Config)
+        with app.app_context():
+            db.create_all()
+            user = User(username='testuser', email='test@example.com', password='x')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(UploadedFile(filename='a.txt', original_filename='a.txt', file_size=1,
+                                        mime_type='text/plain', user_id=user.id,
+                                        extracted_text=self.TEXT, summarized_text='summary'))
+            db.session.commit()
+            stored = db.session.execute(text('SELECT extracted_text FROM uploaded_files')).scalar()
+            self.assertTrue(CompressedText.is_encoded(stored))
+            self.assertLess(len(stored), len(self.TEXT))
+
+            # A row written before the column was compressed
+            db.session.execute(text("UPDATE uploaded_files SET extracted_text = 'legacy text'"))
+            db.session.commit()
+            self.assertEqual(UploadedFile.query.one().extracted_text, 'legacy text')
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    unittest.main()
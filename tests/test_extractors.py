@@ -0,0 +1,194 @@
+import io
+import os
+import shutil
+import zipfile
+import tempfile
+import unittest
+from unittest import mock
+
+from app import db
+from app.config import Config
+from app.extractors import FAST, HEAVY, ExtractionError, extract_text_from_html, extract_text_from_pptx, iter_docx_text, registry
+from app.models import UploadedFile
+from app.uploads import sniff_mime_type
+from app.utils import extract_text_from_file
+from helpers import AppTestCase
+
+SLIDE = """<?xml version="1.0" encoding="UTF-8"?>
+<p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"
+       xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main">
+  <p:cSld><p:spTree><p:sp><p:txBody>{}</p:txBody></p:sp></p:spTree></p:cSld>
+</p:sld>"""
+
+
+def make_pptx(slides):
+    """Builds a minimal PPTX with one text box per slide; each slide is a list of paragraphs."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('[Content_Types].xml', '<Types/>')
+        for number, paragraphs in enumerate(slides, start=1):
+            body = ''.join(f'<a:p><a:r><a:t>{text}</a:t></a:r></a:p>' for text in paragraphs)
+            archive.writestr(f'ppt/slides/slide{number}.xml', SLIDE.format(body))
+    return buffer.getvalue()
+
+
+WORDML = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+          'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"')
+
+
+def paragraph(*runs):
+    return '<w:p>' + ''.join(f'<w:r>{run}</w:r>' for run in runs) + '</w:p>'
+
+
+def make_docx(body, parts=None):
+    """Builds a minimal DOCX from WordprocessingML; parts maps other part names to their XML."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('[Content_Types].xml', '<Types/>')
+        archive.writestr('word/document.xml', f'<w:document {WORDML}><w:body>{body}</w:body></w:document>')
+        for name, xml in (parts or {}).items():
+            archive.writestr(name, xml)
+    return buffer.getvalue()
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_every_allowed_extension_has_an_extractor(self):
+        self.assertLessEqual(Config.ALLOWED_EXTENSIONS, registry.extensions())
+
+    def test_cost_hints(self):
+        self.assertEqual(registry.lane('application/pdf'), HEAVY)
+        self.assertEqual(registry.lane('image/jpeg'), HEAVY)
+        self.assertEqual(registry.lane('text/plain'), FAST)
+        self.assertEqual(registry.lane('text/html'), FAST)
+        self.assertEqual(registry.lane('application/octet-stream'), HEAVY)
+
+    def test_text_formats_are_sniffed(self):
+        self.assertEqual(sniff_mime_type(b'# Title\n', 'notes.md'), 'text/markdown')
+        self.assertEqual(sniff_mime_type(b'  <!DOCTYPE html><html>', 'page.txt'), 'text/html')
+        self.assertEqual(sniff_mime_type(b'<p>hi</p>', 'page.htm'), 'text/html')
+        # The content wins over the extension
+        self.assertEqual(sniff_mime_type(b'%PDF-1.4', 'notes.md'), 'application/pdf')
+
+
+class TestExtractors(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_text_with_bom_and_invalid_bytes(self):
+        path = self.write('a.txt', b'\xef\xbb\xbfh\xc3\xa9llo\n' + b'x' * 100_000 + b'\xff')
+        text = extract_text_from_file(path)
+        self.assertTrue(text.startswith('héllo\n'))
+        self.assertTrue(text.endswith('�'))
+
+    def test_html_skips_scripts_and_breaks_blocks(self):
+        html = (b'<html><head><title>T</title><style>p {}</style></head><body>'
+                b'<h1>Heading</h1><script>var x = 1;</script><p>First &amp; only</p><p>Second</p>'
+                b'</body></html>')
+        self.assertEqual(extract_text_from_html(io.BytesIO(html)), 'Heading\nFirst & only\nSecond')
+
+    def test_pptx_slides_in_order(self):
+        content = make_pptx([['Title slide'], ['Point one', 'Point two']] + [['Slide'] for _ in range(9)]
+                            + [['Last']])
+        text = extract_text_from_pptx(io.BytesIO(content))
+        self.assertTrue(text.startswith('Title slide\n\nPoint one\nPoint two\n\n'))
+        self.assertTrue(text.endswith('Slide\n\nLast'))
+
+    def test_docx_tables_and_notes_in_order(self):
+        cell = '<w:tc>{}</w:tc>'
+        nested = f'<w:tbl><w:tr>{cell.format(paragraph("<w:t>x</w:t>"))}{cell.format(paragraph("<w:t>y</w:t>"))}</w:tr></w:tbl>'
+        body = (paragraph('<w:t>Intro</w:t>', '<w:tab/><w:t>tabbed</w:t>')
+                + '<w:tbl><w:tr>' + cell.format(paragraph('<w:t>a</w:t>') + paragraph('<w:t>b</w:t>'))
+                + cell.format(nested) + '</w:tr></w:tbl>'
+                + paragraph('<w:t>Line</w:t><w:br/><w:t>break</w:t>', '<w:delText>deleted</w:delText>')
+                + paragraph('<mc:AlternateContent><mc:Choice><w:t>Box</w:t></mc:Choice>'
+                            '<mc:Fallback><w:t>Box</w:t></mc:Fallback></mc:AlternateContent>'))
+        header = f'<w:hdr {WORDML}>{paragraph("<w:t>Header</w:t>")}</w:hdr>'
+        content = make_docx(body, {
+            'word/header1.xml': header,
+            'word/header2.xml': header,
+            'word/footer1.xml': f'<w:ftr {WORDML}>{paragraph("<w:t>Footer</w:t>")}</w:ftr>',
+            'word/footnotes.xml': f'<w:footnotes {WORDML}><w:footnote>{paragraph()}</w:footnote>'
+                                  f'<w:footnote>{paragraph("<w:t>A note</w:t>")}</w:footnote></w:footnotes>',
+        })
+        self.assertEqual(list(iter_docx_text(io.BytesIO(content))),
+                         ['Intro\ttabbed', 'a b\tx\ty', 'Line\nbreak', 'Box', 'Header', 'Footer', 'A note'])
+
+    def test_docx_from_python_docx(self):
+        from docx import Document
+        document = Document()
+        document.add_paragraph('First paragraph')
+        table = document.add_table(rows=1, cols=2)
+        table.cell(0, 0).text, table.cell(0, 1).text = 'left', 'right'
+        document.sections[0].header.paragraphs[0].text = 'Running head'
+        buffer = io.BytesIO()
+        document.save(buffer)
+        path = self.write('report.docx', buffer.getvalue())
+        self.assertEqual(extract_text_from_file(path), 'First paragraph\nleft\tright\nRunning head')
+
+    def test_dispatch_uses_content_not_extension(self):
+        path = self.write('deck.pptx', make_pptx([['Hello']]))
+        self.assertEqual(extract_text_from_file(path), 'Hello')
+        path = self.write('blob', b'plain words')
+        self.assertEqual(extract_text_from_file(path, 'notes.pdf'), 'plain words')
+
+    def test_unsupported_content(self):
+        path = self.write('a.txt', b'\x00\x01\x02')
+        with self.assertRaisesRegex(ExtractionError, r'Unsupported file type \(application/octet-stream\)'):
+            extract_text_from_file(path)
+
+    def test_corrupt_files_raise(self):
+        for name, content in (('a.docx', b'PK\x03\x04 not really a zip'), ('a.jpg', b'\xff\xd8\xff\xe0 truncated')):
+            path = self.write(name, content)
+            with self.assertRaises(ExtractionError):
+                extract_text_from_file(path)
+
+
+class TestUploadRouting(AppTestCase):
+
+    logged_in = True
+
+    def post(self, content, name):
+        return self.client.post('/upload', data={'file': (io.BytesIO(content), name)},
+                                headers={'Accept': 'application/json'})
+
+    @mock.patch('app.utils.summarize_text', return_value='summary')
+    def test_text_upload_is_extracted(self, summarize):
+        response = self.post(b'<html><body><p>Quarterly report</p></body></html>', 'report.html')
+        self.assertEqual(response.status_code, 202)
+        with self.app.app_context():
+            uploaded_file = db.session.get(UploadedFile, response.get_json()['job_id'])
+            self.assertEqual(uploaded_file.mime_type, 'text/html')
+            self.assertEqual(uploaded_file.extracted_text, 'Quarterly report')
+
+    def test_legacy_doc_is_not_allowed(self):
+        response = self.post(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'old.doc')
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(UploadedFile.query.count(), 0)
+
+    def test_unsupported_content_is_rejected(self):
+        response = self.post(b'\x00\x01\x02binary', 'notes.txt')
+        self.assertEqual(response.status_code, 400)
+        with self.app.app_context():
+            self.assertEqual(UploadedFile.query.count(), 0)
+            self.assertEqual(os.listdir(self.app.extensions['storage'].temp_dir), [])
+
+    def test_fast_files_use_the_fast_lane(self):
+        workers = self.app.extensions['pipeline']
+        self.assertIsNot(workers.job_executor(FAST), workers.job_executor(HEAVY))
+        workers.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import time
+import threading
+import unittest
+
+from app.metrics import Histogram, SamplingProfiler, registry, timed
+from helpers import AppTestCase
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_cumulative_buckets_and_render(self):
+        histogram = Histogram('test_seconds', 'Test.', ('stage',), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value, 'a')
+
+        series = histogram.snapshot()[('a',)]
+        self.assertEqual(series['count'], 4)
+        self.assertAlmostEqual(series['sum'], 6.05)
+        self.assertEqual(series['buckets'], [(0.1, 1), (1, 3), (float('inf'), 4)])
+        self.assertIn('test_seconds_bucket{stage="a",le="+Inf"} 4', histogram.render())
+        self.assertIn('test_seconds_count{stage="a"} 4', histogram.render())
+
+    def test_timer_as_decorator(self):
+        histogram = Histogram('test_timer_seconds', 'Test.')
+
+        @histogram.time()
+        def work():
+            time.sleep(0.01)
+            return 'done'
+
+        self.assertEqual(work(), 'done')
+        self.assertGreaterEqual(histogram.snapshot()[()]['sum'], 0.01)
+
+    def test_overlapping_decorated_calls_are_timed_apart(self):
+        histogram = Histogram('test_overlap_seconds', 'Test.', buckets=(0.15, 1))
+        started = threading.Event()
+
+        @histogram.time()
+        def work(seconds):
+            started.set()
+            time.sleep(seconds)
+
+        slow = threading.Thread(target=work, args=(0.3,))
+        slow.start()
+        started.wait(5)
+        time.sleep(0.1)
+        work(0.3)
+        slow.join(5)
+
+        series = histogram.snapshot()[()]
+        self.assertEqual(series['buckets'], [(0.15, 0), (1, 2), (float('inf'), 2)])
+        self.assertGreaterEqual(series['sum'], 0.6)
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_samples_the_profiled_thread(self):
+        profiler = SamplingProfiler(interval=0.001).start()
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        profiler.stop()
+        self.assertIn('test_samples_the_profiled_thread', profiler.collapsed())
+
+
+class TestMetricsEndpoint(AppTestCase):
+
+    def settings(self):
+        return {'PROFILE_REQUESTS': True, 'PROFILE_MIN_SECONDS': 0,
+                'PROFILE_DIR': os.path.join(self.upload_dir, 'profiles')}
+
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_requests_and_queries_are_counted(self):
+        self.login()
+        with timed('extract'):
+            pass
+
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('# TYPE http_request_seconds histogram', text)
+        self.assertIn('http_request_seconds_count{endpoint="main.login",method="POST",status="302"} 1', text)
+        self.assertIn('http_request_db_queries_count{endpoint="main.login"} 1', text)
+        self.assertIn('db_query_seconds_count{operation="select"}', text)
+        self.assertIn('upload_stage_seconds_count{stage="extract"} 1', text)
+        self.assertIn('# TYPE user_cache_hits_total counter', text)
+        self.assertIn('\nuser_cache_misses_total ', text)
+
+    def test_metrics_are_only_served_to_allowed_networks(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        response = self.client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.5'})
+        self.assertEqual(response.status_code, 403)
+
+        self.app.config['METRICS_ALLOWED_NETWORKS'] = ('203.0.113.0/24',)
+        response = self.client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.5'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_queries_per_request(self):
+        self.login()
+        series = registry.get('http_request_db_queries').snapshot()[('main.login',)]
+        # Looking the user up, at least
+        self.assertGreaterEqual(series['sum'], 1)
+
+    def test_profiled_request_is_saved(self):
+        self.client.get('/login', headers={'X-Profile': '1'})
+        self.client.get('/login')
+        profiles = os.listdir(os.path.join(self.upload_dir, 'profiles'))
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].endswith('-main.login.folded'))
+
+
+if __name__ == '__main__':
+    unittest.main()
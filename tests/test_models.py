@@ -0,0 +1,58 @@
+import unittest
+
+from sqlalchemy import event, inspect
+
+from app import db
+from app.models import PREVIEW_LENGTH, UploadedFile
+from helpers import AppTestCase
+
+
+class TestUploadedFileColumns(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            db.session.add(UploadedFile(
+                filename='report.docx', original_filename='report.docx',
+                file_size=10, mime_type='text/plain', user_id=self.user_id,
+                extracted_text='x' * 5000, summarized_text='short summary'
+            ))
+            db.session.commit()
+
+    def test_previews_follow_text(self):
+        with self.app.app_context():
+            uploaded_file = UploadedFile.query.one()
+            self.assertEqual(uploaded_file.extracted_preview, 'x' * PREVIEW_LENGTH)
+            self.assertEqual(uploaded_file.summary_preview, 'short summary')
+
+            uploaded_file.summarized_text = 'a new summary'
+            self.assertEqual(uploaded_file.summary_preview, 'a new summary')
+
+    def test_full_texts_are_deferred(self):
+        with self.app.app_context():
+            uploaded_file = UploadedFile.query.one()
+            unloaded = inspect(uploaded_file).unloaded
+            self.assertIn('extracted_text', unloaded)
+            self.assertIn('summarized_text', unloaded)
+            self.assertEqual(len(uploaded_file.extracted_text), 5000)
+
+    def test_listing_query_selects_narrow_columns(self):
+        statements = []
+        with self.app.app_context():
+            def record(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                files = UploadedFile.listing_query().filter_by(user_id=self.user_id).all()
+                self.assertEqual(files[0].extracted_preview, 'x' * PREVIEW_LENGTH)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn('extracted_text', statements[0])
+        self.assertNotIn('users', statements[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
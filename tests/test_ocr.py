@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+from PIL import Image, ImageDraw
+
+from app.ocr import OcrPool, otsu_threshold, preprocess, split_into_strips, timings
+
+
+def lined_page(width=1000, height=6000, line_height=30, gap=50):
+    """A white page with black bars standing in for lines of text."""
+    image = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for top in range(gap, height - line_height, line_height + gap):
+        draw.rectangle((50, top, width - 50, top + line_height), fill=20)
+    return image
+
+
+class TestPreprocessing(unittest.TestCase):
+
+    def test_otsu_separates_two_peaks(self):
+        histogram = [0] * 256
+        histogram[30] = 500
+        histogram[220] = 1500
+        self.assertTrue(30 <= otsu_threshold(histogram) < 220)
+
+    def test_downscales_to_target_dpi_and_binarizes(self):
+        image = Image.new('RGB', (1200, 600), (200, 200, 200))
+        ImageDraw.Draw(image).rectangle((100, 100, 300, 200), fill=(40, 40, 40))
+        prepared = preprocess(image, source_dpi=600, target_dpi=300)
+        self.assertEqual(prepared.size, (600, 300))
+        self.assertEqual(prepared.mode, 'L')
+        self.assertLessEqual(set(prepared.tobytes()), {0, 255})
+
+    def test_strips_are_cut_on_blank_rows(self):
+        image = lined_page()
+        strips = split_into_strips(image, max_pixels=1000 * 1000)
+        self.assertGreater(len(strips), 5)
+        self.assertEqual(sum(strip.height for strip in strips), image.height)
+        for strip in strips[:-1]:
+            # The last row of each strip is background, so no line was cut in half
+            last_row = strip.crop((0, strip.height - 1, strip.width, strip.height))
+            self.assertEqual(set(last_row.tobytes()), {255})
+
+    def test_small_images_are_not_split(self):
+        image = Image.new('L', (100, 100), 255)
+        self.assertEqual(split_into_strips(image), [image])
+
+
+class TestOcrPool(unittest.TestCase):
+
+    def test_strips_run_in_parallel_up_to_the_cap(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def fake_ocr(image):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+            return f"strip {image.height}\n"
+
+        pool = OcrPool(concurrency=2)
+        timings.reset()
+        with mock.patch('pytesseract.image_to_string', side_effect=fake_ocr), \
+                mock.patch('app.ocr.split_into_strips',
+                           side_effect=lambda image: split_into_strips(image, max_pixels=1000 * 1000)):
+            text = pool.image_to_string(lined_page(), source_dpi=300)
+        pool.shutdown()
+
+        self.assertGreater(len(peak), 2)
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(len(text.splitlines()), len(peak))
+        stages = timings.snapshot()
+        self.assertEqual(stages['ocr']['count'], len(peak))
+        self.assertEqual(stages['preprocess']['count'], 1)
+
+    def test_tesseract_threads_are_limited_when_the_pool_starts(self):
+        pool = OcrPool(concurrency=1)
+        with mock.patch.dict(os.environ, clear=True):
+            pool._get_executor()
+            self.assertEqual(os.environ['OMP_THREAD_LIMIT'], '1')
+        pool.shutdown()
+
+    def test_worker_processes_share_the_concurrency(self):
+        from app.tasks import _Workers
+
+        workers = _Workers({'PROCESSING_MODE': 'process', 'EXTRACTION_WORKERS': 2,
+                            'SUMMARY_CONCURRENCY': 1})
+        try:
+            with mock.patch('app.tasks.OCR_CONCURRENCY', 8):
+                executor = workers.extract_executor()
+            concurrency = executor.submit(worker_ocr_concurrency).result(timeout=30)
+        finally:
+            workers.shutdown()
+        self.assertEqual(concurrency, 4)
+
+
+def worker_ocr_concurrency():
+    from app.ocr import ocr_pool
+    return ocr_pool.concurrency
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import UploadedFile
+from app.pagination import CountCache, decode_cursor, encode_cursor, file_counts, keyset_paginate
+from helpers import AppTestCase
+
+
+class TestKeysetPagination(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            start = datetime(2024, 1, 1)
+            # Pairs of files share a timestamp, so ordering relies on the id tie-break
+            db.session.add_all([
+                UploadedFile(
+                    filename=f'file{i}.txt', original_filename=f'file{i}.txt',
+                    file_size=1, mime_type='text/plain', user_id=self.user_id,
+                    extracted_text='', summarized_text='',
+                    uploaded_at=start + timedelta(minutes=i // 2)
+                )
+                for i in range(25)
+            ])
+            db.session.commit()
+        # Counts are cached per process and user ids repeat across test databases
+        file_counts.invalidate(self.user_id)
+
+    def newest_first_ids(self):
+        return [f.id for f in UploadedFile.query.order_by(
+            UploadedFile.uploaded_at.desc(), UploadedFile.id.desc())]
+
+    def test_cursor_round_trip(self):
+        moment = datetime(2024, 5, 6, 7, 8, 9, 123456)
+        self.assertEqual(decode_cursor(encode_cursor(moment, 42)), (moment, 42))
+        self.assertIsNone(decode_cursor('not a cursor'))
+
+    def test_walks_every_file_once_in_order(self):
+        with self.app.app_context():
+            query = UploadedFile.listing_query().filter_by(user_id=self.user_id)
+            seen, cursor, pages = [], None, []
+            while True:
+                page = keyset_paginate(query, UploadedFile, 10, after=cursor)
+                pages.append(page)
+                seen.extend(f.id for f in page.items)
+                if not page.has_next:
+                    break
+                cursor = page.next_cursor
+            self.assertEqual(seen, self.newest_first_ids())
+            self.assertEqual([len(p.items) for p in pages], [10, 10, 5])
+            self.assertFalse(pages[0].has_prev)
+
+            # Going back from the last page returns the middle page again
+            back = keyset_paginate(query, UploadedFile, 10, before=pages[2].prev_cursor)
+            self.assertEqual([f.id for f in back.items], [f.id for f in pages[1].items])
+            self.assertTrue(back.has_prev)
+            self.assertTrue(back.has_next)
+
+    def test_profile_follows_cursor(self):
+        self.client.post('/login', data={'username': 'testuser', 'password': 'password123'})
+        first = self.client.get('/profile')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn(b'25 files', first.data)
+
+        with self.app.app_context():
+            ids = self.newest_first_ids()
+            last_on_first_page = db.session.get(UploadedFile, ids[9])
+            cursor = encode_cursor(last_on_first_page.uploaded_at, last_on_first_page.id)
+            eleventh = db.session.get(UploadedFile, ids[10]).filename
+        second = self.client.get(f'/profile?after={cursor}')
+        self.assertIn(eleventh.encode(), second.data)
+
+
+class TestCountCache(unittest.TestCase):
+
+    def test_count_is_cached_until_invalidated(self):
+        cache = CountCache(ttl=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(cache.get('user', compute), 1)
+        self.assertEqual(cache.get('user', compute), 1)
+        cache.invalidate('user')
+        self.assertEqual(cache.get('user', compute), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
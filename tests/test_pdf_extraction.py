@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+from app import utils
+
+
+def make_pdf(path, pages):
+    """Writes a minimal PDF with one line of Helvetica text per page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects)))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+class TestPdfExtraction(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'doc.pdf')
+        make_pdf(self.path, [f"Page number {i}" for i in range(30)])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_pages_are_yielded_in_order(self):
+        pages = list(utils.iter_pdf_pages(self.path))
+        self.assertEqual(pages, [f"Page number {i}" for i in range(30)])
+
+    def test_parallel_extraction_matches_sequential(self):
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            parallel = list(utils.iter_pdf_pages(self.path, executor=executor, window=2))
+        self.assertEqual(parallel, list(utils.iter_pdf_pages(self.path)))
+
+    def test_page_budget_stops_early(self):
+        pages = list(utils.iter_pdf_pages(self.path, max_pages=5))
+        self.assertEqual(len(pages), 5)
+
+    def test_character_budget_stops_early(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pages = list(utils.iter_pdf_pages(self.path, max_chars=40, executor=executor))
+        self.assertEqual(sum(len(page) for page in pages), 40)
+        self.assertEqual(len(pages), 4)
+
+    def test_scanned_pages_are_ocrd(self):
+        path = os.path.join(self.tmpdir, 'scan.pdf')
+        make_pdf(path, ["Typed page", ""])
+        with mock.patch.object(utils.ocr_pool, 'image_to_string', return_value="Scanned page") as ocr:
+            pages = list(utils.iter_pdf_pages(path))
+        self.assertEqual(pages, ["Typed page", "Scanned page"])
+        ocr.assert_called_once()
+
+    def test_extract_text_from_pdf_joins_pages(self):
+        text = utils.extract_text_from_pdf(self.path)
+        self.assertEqual(text.split("\n"), [f"Page number {i}" for i in range(30)])
+
+
+    def test_pipeline_streams_pages_into_summarizer(self):
+        from app.tasks import _Workers, _extract_and_summarize
+
+        workers = _Workers({'PROCESSING_MODE': 'thread', 'EXTRACTION_WORKERS': 2,
+                            'SUMMARY_CONCURRENCY': 1})
+        consumed = []
+
+        def summarize(source):
+            self.assertNotIsInstance(source, str)
+            consumed.extend(source)
+            return 'summary'
+
+        with mock.patch('app.utils.summarize_text', side_effect=summarize):
+            extracted, summary = _extract_and_summarize(workers, self.path, 'doc.pdf')
+        workers.shutdown()
+
+        self.assertEqual(consumed, [f"Page number {i}" for i in range(30)])
+        self.assertEqual(extracted, "\n".join(consumed))
+        self.assertEqual(summary, 'summary')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import event
+
+from app import db
+from app.ratelimit import MemoryBackend, SQLiteBackend
+from helpers import AppTestCase
+
+
+class BackendTests:
+    """Token bucket behaviour shared by every backend."""
+
+    def make_backend(self):
+        raise NotImplementedError
+
+    def test_burst_then_refill(self):
+        backend = self.make_backend()
+        results = [backend.hit('k', rate=1.0, burst=3, now=100.0)[0] for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+
+        allowed, retry_after = backend.hit('k', rate=1.0, burst=3, now=100.5)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 0.5)
+        self.assertTrue(backend.hit('k', rate=1.0, burst=3, now=101.0)[0])
+
+    def test_keys_are_independent(self):
+        backend = self.make_backend()
+        backend.hit('a', rate=1.0, burst=1, now=0.0)
+        self.assertFalse(backend.hit('a', rate=1.0, burst=1, now=0.0)[0])
+        self.assertTrue(backend.hit('b', rate=1.0, burst=1, now=0.0)[0])
+
+
+class TestMemoryBackend(BackendTests, unittest.TestCase):
+
+    def make_backend(self):
+        return MemoryBackend()
+
+    def test_idle_buckets_are_pruned(self):
+        backend = MemoryBackend(shards=1, max_keys=2)
+        for key in 'abc':
+            backend.hit(key, rate=1.0, burst=1, now=0.0)
+        backend.hit('d', rate=1.0, burst=1, now=10.0)
+        buckets, _ = backend._shards[0]
+        self.assertEqual(list(buckets), ['d'])
+
+    def test_prune_uses_each_buckets_own_limits(self):
+        backend = MemoryBackend(shards=1, max_keys=1)
+        # Refills in 100 seconds; must survive a prune made by a fast bucket
+        backend.hit('slow', rate=0.01, burst=2, now=0.0)
+        backend.hit('slow', rate=0.01, burst=2, now=0.0)
+        backend.hit('fast', rate=1.0, burst=1, now=10.0)
+        buckets, _ = backend._shards[0]
+        self.assertIn('slow', buckets)
+        self.assertFalse(backend.hit('slow', rate=0.01, burst=2, now=10.0)[0])
+
+
+class TestSQLiteBackend(BackendTests, unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'limits.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_backend(self):
+        return SQLiteBackend(self.path)
+
+    def test_limits_are_shared_between_instances(self):
+        first, second = SQLiteBackend(self.path), SQLiteBackend(self.path)
+        self.assertTrue(first.hit('k', rate=1.0, burst=1, now=0.0)[0])
+        self.assertFalse(second.hit('k', rate=1.0, burst=1, now=0.0)[0])
+
+    def test_idle_buckets_are_pruned_while_hitting(self):
+        backend = SQLiteBackend(self.path, prune_every=3, idle_after=60)
+        backend.hit('old', rate=1.0, burst=1, now=0.0)
+        backend.hit('recent', rate=1.0, burst=1, now=50.0)
+        backend.hit('new', rate=1.0, burst=1, now=100.0)
+        keys = [row[0] for row in backend._connect().execute('SELECT key FROM buckets ORDER BY key')]
+        self.assertEqual(keys, ['new', 'recent'])
+
+
+class TestLoginRateLimit(AppTestCase):
+
+    def settings(self):
+        return {'LOGIN_LIMIT_IP_BURST': 4, 'LOGIN_LIMIT_USER_BURST': 2}
+
+    def login(self, username, ip='10.0.0.1'):
+        return self.client.post('/login', data={'username': username, 'password': 'wrong-password'},
+                                environ_base={'REMOTE_ADDR': ip})
+
+    def test_username_is_limited_across_ips(self):
+        self.assertEqual(self.login('testuser', ip='10.0.0.1').status_code, 200)
+        self.assertEqual(self.login('TestUser', ip='10.0.0.2').status_code, 200)
+        response = self.login('testuser', ip='10.0.0.3')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+        self.assertIn(b'Too many login attempts', response.data)
+
+    def test_ip_is_limited_across_usernames(self):
+        for i in range(4):
+            self.assertEqual(self.login(f'user{i}').status_code, 200)
+        self.assertEqual(self.login('someone-else').status_code, 429)
+        self.assertEqual(self.login('someone-else', ip='10.0.0.9').status_code, 200)
+
+    def test_rejected_attempt_does_not_touch_database(self):
+        self.login('testuser')
+        self.login('testuser')
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                self.assertEqual(self.login('testuser').status_code, 429)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(statements, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
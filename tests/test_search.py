@@ -0,0 +1,166 @@
+import io
+import unittest
+from unittest import mock
+
+from sqlalchemy import text
+
+from app import db
+from app.models import UploadedFile
+from app.search import search_index
+from helpers import AppTestCase
+
+
+class SearchTestCase(AppTestCase):
+    backend = 'fts5'
+
+    def settings(self):
+        return {'SEARCH_BACKEND': self.backend}
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            self.other_id = self.create_user('otheruser', 'other@example.com')
+            self.add_file(self.user_id, 'budget.docx', 'The quarterly budget grew by ten percent.',
+                          'Budget summary')
+            self.add_file(self.user_id, 'notes.docx', 'Meeting notes about hiring <script> plans.',
+                          'Hiring plans')
+            self.add_file(self.other_id, 'secret.docx', 'Another budget that belongs to someone else.',
+                          'Budget')
+
+    def add_file(self, user_id, name, extracted, summary):
+        uploaded_file = UploadedFile(
+            filename=name, original_filename=name, file_size=1, mime_type='text/plain',
+            user_id=user_id, extracted_text=extracted, summarized_text=summary,
+            processing_status=UploadedFile.STATUS_COMPLETED
+        )
+        db.session.add(uploaded_file)
+        db.session.commit()
+        search_index.index(uploaded_file)
+        return uploaded_file.id
+
+    def search(self, user_id, query):
+        with self.app.app_context():
+            return search_index.search(user_id, query)
+
+
+class TestFts5Search(SearchTestCase):
+
+    def test_matches_only_the_users_files(self):
+        hits = self.search(self.user_id, 'budget')
+        self.assertEqual([hit.filename for hit in hits], ['budget.docx'])
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        hits = self.search(self.user_id, 'hiring')
+        snippet = str(hits[0].snippet)
+        self.assertIn('<mark>', snippet)
+        self.assertNotIn('<script>', snippet)
+
+    def test_stemming(self):
+        self.assertEqual(len(self.search(self.user_id, 'plan')), 1)
+        self.assertEqual(len(self.search(self.user_id, 'budgets')), 1)
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search(self.user_id, 'budget" OR "hiring'), [])
+        self.assertEqual(self.search(self.user_id, '*:()'), [])
+
+    def test_owner_tokens_are_not_searchable(self):
+        for user_id in (self.user_id, self.other_id):
+            self.assertEqual(self.search(self.user_id, f'u{user_id}'), [])
+
+    def test_owner_token_in_content_is_matched_there(self):
+        token = f'u{self.user_id}'
+        with self.app.app_context():
+            self.add_file(self.user_id, 'tokens.txt', f'This text mentions {token} once.', 'Summary')
+        hits = self.search(self.user_id, token)
+        self.assertEqual([hit.filename for hit in hits], ['tokens.txt'])
+        self.assertIn(f'mentions <mark>{token}</mark> once', str(hits[0].snippet))
+
+    def test_reindexing_replaces_entry(self):
+        with self.app.app_context():
+            uploaded_file = UploadedFile.query.filter_by(filename='notes.docx').one()
+            uploaded_file.extracted_text = 'Completely different words'
+            db.session.commit()
+            search_index.index(uploaded_file)
+        self.assertEqual(self.search(self.user_id, 'hiring meeting'), [])
+        self.assertEqual(len(self.search(self.user_id, 'different')), 1)
+
+    def test_index_keeps_no_copy_of_the_texts(self):
+        with self.app.app_context():
+            tables = {name for name, in db.session.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'uploaded_files_fts%'"))}
+        # The shadow table holding the texts, uploaded_files_fts_content, is never created
+        self.assertEqual(tables, {'uploaded_files_fts', 'uploaded_files_fts_data', 'uploaded_files_fts_idx',
+                                  'uploaded_files_fts_docsize', 'uploaded_files_fts_config'})
+
+    def test_index_follows_row_changes(self):
+        with self.app.app_context():
+            notes = UploadedFile.query.filter_by(filename='notes.docx').one()
+            notes.extracted_text = 'Rewritten text about budget planning.'
+            budget = UploadedFile.query.filter_by(filename='budget.docx').one()
+            db.session.delete(budget)
+            db.session.commit()
+            # Fails if the index holds tokens the rows no longer have
+            db.session.execute(text("INSERT INTO uploaded_files_fts (uploaded_files_fts, rank) "
+                                    "VALUES ('integrity-check', 1)"))
+        hits = self.search(self.user_id, 'budget')
+        self.assertEqual([hit.filename for hit in hits], ['notes.docx'])
+        self.assertIn('<mark>budget</mark>', str(hits[0].snippet))
+        self.assertEqual(self.search(self.user_id, 'meeting'), [])
+
+    def test_rebuild(self):
+        with self.app.app_context():
+            self.assertEqual(search_index.rebuild(), 3)
+        self.assertEqual(len(self.search(self.user_id, 'budget')), 1)
+
+    @mock.patch('app.utils.summarize_text', return_value='A summary of the roadmap')
+    @mock.patch('app.utils.extract_text_from_file', return_value='Product roadmap for next year')
+    def test_pipeline_indexes_processed_files(self, extract, summarize):
+        self.login()
+        self.client.post('/upload', data={'file': (io.BytesIO(b'PK roadmap'), 'roadmap.docx')},
+                         content_type='multipart/form-data')
+
+        response = self.client.get('/search?q=roadmap', headers={'Accept': 'application/json'})
+        results = response.get_json()['results']
+        self.assertEqual([result['filename'] for result in results], ['roadmap.docx'])
+
+    def test_search_page_renders(self):
+        self.login()
+        response = self.client.get('/search?q=budget')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'<mark>budget</mark>', response.data)
+
+
+class TestLikeSearch(SearchTestCase):
+    backend = 'like'
+
+    def test_matches_only_the_users_files(self):
+        hits = self.search(self.user_id, 'budget')
+        self.assertEqual([hit.filename for hit in hits], ['budget.docx'])
+        self.assertIn('<mark>', str(hits[0].snippet))
+
+    def test_snippet_is_escaped(self):
+        hits = self.search(self.user_id, 'meeting')
+        self.assertNotIn('<script>', str(hits[0].snippet))
+
+    def test_best_match_survives_the_limit(self):
+        with self.app.app_context():
+            self.add_file(self.user_id, 'later.docx', 'Unrelated words.', 'One budget line')
+            hits = search_index.search(self.user_id, 'budget', limit=1)
+        self.assertEqual([hit.filename for hit in hits], ['budget.docx'])
+
+    def test_terms_past_the_preview_are_found(self):
+        long_text = 'Opening words. ' * 20 + 'The appendix lists the warehouse leases.'
+        with self.app.app_context():
+            self.add_file(self.user_id, 'long.docx', long_text, 'Property overview')
+        hits = self.search(self.user_id, 'warehouse leases')
+        self.assertEqual([hit.filename for hit in hits], ['long.docx'])
+        self.assertIn('<mark>warehouse</mark>', str(hits[0].snippet))
+
+    def test_limit_keeps_the_best_ranked(self):
+        with self.app.app_context():
+            self.add_file(self.user_id, 'budget-2.docx', 'budget budget budget', 'Budget budget')
+            hits = search_index.search(self.user_id, 'budget', limit=1)
+        self.assertEqual([hit.filename for hit in hits], ['budget-2.docx'])
+
+if __name__ == '__main__':
+    unittest.main()
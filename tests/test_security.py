@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+import unittest
+
+from app import create_app, db
+from app.config import TestConfig
+from app.models import User
+from app.security import PasswordPolicy, password_hasher
+from werkzeug.security import generate_password_hash
+
+
+class TestPasswordPolicy(unittest.TestCase):
+
+    def test_method_strings(self):
+        self.assertEqual(PasswordPolicy(iterations=1000).method, 'pbkdf2:sha256:1000')
+        self.assertEqual(PasswordPolicy('scrypt', scrypt_n=2 ** 14).method, 'scrypt:16384:8:1')
+        with self.assertRaises(ValueError):
+            PasswordPolicy('md5')
+
+    def test_needs_rehash_when_settings_differ(self):
+        old = PasswordPolicy(iterations=1000)
+        new = PasswordPolicy(iterations=2000)
+        password_hash = old.hash('password123')
+        self.assertFalse(old.needs_rehash(password_hash))
+        self.assertTrue(new.needs_rehash(password_hash))
+        self.assertTrue(PasswordPolicy('scrypt', scrypt_n=2 ** 10).needs_rehash(password_hash))
+
+
+class TestRehashOnLogin(unittest.TestCase):
+    workers = 0
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+
+        class Config(TestConfig):
+            UPLOAD_FOLDER = self.upload_dir
+            PASSWORD_HASH_WORKERS = self.workers
+
+        self.app = create_app(Config)
+        with self.app.app_context():
+            db.create_all()
+            user = User(username='testuser', email='test@example.com',
+                        password=generate_password_hash('password123', method='pbkdf2:sha256:500'))
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            password_hasher.shutdown()
+            db.drop_all()
+        shutil.rmtree(self.upload_dir)
+
+    def stored_hash(self):
+        with self.app.app_context():
+            return db.session.get(User, self.user_id).password
+
+    def wait_for_rehash(self):
+        with self.app.app_context():
+            password_hasher.shutdown(wait=True)
+
+    def test_login_upgrades_hash(self):
+        response = self.client.post('/login', data={'username': 'testuser', 'password': 'password123'})
+        self.assertEqual(response.status_code, 302)
+        self.wait_for_rehash()
+
+        stored = self.stored_hash()
+        self.assertTrue(stored.startswith('pbkdf2:sha256:1000$'))
+        with self.app.app_context():
+            self.assertTrue(password_hasher.verify(stored, 'password123'))
+
+    def test_failed_login_does_not_rehash(self):
+        before = self.stored_hash()
+        self.client.post('/login', data={'username': 'testuser', 'password': 'wrong-password'})
+        self.wait_for_rehash()
+        self.assertEqual(self.stored_hash(), before)
+
+    def test_rehash_does_not_overwrite_changed_password(self):
+        before = self.stored_hash()
+        with self.app.app_context():
+            user = db.session.get(User, self.user_id)
+            user.set_password('another-password')
+            db.session.commit()
+            changed = user.password
+            password_hasher.rehash_later(self.user_id, before, 'password123')
+        self.wait_for_rehash()
+        self.assertEqual(self.stored_hash(), changed)
+
+
+class TestRehashOnLoginWithPool(TestRehashOnLogin):
+    workers = 2
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous enough for a slow CI machine; a regression that imports the
+# extraction libraries at startup costs more than this on its own
+STARTUP_BUDGET_MS = 3000
+
+# Only needed once a file is extracted or summarized
+LAZY_MODULES = ('docx', 'PIL', 'pdfplumber', 'pytesseract', 'groq', 'httpx')
+
+STARTUP = """
+import sys, time
+start = time.perf_counter()
+from app import create_app
+from app.config import TestConfig
+create_app(TestConfig)
+import app.routes, app.utils, app.tasks
+print(round((time.perf_counter() - start) * 1000))
+print('loaded=' + ','.join(name for name in %r if name in sys.modules))
+""" % (LAZY_MODULES,)
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_startup_is_lazy_and_within_budget(self):
+        result = subprocess.run([sys.executable, '-c', STARTUP], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+        elapsed, loaded = result.stdout.strip().splitlines()[-2:]
+        loaded = loaded[len('loaded='):]
+        self.assertEqual(loaded, '', f"Imported at startup: {loaded}")
+        self.assertLess(int(elapsed), STARTUP_BUDGET_MS)
+
+
+if __name__ == '__main__':
+    unittest.main()
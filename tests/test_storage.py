@@ -0,0 +1,114 @@
+import io
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app.config import TestConfig
+from app.models import User, UploadedFile
+from app.storage import LocalStorage, collect_garbage
+from app.uploads import UploadSink
+from werkzeug.security import generate_password_hash
+
+
+class TestLocalStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.storage = LocalStorage(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def put(self, content):
+        sink = UploadSink(self.storage.temp_dir)
+        sink.write(content)
+        return self.storage.put(sink)
+
+    def test_blobs_are_sharded_by_digest(self):
+        key = self.put(b'hello')
+        digest = hashlib.sha256(b'hello').hexdigest()
+        self.assertEqual(key, digest)
+        self.assertEqual(self.storage.path(key), os.path.join(self.root, digest[:2], digest[2:4], digest))
+        with self.storage.open(key) as f:
+            self.assertEqual(f.read(), b'hello')
+        self.assertEqual(os.listdir(self.storage.temp_dir), [])
+
+    def test_identical_content_is_stored_once(self):
+        self.assertEqual(self.put(b'same'), self.put(b'same'))
+        self.assertEqual(len(list(self.storage.iter_keys())), 1)
+        self.assertEqual(os.listdir(self.storage.temp_dir), [])
+
+    def test_garbage_collection_removes_old_orphans_only(self):
+        live = self.put(b'referenced')
+        orphan = self.put(b'orphan')
+        recent_orphan = self.put(b'recent orphan')
+        stale_temp = os.path.join(self.storage.temp_dir, '.upload-abandoned')
+        open(stale_temp, 'wb').close()
+
+        old = time.time() - 7200
+        for path in (self.storage.path(live), self.storage.path(orphan), stale_temp):
+            os.utime(path, (old, old))
+
+        removed = collect_garbage(self.storage, {live}, grace_seconds=3600)
+
+        self.assertEqual(removed, 2)
+        self.assertTrue(self.storage.exists(live))
+        self.assertFalse(self.storage.exists(orphan))
+        self.assertTrue(self.storage.exists(recent_orphan))
+        self.assertFalse(os.path.exists(stale_temp))
+
+
+class TestUploadStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+
+        class Config(TestConfig):
+            UPLOAD_FOLDER = self.upload_dir
+
+        self.app = create_app(Config)
+        with self.app.app_context():
+            db.create_all()
+            for name in ('alice', 'bob'):
+                db.session.add(User(username=name, email=f'{name}@example.com',
+                                    password=generate_password_hash('password123')))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+        shutil.rmtree(self.upload_dir)
+
+    @mock.patch('app.utils.summarize_text', side_effect=lambda text: 'summary')
+    @mock.patch('app.utils.extract_text_from_file',
+                side_effect=lambda path, filename: open(path, 'rb').read().decode())
+    def test_same_filename_from_two_users_does_not_collide(self, extract, summarize):
+        for name in ('alice', 'bob'):
+            client = self.app.test_client()
+            client.post('/login', data={'username': name, 'password': 'password123'})
+            client.post('/upload', data={'file': (io.BytesIO(f'{name} report'.encode()), 'report.docx')})
+
+        with self.app.app_context():
+            texts = sorted(f.extracted_text for f in UploadedFile.query.all())
+        self.assertEqual(texts, ['alice report', 'bob report'])
+
+    def test_gc_command_keeps_referenced_blobs(self):
+        with self.app.app_context():
+            backend = self.app.extensions['storage']
+            sink = UploadSink(backend.temp_dir)
+            sink.write(b'orphan')
+            key = backend.put(sink)
+            old = time.time() - 7200
+            os.utime(backend.path(key), (old, old))
+
+        result = self.app.test_cli_runner().invoke(args=['gc-uploads'])
+        self.assertIn('Removed 1 orphaned files', result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+import io
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+
+from app import create_app, db
+from app.config import TestConfig
+from app.models import User, UploadedFile
+from app.streaming import SummaryChannel, DELTA, DONE, ERROR
+from app.summarizers import (ExtractiveSummarizer, FakeSummarizer, FallbackSummarizer,
+                             GroqSummarizer, SummarizationError, Summarizer)
+from werkzeug.security import generate_password_hash
+
+TEXT = ("Streaming sends the summary to the browser while it is generated. "
+        "Nobody waits for the last word before reading the first.")
+
+
+def parse_events(body):
+    """Returns [(event, data)] from a text/event-stream body, skipping comments."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class TestSummaryChannel(unittest.TestCase):
+
+    def test_late_reader_gets_every_piece(self):
+        channel = SummaryChannel()
+        channel.publish("Hello")
+        channel.publish(" world")
+        channel.finish("Hello world")
+        self.assertEqual(list(channel.follow()),
+                         [(DELTA, "Hello"), (DELTA, " world"), (DONE, "Hello world")])
+
+    def test_reader_follows_a_running_job(self):
+        channel = SummaryChannel()
+
+        def produce():
+            for piece in ["a", "b", "c"]:
+                channel.publish(piece)
+            channel.fail("boom")
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        events = [item for item in channel.follow(timeout=0.01) if item is not None]
+        thread.join()
+        self.assertEqual(events, [(DELTA, "a"), (DELTA, "b"), (DELTA, "c"), (ERROR, "boom")])
+
+    def test_idle_channel_yields_keep_alive(self):
+        channel = SummaryChannel()
+        self.assertIsNone(next(channel.follow(timeout=0.01)))
+
+
+class FailingSummarizer(Summarizer):
+    name = 'failing'
+
+    def __init__(self, pieces=()):
+        self.pieces = pieces
+
+    def stream(self, source):
+        yield from self.pieces
+        raise SummarizationError("unavailable")
+
+
+class TestProviderStreaming(unittest.TestCase):
+
+    def test_pieces_join_to_the_summary(self):
+        for summarizer in (FakeSummarizer(words=8), ExtractiveSummarizer(max_sentences=1)):
+            self.assertEqual("".join(summarizer.stream(TEXT)), summarizer.summarize(TEXT))
+
+    def test_fallback_before_first_piece(self):
+        summarizer = FallbackSummarizer(FailingSummarizer(), FakeSummarizer(words=2))
+        self.assertEqual("".join(summarizer.stream(TEXT)), "Streaming sends")
+
+    def test_no_fallback_after_first_piece(self):
+        summarizer = FallbackSummarizer(FailingSummarizer(["partial"]), FakeSummarizer())
+        with self.assertRaises(SummarizationError):
+            list(summarizer.stream(TEXT))
+
+    def test_groq_streams_deltas(self):
+        def create(messages, model, stream=False):
+            self.assertTrue(stream)
+            return iter(SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+                        for piece in ["Short", None, " summary"])
+
+        summarizer = GroqSummarizer('key')
+        summarizer._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        self.assertEqual(list(summarizer.stream("A document streamed from Groq.")), ["Short", " summary"])
+
+
+class TestSummaryStreamEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+
+        class Config(TestConfig):
+            UPLOAD_FOLDER = self.upload_dir
+            SUMMARY_PROVIDER = 'fake'
+            SUMMARY_STREAMING = True
+            SUMMARY_STREAM_TIMEOUT = 0
+            SUMMARY_STREAM_POLL = 0.01
+
+        self.app = create_app(Config)
+        with self.app.app_context():
+            db.create_all()
+            for name in ('owner', 'other'):
+                db.session.add(User(username=name, email=f'{name}@example.com',
+                                    password=generate_password_hash('password123')))
+            db.session.commit()
+        self.client = self.app.test_client()
+        self.login('owner')
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+        shutil.rmtree(self.upload_dir)
+
+    def login(self, username):
+        self.client.post('/login', data={'username': username, 'password': 'password123'})
+
+    def upload(self):
+        response = self.client.post(
+            '/upload',
+            data={'file': (io.BytesIO(TEXT.encode()), 'notes.txt')},
+            headers={'Accept': 'application/json'},
+            content_type='multipart/form-data'
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.get_json()['job_id']
+
+    def stream(self, file_id):
+        response = self.client.get(f'/upload/{file_id}/summary/stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        events = parse_events(response.get_data(as_text=True))
+        response.close()  # As a WSGI server does, which releases the user's stream
+        return events
+
+    def test_streamed_job_persists_summary(self):
+        file_id = self.upload()
+        with self.app.app_context():
+            uploaded_file = db.session.get(UploadedFile, file_id)
+            self.assertEqual(uploaded_file.processing_status, UploadedFile.STATUS_COMPLETED)
+            self.assertEqual(uploaded_file.summarized_text, FakeSummarizer().summarize(TEXT))
+            self.assertEqual(len(self.app.extensions['summary_streams']), 0)
+
+    def test_completed_file_gets_done_event(self):
+        file_id = self.upload()
+        self.assertEqual(self.stream(file_id), [(DONE, {'summary': FakeSummarizer().summarize(TEXT)})])
+
+    def test_live_channel_is_streamed(self):
+        file_id = self.upload()
+        channel = self.app.extensions['summary_streams'].open(file_id)
+        for piece in FakeSummarizer(words=3).stream(TEXT):
+            channel.publish(piece)
+        channel.finish("Streaming sends the")
+
+        self.assertEqual(self.stream(file_id), [
+            (DELTA, {'text': 'Streaming'}),
+            (DELTA, {'text': ' sends'}),
+            (DELTA, {'text': ' the'}),
+            (DONE, {'summary': 'Streaming sends the'}),
+        ])
+
+    def test_pending_file_stream_ends_for_reconnect(self):
+        file_id = self.upload()
+        with self.app.app_context():
+            db.session.get(UploadedFile, file_id).processing_status = UploadedFile.STATUS_PENDING
+            db.session.commit()
+        response = self.client.get(f'/upload/{file_id}/summary/stream')
+        body = response.get_data(as_text=True)
+        response.close()
+        # No final event, so the browser reconnects after the advertised delay
+        self.assertTrue(body.startswith("retry: 10\n\n"))
+        self.assertEqual(parse_events(body), [])
+
+    def test_open_streams_are_capped_per_user(self):
+        self.app.config['SUMMARY_STREAMS_PER_USER'] = 1
+        file_id = self.upload()
+        first = self.client.get(f'/upload/{file_id}/summary/stream', buffered=False)
+        self.assertEqual(first.status_code, 200)
+
+        refused = self.client.get(f'/upload/{file_id}/summary/stream')
+        self.assertEqual(refused.status_code, 429)
+        self.assertIn('Retry-After', refused.headers)
+
+        first.close()
+        self.assertEqual(self.stream(file_id)[-1][0], DONE)
+        self.assertEqual(self.stream(file_id)[-1][0], DONE)
+
+    def test_other_users_file_is_not_found(self):
+        file_id = self.upload()
+        self.client.get('/logout')
+        self.login('other')
+        response = self.client.get(f'/upload/{file_id}/summary/stream')
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
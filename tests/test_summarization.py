@@ -0,0 +1,120 @@
+import threading
+import unittest
+
+from app.summarization import (
+    COMBINE_PROMPT, TRUNCATION_MARKER, ChunkCache, MapReduceSummarizer, estimate_tokens, iter_chunks
+)
+
+
+class FakeClient:
+    """Records prompts and answers with a short deterministic summary."""
+
+    def __init__(self):
+        self.prompts = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def complete(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return f"summary {len(prompt)}"
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def paragraphs(count, words=50, tag='p'):
+    return "\n\n".join(" ".join(f"{tag}{i}w{j}" for j in range(words)) for i in range(count))
+
+
+class TestChunking(unittest.TestCase):
+
+    def test_chunks_respect_token_budget(self):
+        text = paragraphs(40)
+        chunks = list(iter_chunks(text, max_tokens=200))
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(estimate_tokens(chunk), 200)
+        self.assertEqual(" ".join(chunks).split(), text.split())
+
+    def test_oversized_paragraph_is_split_by_word(self):
+        text = " ".join(f"word{i}" for i in range(1000))
+        chunks = list(iter_chunks(text, max_tokens=100))
+        self.assertTrue(all(estimate_tokens(chunk) <= 100 for chunk in chunks))
+        self.assertEqual(" ".join(chunks).split(), text.split())
+
+    def test_accepts_stream_of_pieces(self):
+        # Five pages of two 50-token paragraphs, packed two paragraphs per chunk
+        pages = (paragraphs(2, tag=f'page{n}x') for n in range(5))
+        chunks = list(iter_chunks(pages, max_tokens=120))
+        self.assertEqual(len(chunks), 5)
+        self.assertTrue(chunks[2].startswith('page2x'))
+
+
+class TestMapReduceSummarizer(unittest.TestCase):
+
+    def test_short_text_is_a_single_call(self):
+        client = FakeClient()
+        summarizer = MapReduceSummarizer(client.complete, cache=ChunkCache())
+        summarizer.summarize("A short document.")
+        self.assertEqual(len(client.prompts), 1)
+
+    def test_long_text_is_mapped_then_reduced(self):
+        client = FakeClient()
+        summarizer = MapReduceSummarizer(client.complete, max_tokens=200, max_workers=3,
+                                         cache=ChunkCache())
+        result = summarizer.summarize(paragraphs(40))
+
+        chunk_count = len(list(iter_chunks(paragraphs(40), max_tokens=200)))
+        self.assertEqual(len(client.prompts), chunk_count + 1)
+        self.assertTrue(client.prompts[-1].startswith("Combine"))
+        self.assertTrue(result.startswith("summary"))
+        self.assertLessEqual(client.peak, 3)
+
+    def test_every_summary_reaches_the_final_prompt_when_reducing_stalls(self):
+        prompts = []
+
+        def verbose(prompt):
+            # A model that does not condense: each reply is as long as a chunk
+            prompts.append(prompt)
+            return " ".join(f"s{len(prompts)}w{j}" for j in range(150))
+
+        summarizer = MapReduceSummarizer(verbose, max_tokens=200, max_workers=1, cache=ChunkCache())
+        summarizer.summarize(paragraphs(12))
+
+        chunk_count = len(list(iter_chunks(paragraphs(12), max_tokens=200)))
+        final = prompts[-1]
+        self.assertEqual(len(prompts), chunk_count + 1)
+        for number in range(1, chunk_count + 1):
+            self.assertIn(f"s{number}w0 ", final)
+        self.assertEqual(final.count(TRUNCATION_MARKER), chunk_count)
+        self.assertLessEqual(estimate_tokens(final), 200 + estimate_tokens(COMBINE_PROMPT))
+
+    def test_only_changed_chunks_are_resummarized(self):
+        client = FakeClient()
+        summarizer = MapReduceSummarizer(client.complete, max_tokens=200, cache=ChunkCache())
+        original = paragraphs(40)
+        summarizer.summarize(original)
+        calls = len(client.prompts)
+
+        edited = original.replace("p39w0", "edited")
+        summarizer.summarize(edited)
+        # The last chunk changed, so only it and the final combine step are re-sent
+        self.assertEqual(len(client.prompts) - calls, 2)
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = ChunkCache(maxsize=2)
+        cache.set('a', '1')
+        cache.set('b', '2')
+        cache.get('a')
+        cache.set('c', '3')
+        self.assertEqual(cache.get('a'), '1')
+        self.assertIsNone(cache.get('b'))
+
+
+if __name__ == '__main__':
+    unittest.main()
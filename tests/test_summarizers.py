@@ -0,0 +1,260 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import groq
+import httpx
+
+from app import create_app
+from app.config import TestConfig
+from app.summarizers import (CircuitBreaker, CircuitOpenError, ExtractiveSummarizer, FallbackSummarizer,
+                             GroqSummarizer, SummarizationError, Summarizer, build_summarizer, retry)
+from app.utils import summarize_text
+
+
+def connection_error():
+    return groq.APIConnectionError(request=httpx.Request('POST', 'https://api.groq.com'))
+
+
+class FakeClient:
+    """Stands in for the Groq client, failing the first `failures` calls."""
+
+    def __init__(self, failures=0, reply='summary'):
+        self.failures = failures
+        self.reply = reply
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, model):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise connection_error()
+        message = SimpleNamespace(content=self.reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def close(self):
+        pass
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRetry(unittest.TestCase):
+
+    def test_retries_until_success(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ConnectionError('down')
+            return 'ok'
+
+        self.assertEqual(retry(flaky, attempts=3, retryable=(ConnectionError,), sleep=lambda s: None), 'ok')
+        self.assertEqual(len(calls), 3)
+
+    def test_other_errors_are_not_retried(self):
+        calls = []
+
+        def broken():
+            calls.append(1)
+            raise KeyError('bad')
+
+        with self.assertRaises(KeyError):
+            retry(broken, attempts=3, retryable=(ConnectionError,), sleep=lambda s: None)
+        self.assertEqual(len(calls), 1)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_threshold_and_recovers(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        breaker.allow()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+
+        clock.now = 10
+        breaker.allow()  # The trial call
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()  # Only one at a time
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_failed_trial_reopens(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        breaker.allow()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+
+
+class TestGroqSummarizer(unittest.TestCase):
+
+    def make_summarizer(self, client, **kwargs):
+        summarizer = GroqSummarizer('key', backoff=0, **kwargs)
+        summarizer._client = client
+        return summarizer
+
+    def test_transient_errors_are_retried(self):
+        client = FakeClient(failures=2)
+        summarizer = self.make_summarizer(client, attempts=3)
+        self.assertEqual(summarizer.summarize('Some text.'), 'summary')
+        self.assertEqual(client.calls, 3)
+
+    def test_failure_raises_and_opens_circuit(self):
+        client = FakeClient(failures=100)
+        summarizer = self.make_summarizer(client, attempts=2, breaker=CircuitBreaker(failure_threshold=1))
+        with self.assertRaises(SummarizationError):
+            summarizer.summarize('Some text.')
+        self.assertEqual(client.calls, 2)
+
+        with self.assertRaises(CircuitOpenError):
+            summarizer.summarize('Some text.')
+        self.assertEqual(client.calls, 2)
+
+    def test_slot_is_held_only_during_requests(self):
+        slots = threading.BoundedSemaphore(1)
+        client = FakeClient()
+        summarizer = self.make_summarizer(client, slots=slots)
+        held = []
+        create = client.chat.completions.create
+
+        def record(**kwargs):
+            free = slots.acquire(blocking=False)
+            if free:
+                slots.release()
+            held.append(not free)
+            return create(**kwargs)
+        client.chat.completions.create = record
+
+        def pages():
+            for number in range(3):
+                # Extraction must not wait for a slot held by this same job
+                self.assertTrue(slots.acquire(blocking=False))
+                slots.release()
+                # Unique text, so no reply comes from the chunk cache
+                yield f"Page {number} of {id(held)}. " * 2000
+
+        self.assertEqual(summarizer.summarize(pages()), 'summary')
+        self.assertGreater(len(held), 1)
+        self.assertTrue(all(held))
+
+    def test_trial_failing_outside_the_api_reopens_the_circuit(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        client = FakeClient()
+        summarizer = self.make_summarizer(client, attempts=1, breaker=breaker)
+        client.chat.completions.create = mock.Mock(side_effect=ValueError('malformed reply'))
+        with self.assertRaises(ValueError):
+            summarizer.complete('prompt')
+        with self.assertRaises(CircuitOpenError):
+            list(summarizer.complete_stream('prompt'))  # Open again until the next trial
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+        self.assertEqual(breaker.state, 'open')
+
+        clock.now = 20
+        client.chat.completions.create = FakeClient().create
+        self.assertEqual(summarizer.complete('prompt'), 'summary')
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_client_is_created_once_with_pooling(self):
+        summarizer = GroqSummarizer('key', max_connections=3)
+        client = summarizer._get_client()
+        self.assertIs(summarizer._get_client(), client)
+        self.assertEqual(client.max_retries, 0)
+        summarizer.close()
+
+
+class TestExtractiveSummarizer(unittest.TestCase):
+
+    def test_picks_informative_sentences_in_order(self):
+        text = ("The reactor design uses molten salt coolant. "
+                "It was a nice day. "
+                "Molten salt coolant allows the reactor to run at low pressure. "
+                "We had lunch. "
+                "It was fine. "
+                "Low pressure operation makes the reactor design cheaper to build.")
+        summary = ExtractiveSummarizer(max_sentences=2, ratio=1).summarize(text)
+        self.assertEqual(summary, "Molten salt coolant allows the reactor to run at low pressure. "
+                                  "Low pressure operation makes the reactor design cheaper to build.")
+
+    def test_short_text_is_returned_whole(self):
+        self.assertEqual(ExtractiveSummarizer().summarize('Only one sentence.'), 'Only one sentence.')
+        self.assertEqual(ExtractiveSummarizer().summarize(''), '')
+
+    def test_accepts_a_stream(self):
+        summary = ExtractiveSummarizer(max_sentences=1).summarize(iter(['First page.', 'Second page.']))
+        self.assertTrue(summary.endswith('page.'))
+
+
+class TestFallback(unittest.TestCase):
+
+    def test_uses_fallback_when_primary_fails(self):
+        primary = GroqSummarizer('key', attempts=1, backoff=0)
+        primary._client = FakeClient(failures=100)
+        summarizer = FallbackSummarizer(primary, ExtractiveSummarizer())
+        self.assertEqual(summarizer.summarize(iter(['A short document.'])), 'A short document.')
+
+    def test_primary_reads_the_stream_as_it_arrives(self):
+        produced, seen = [], []
+
+        def pages():
+            for number in range(3):
+                produced.append(number)
+                yield f'Page {number} text.'
+
+        class Primary(Summarizer):
+            name = 'primary'
+
+            def summarize(self, source):
+                next(iter(source))
+                seen.append(len(produced))
+                raise SummarizationError('down')
+
+        summarizer = FallbackSummarizer(Primary(), ExtractiveSummarizer(ratio=1))
+        summary = summarizer.summarize(pages())
+        self.assertEqual(seen, [1])  # Had its first page while two were still unparsed
+        self.assertEqual(summary, 'Page 0 text. Page 1 text. Page 2 text.')
+
+
+class TestConfiguration(unittest.TestCase):
+
+    def test_provider_selection(self):
+        self.assertIsInstance(build_summarizer({'SUMMARY_PROVIDER': 'auto'}), ExtractiveSummarizer)
+        self.assertIsInstance(build_summarizer({'SUMMARY_PROVIDER': 'auto', 'GROQ_API_KEY': 'k'}),
+                              FallbackSummarizer)
+        self.assertIsInstance(build_summarizer({'SUMMARY_PROVIDER': 'groq', 'GROQ_API_KEY': 'k'}),
+                              GroqSummarizer)
+        with self.assertRaises(ValueError):
+            build_summarizer({'SUMMARY_PROVIDER': 'nope'})
+
+    def test_summarize_text_raises_instead_of_returning_an_error(self):
+        class Config(TestConfig):
+            SUMMARY_PROVIDER = 'groq'
+            GROQ_API_KEY = None
+
+        app = create_app(Config)
+        with app.app_context():
+            with self.assertRaises(SummarizationError):
+                summarize_text('Some text.')
+            with mock.patch.object(ExtractiveSummarizer, 'summarize', return_value='ok'):
+                self.assertEqual(summarize_text('Some text.', summarizer=ExtractiveSummarizer()), 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
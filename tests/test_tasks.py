@@ -0,0 +1,167 @@
+import io
+import hashlib
+import unittest
+from unittest import mock
+
+from app import db
+from app.models import User, UploadedFile
+from helpers import AppTestCase
+
+
+class TestProcessingPipeline(AppTestCase):
+
+    logged_in = True
+
+    def upload(self, content=b'PK test document', name='report.docx'):
+        return self.client.post(
+            '/upload',
+            data={'file': (io.BytesIO(content), name)},
+            headers={'Accept': 'application/json'},
+            content_type='multipart/form-data'
+        )
+
+    @mock.patch('app.utils.summarize_text', return_value='short summary')
+    @mock.patch('app.utils.extract_text_from_file', return_value='long extracted text')
+    def test_upload_returns_job_and_completes(self, extract, summarize):
+        response = self.upload()
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()['job_id']
+
+        status = self.client.get(f'/upload/{job_id}/status').get_json()
+        self.assertEqual(status['status'], UploadedFile.STATUS_COMPLETED)
+        self.assertIsNone(status['error'])
+
+        with self.app.app_context():
+            uploaded_file = db.session.get(UploadedFile, job_id)
+            self.assertEqual(uploaded_file.extracted_text, 'long extracted text')
+            self.assertEqual(uploaded_file.summarized_text, 'short summary')
+        summarize.assert_called_once_with('long extracted text')
+
+    @mock.patch('app.utils.summarize_text', return_value='short summary')
+    @mock.patch('app.utils.extract_text_from_file', return_value='long extracted text')
+    def test_identical_content_is_processed_once(self, extract, summarize):
+        first = self.upload(b'same bytes', 'first.docx').get_json()['job_id']
+        second = self.upload(b'same bytes', 'second.docx').get_json()['job_id']
+        self.upload(b'other bytes', 'third.docx')
+
+        self.assertEqual(extract.call_count, 2)
+        self.assertEqual(summarize.call_count, 2)
+        with self.app.app_context():
+            first_file = db.session.get(UploadedFile, first)
+            second_file = db.session.get(UploadedFile, second)
+            self.assertEqual(first_file.content_hash, second_file.content_hash)
+            self.assertEqual(second_file.summarized_text, 'short summary')
+            self.assertEqual(second_file.processing_status, UploadedFile.STATUS_COMPLETED)
+
+    def test_concurrent_duplicates_share_one_computation(self):
+        from app.tasks import _SingleFlight
+        import threading
+
+        flight = _SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'result'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('digest', slow)))
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=lambda: results.append(flight.do('digest', slow)))
+        follower.start()
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('result', False), ('result', True)])
+
+    @mock.patch('app.utils.summarize_text')
+    @mock.patch('app.utils.extract_text_from_file', return_value='')
+    def test_empty_extraction_marks_failed(self, extract, summarize):
+        job_id = self.upload().get_json()['job_id']
+
+        status = self.client.get(f'/upload/{job_id}/status').get_json()
+        self.assertEqual(status['status'], UploadedFile.STATUS_FAILED)
+        self.assertIn('No text could be extracted', status['error'])
+        summarize.assert_not_called()
+
+    @mock.patch('app.utils.summarize_text')
+    def test_corrupt_file_marks_failed(self, summarize):
+        for content, name, message in ((b'PK\x03\x04 not a zip', 'broken.docx', 'DOCX'),
+                                       (b'\xff\xd8\xff\xe0 not a jpeg', 'fake.jpg', 'image')):
+            job_id = self.upload(content, name).get_json()['job_id']
+
+            status = self.client.get(f'/upload/{job_id}/status').get_json()
+            self.assertEqual(status['status'], UploadedFile.STATUS_FAILED)
+            self.assertIn(f'Error extracting text from {message}', status['error'])
+            with self.app.app_context():
+                self.assertEqual(db.session.get(UploadedFile, job_id).extracted_text, '')
+        summarize.assert_not_called()
+
+    @mock.patch('app.utils.summarize_text', return_value='short summary')
+    @mock.patch('app.utils.extract_text_from_file', return_value='real text')
+    def test_failed_rows_are_never_reused(self, extract, summarize):
+        content = b'same broken bytes'
+        with self.app.app_context():
+            for status, text, error in (
+                    (UploadedFile.STATUS_FAILED, '', 'Error extracting text from DOCX: bad zip'),
+                    # Written before extraction errors failed the job
+                    (UploadedFile.STATUS_COMPLETED, 'Error extracting text from DOCX: bad zip', None)):
+                db.session.add(UploadedFile(
+                    filename='old.docx', original_filename='old.docx', file_size=len(content),
+                    mime_type='text/plain', content_hash=hashlib.sha256(content).hexdigest(),
+                    processing_status=status, processing_error=error,
+                    extracted_text=text, summarized_text='', user_id=self.user_id
+                ))
+            db.session.commit()
+
+        job_id = self.upload(content, 'new.docx').get_json()['job_id']
+
+        extract.assert_called_once()
+        with self.app.app_context():
+            self.assertEqual(db.session.get(UploadedFile, job_id).extracted_text, 'real text')
+
+    def add_file(self, user_id, filename='a.pdf', mime_type='application/pdf'):
+        with self.app.app_context():
+            uploaded_file = UploadedFile(
+                filename=filename, original_filename=filename, file_size=1,
+                mime_type=mime_type, extracted_text='', summarized_text='', user_id=user_id
+            )
+            db.session.add(uploaded_file)
+            db.session.commit()
+            return uploaded_file.id
+
+    def test_status_of_other_users_file_is_hidden(self):
+        with self.app.app_context():
+            other = User(username='someone', email='someone@example.com', password='x')
+            db.session.add(other)
+            db.session.commit()
+            other_id = other.id
+        file_id = self.add_file(other_id)
+
+        response = self.client.get(f'/upload/{file_id}/status')
+        self.assertEqual(response.status_code, 404)
+
+    @mock.patch('app.utils.summarize_text', return_value='summary')
+    @mock.patch('app.utils.extract_text_from_file', return_value='text')
+    def test_thread_mode_runs_off_request_thread(self, extract, summarize):
+        from app.tasks import pipeline
+        self.app.extensions['pipeline'].mode = 'thread'
+        file_id = self.add_file(self.user_id, 'b.txt', 'text/plain')
+
+        with self.app.app_context():
+            future = pipeline.submit(file_id, 'text/plain')
+            self.assertTrue(future.result(timeout=10))
+            pipeline.shutdown()
+            self.assertEqual(db.session.get(UploadedFile, file_id).processing_status,
+                             UploadedFile.STATUS_COMPLETED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import os
+import shutil
+import tempfile
+import hashlib
+import unittest
+from unittest import mock
+
+from app import db
+from app.models import UploadedFile
+from app.uploads import UploadSink, incoming_dir, sniff_mime_type
+from helpers import AppTestCase
+from werkzeug.exceptions import RequestEntityTooLarge
+
+
+class TestSniffing(unittest.TestCase):
+
+    def test_known_signatures(self):
+        self.assertEqual(sniff_mime_type(b'%PDF-1.7\n...'), 'application/pdf')
+        self.assertEqual(sniff_mime_type(b'\x89PNG\r\n\x1a\n....'), 'image/png')
+        self.assertEqual(sniff_mime_type(b'\xff\xd8\xff\xe0'), 'image/jpeg')
+
+    def test_zip_formats_use_the_extension(self):
+        self.assertEqual(sniff_mime_type(b'PK\x03\x04rest', 'report.docx'),
+                         'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+        self.assertEqual(sniff_mime_type(b'PK\x03\x04rest', 'archive.zip'), 'application/zip')
+
+    def test_text_and_binary(self):
+        self.assertEqual(sniff_mime_type('héllo wörld'.encode('utf-8')), 'text/plain')
+        # A multi-byte character cut off by the sample size is still text
+        self.assertEqual(sniff_mime_type('abcé'.encode('utf-8')[:-1]), 'text/plain')
+        self.assertEqual(sniff_mime_type(b'\x00\x01\x02'), 'application/octet-stream')
+
+
+class TestUploadSink(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_hashes_and_measures_while_writing(self):
+        sink = UploadSink(self.tmpdir, filename='a.pdf')
+        sink.write(b'%PDF-1.4 ')
+        sink.write(b'body')
+        self.assertEqual(sink.size, 13)
+        self.assertEqual(sink.digest, hashlib.sha256(b'%PDF-1.4 body').hexdigest())
+        self.assertEqual(sink.mime_type, 'application/pdf')
+
+        destination = os.path.join(self.tmpdir, 'a.pdf')
+        sink.commit(destination)
+        with open(destination, 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 body')
+        self.assertEqual(os.listdir(self.tmpdir), ['a.pdf'])
+
+    def test_rejects_the_first_chunk_over_the_limit(self):
+        sink = UploadSink(self.tmpdir, max_size=10)
+        sink.write(b'12345')
+        with self.assertRaises(RequestEntityTooLarge):
+            sink.write(b'678901')
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+
+class TestUploadRoute(AppTestCase):
+
+    logged_in = True
+
+    def settings(self):
+        return {'MAX_FILE_SIZE': 1024, 'MAX_CONTENT_LENGTH': None}
+
+    def post(self, content, name):
+        return self.client.post('/upload', data={'file': (io.BytesIO(content), name)},
+                                headers={'Accept': 'application/json'})
+
+    def incoming(self):
+        with self.app.app_context():
+            return os.listdir(incoming_dir())
+
+    @mock.patch('app.utils.summarize_text', return_value='summary')
+    @mock.patch('app.utils.extract_text_from_file', return_value='text')
+    def test_upload_records_streamed_metadata(self, extract, summarize):
+        content = b'%PDF-1.4 small document'
+        response = self.post(content, 'small.docx')
+        self.assertEqual(response.status_code, 202)
+
+        with self.app.app_context():
+            uploaded_file = db.session.get(UploadedFile, response.get_json()['job_id'])
+            self.assertEqual(uploaded_file.file_size, len(content))
+            self.assertEqual(uploaded_file.content_hash, hashlib.sha256(content).hexdigest())
+            self.assertEqual(uploaded_file.mime_type, 'application/pdf')
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertTrue(os.path.exists(os.path.join(self.upload_dir, digest[:2], digest[2:4], digest)))
+        self.assertEqual(self.incoming(), [])
+
+    def test_oversized_upload_is_rejected_and_cleaned_up(self):
+        response = self.post(b'x' * 4096, 'big.pdf')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.incoming(), [])
+        with self.app.app_context():
+            self.assertEqual(UploadedFile.query.count(), 0)
+
+    def test_rejected_file_type_leaves_nothing_behind(self):
+        response = self.post(b'MZ binary', 'tool.exe')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.incoming(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import time
+import unittest
+
+from sqlalchemy import event
+
+from app import db
+from app.models import User
+from app.user_cache import UserCache, load_cached_user
+from helpers import AppTestCase
+
+
+class TestUserCache(unittest.TestCase):
+
+    def test_entries_expire(self):
+        cache = UserCache(ttl=0.01)
+        cache.set(1, {'id': 1})
+        self.assertEqual(cache.get(1), {'id': 1})
+        time.sleep(0.02)
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'size': 0})
+
+    def test_least_recently_used_is_evicted(self):
+        cache = UserCache(maxsize=2)
+        cache.set(1, {})
+        cache.set(2, {})
+        cache.get(1)
+        cache.set(3, {})
+        self.assertIsNotNone(cache.get(1))
+        self.assertIsNone(cache.get(2))
+
+
+class TestCachedUserLoading(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = self.app.extensions['user_cache']
+
+    def count_user_queries(self, fn):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            if 'FROM users' in statement:
+                statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                fn()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+        return len(statements)
+
+    def test_second_request_skips_the_database(self):
+        self.login()
+        self.count_user_queries(lambda: self.client.get('/profile'))
+        queries = self.count_user_queries(lambda: self.client.get('/profile'))
+        self.assertEqual(queries, 0)
+        self.assertGreaterEqual(self.cache.stats()['hits'], 1)
+
+    def test_cached_user_is_usable_in_session(self):
+        with self.app.app_context():
+            load_cached_user(self.user_id)
+        with self.app.app_context():
+            user = load_cached_user(self.user_id)
+            self.assertEqual(user.username, 'testuser')
+            self.assertIn(user, db.session)
+            self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_update_invalidates(self):
+        with self.app.app_context():
+            load_cached_user(self.user_id)
+            self.assertEqual(len(self.cache), 1)
+            user = db.session.get(User, self.user_id)
+            user.is_active = False
+            db.session.commit()
+            self.assertEqual(len(self.cache), 0)
+        with self.app.app_context():
+            self.assertFalse(load_cached_user(self.user_id).is_active)
+
+    def test_delete_invalidates(self):
+        with self.app.app_context():
+            load_cached_user(self.user_id)
+            db.session.delete(db.session.get(User, self.user_id))
+            db.session.commit()
+        with self.app.app_context():
+            self.assertIsNone(load_cached_user(self.user_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
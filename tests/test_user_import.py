@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+import unittest
+
+from app import create_app, db
+from app.config import TestConfig
+from app.models import User
+from app.user_import import import_users
+from werkzeug.security import generate_password_hash
+
+
+class TestUserValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+
+        class Config(TestConfig):
+            UPLOAD_FOLDER = self.upload_dir
+
+        self.app = create_app(Config)
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(User(username='existing', email='existing@example.com',
+                                password=generate_password_hash('password123')))
+            db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+        shutil.rmtree(self.upload_dir)
+
+    def register(self, username, email):
+        return self.client.post('/register', data={
+            'username': username, 'email': email,
+            'password': 'password123', 'confirm_password': 'password123'
+        })
+
+    def test_duplicate_username_is_reported(self):
+        response = self.register('existing', 'new@example.com')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Username already taken', response.data)
+
+    def test_duplicate_email_is_reported(self):
+        response = self.register('newuser', 'EXISTING@example.com')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Email already registered', response.data)
+
+    def test_registration_succeeds(self):
+        response = self.register('newuser', 'new@example.com')
+        self.assertEqual(response.status_code, 302)
+        with self.app.app_context():
+            self.assertEqual(User.query.count(), 2)
+
+    def test_import_csv(self):
+        hashed = generate_password_hash('password123')
+        data = (
+            "username,email,password_hash,password\n"
+            f"alice,alice@example.com,{hashed},\n"
+            "bob,bob@example.com,,secret-password\n"
+            "existing,other@example.com,,secret-password\n"
+            "carol,not-an-email,,secret-password\n"
+            "alice,alice2@example.com,,secret-password\n"
+        )
+        with self.app.app_context():
+            result = import_users(data.encode(), 'csv')
+            self.assertEqual(result.inserted, 2)
+            self.assertEqual(result.skipped, 2)
+            self.assertEqual(result.errors, [(5, 'Invalid email format')])
+
+            bob = User.query.filter_by(username='bob').one()
+            self.assertTrue(bob.check_password('secret-password'))
+            self.assertTrue(User.query.filter_by(username='alice').one().check_password('password123'))
+
+    def test_import_jsonl(self):
+        data = (
+            '{"username": "dave", "email": "Dave@Example.com", "password": "secret-password"}\n'
+            '\n'
+            'not json\n'
+        )
+        with self.app.app_context():
+            result = import_users(data.encode(), 'jsonl', batch_size=1)
+            self.assertEqual(result.inserted, 1)
+            self.assertEqual(result.errors[0][0], 3)
+            self.assertEqual(User.query.filter_by(username='dave').one().email, 'dave@example.com')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import TestConfig
+from app.models import User, UploadedFile
+from app.write_behind import write_behind
+from werkzeug.security import generate_password_hash
+
+
+class WriteBehindTestCase(unittest.TestCase):
+    max_items = 1000
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+
+        class Config(TestConfig):
+            UPLOAD_FOLDER = self.upload_dir
+            WRITE_BEHIND_INTERVAL = 60
+            WRITE_BEHIND_MAX_ITEMS = self.max_items
+
+        self.app = create_app(Config)
+        self.buffer = self.app.extensions['write_behind']
+        with self.app.app_context():
+            db.create_all()
+            users = [User(username=f'user{i}', email=f'user{i}@example.com',
+                          password=generate_password_hash('password123', method='pbkdf2:sha256:1000'))
+                     for i in range(3)]
+            db.session.add_all(users)
+            db.session.commit()
+            self.user_ids = [user.id for user in users]
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.buffer.shutdown()
+        with self.app.app_context():
+            db.drop_all()
+        shutil.rmtree(self.upload_dir)
+
+    def last_logins(self):
+        with self.app.app_context():
+            return [db.session.get(User, user_id).last_login for user_id in self.user_ids]
+
+
+class TestWriteBehind(WriteBehindTestCase):
+
+    def test_touches_are_written_in_one_transaction(self):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            for user_id in self.user_ids:
+                write_behind.touch(User.last_login, user_id)
+                write_behind.touch(User.last_login, user_id)
+            self.assertEqual(self.buffer.pending(), 3)
+            self.assertEqual(self.last_logins(), [None] * 3)
+
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                self.assertEqual(write_behind.flush(), 3)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('UPDATE users'))
+        self.assertTrue(all(self.last_logins()))
+
+    def test_timestamps_never_move_backwards(self):
+        newer = datetime(2030, 1, 1)
+        with self.app.app_context():
+            write_behind.touch(User.last_login, self.user_ids[0], newer)
+            write_behind.flush()
+            write_behind.touch(User.last_login, self.user_ids[0], newer - timedelta(days=1))
+            write_behind.flush()
+        self.assertEqual(self.last_logins()[0], newer)
+
+    def test_login_and_status_reads_are_buffered(self):
+        with self.app.app_context():
+            uploaded_file = UploadedFile(
+                filename='a.txt', original_filename='a.txt', file_size=1, mime_type='text/plain',
+                user_id=self.user_ids[0], extracted_text='', summarized_text=''
+            )
+            db.session.add(uploaded_file)
+            db.session.commit()
+            file_id = uploaded_file.id
+
+        self.client.post('/login', data={'username': 'user0', 'password': 'password123'})
+        self.client.get(f'/upload/{file_id}/status')
+        self.assertEqual(self.buffer.pending(), 2)
+
+        self.buffer.shutdown()
+        self.assertEqual(self.buffer.pending(), 0)
+        with self.app.app_context():
+            self.assertIsNotNone(db.session.get(UploadedFile, file_id).last_accessed)
+        self.assertIsNotNone(self.last_logins()[0])
+
+
+class TestWriteBehindSizeTrigger(WriteBehindTestCase):
+    max_items = 2
+
+    def test_flushes_when_full(self):
+        with self.app.app_context():
+            write_behind.touch(User.last_login, self.user_ids[0])
+            write_behind.touch(User.last_login, self.user_ids[1])
+        deadline = time.time() + 5
+        while self.buffer.pending() and time.time() < deadline:
+            time.sleep(0.01)
+        # The row is committed just after the buffer empties
+        while not all(self.last_logins()[:2]) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(all(self.last_logins()[:2]))
+
+
+if __name__ == '__main__':
+    unittest.main()